@@ -0,0 +1,412 @@
+import mpmath
+import numpy as np
+
+from instrument import span, count
+from config import default_config
+from hypotenuse import NotRightTriangleError, check_right_triangles
+from triangle_batch import TriangleBatch
+from utils import mpf_to_str
+from settings import (HEADERS, PRECISION_DIGITS, COMPENSATED_VALUES,
+                      COMPENSATED_ANCHOR_EVERY, JUMP_DIGITS)
+
+
+def calculate_inside_legs(numbers, config=default_config):
+    """Calculate the inside leg of every triangle number in an array."""
+    outside_leg = config.outside_leg_length
+    if config.custom_hypotenuse is not None:
+        # The hypotenuses of the whole range are calculated in one call.
+        hypotenuses = config.custom_hypotenuse.decimals(numbers)
+        check_right_triangles(numbers, hypotenuses, outside_leg)
+
+        return np.sqrt(hypotenuses ** 2 - outside_leg ** 2)
+    else:
+        return np.sqrt(numbers.astype(np.float64))
+
+
+def calculate_triangles(start, amount, current_rotation,
+                        previous_outside_right_point, config=default_config):
+    """Calculate a range of triangles at once using NumPy arrays.
+
+    The triangles from "start" to "start + amount - 1" are calculated,
+    continuing from the rotation and outside right point of triangle
+    "start - 1" (the same state "Triangle.calculate_triangle" takes). A
+    TriangleBatch of the triangles is returned, along with the rotation and
+    outside right point of the last triangle, so the next range can carry on
+    from there.
+
+    The rotation and the chain of outside right points are cumulative sums,
+    which NumPy adds up in the same order as the scalar loop. The rotations
+    match "Triangle.calculate_triangle" exactly, and the points match to
+    within about 1e-16 times the number of triangles (NumPy's cos and sin
+    can differ from the math module's by one unit in the last place, and
+    those differences add up along the chain of points).
+
+    The triangles are calculated with the settings of a config (the ones in
+    "settings.py" by default).
+    """
+    outside_leg = config.outside_leg_length
+    numbers = np.arange(start, start + amount, dtype=np.int64)
+    inside_legs = calculate_inside_legs(numbers, config)
+
+    # The first triangle isn't rotated and doesn't follow another triangle,
+    # so its points are fixed.
+    first = numbers[0] == 1
+    if first:
+        previous_outside_right_point = (0.0, float(inside_legs[0]))
+
+    # How much each triangle rotates compared to the one before it.
+    rotation_steps = np.arctan(outside_leg / inside_legs)
+    if first:
+        rotation_steps[0] = 0.0
+    rotations = np.cumsum(
+        np.concatenate(([float(current_rotation)], rotation_steps)))[1:]
+
+    rotation_cos = np.cos(rotations)
+    rotation_sin = np.sin(rotations)
+
+    # Each outside right point is the previous one moved along the outside
+    # leg, after it has been rotated clockwise by the current rotation.
+    step_x = outside_leg * rotation_cos
+    step_y = -outside_leg * rotation_sin
+    if first:
+        step_x[0] = 0.0
+        step_y[0] = 0.0
+    outside_right_x = np.cumsum(np.concatenate(
+        ([float(previous_outside_right_point[0])], step_x)))
+    outside_right_y = np.cumsum(np.concatenate(
+        ([float(previous_outside_right_point[1])], step_y)))
+
+    # The outside left point is the previous triangle's outside right point.
+    outside_left_x = outside_right_x[:-1]
+    outside_left_y = outside_right_y[:-1]
+    outside_right_x = outside_right_x[1:]
+    outside_right_y = outside_right_y[1:]
+
+    # The inside point is at the end of the inside leg, which goes down from
+    # the unrotated outside right point.
+    inside_x = outside_left_x + step_x - inside_legs * rotation_sin
+    inside_y = outside_left_y + step_y - inside_legs * rotation_cos
+    if first:
+        outside_left_x[0] = -outside_leg
+        inside_x[0] = 0.0
+        inside_y[0] = 0.0
+
+    triangle_data = TriangleBatch(dict(zip(HEADERS, (
+        numbers, outside_left_x, outside_left_y, outside_right_x,
+        outside_right_y, inside_x, inside_y, rotations))))
+
+    return (triangle_data, float(rotations[-1]),
+            (float(outside_right_x[-1]), float(outside_right_y[-1])))
+
+
+class CompensatedFloat(float):
+    """A float which also carries the rounding error left out of it, so a
+    compensated sum can carry on from it without losing anything.
+
+    It works like any other float (the rounding error is simply dropped), so
+    the rotation and outside right point of compensated triangles can be
+    used anywhere the plain ones are.
+    """
+    def __new__(cls, high, low=0.0):
+        value = high + low
+        self = super().__new__(cls, value)
+        # What is left of "high + low" after rounding it to a float.
+        self.low = (high - value) + low
+
+        return self
+
+
+def two_sum(a, b):
+    """Add arrays of floats, also returning the exact rounding error of
+    each addition (Knuth's TwoSum)."""
+    total = a + b
+    b_part = total - a
+    a_part = total - b_part
+
+    return total, (a - a_part) + (b - b_part)
+
+
+def compensated_cumsum(start, values):
+    """Add up an array of floats, starting from a float (which may be a
+    CompensatedFloat).
+
+    Each sum is returned as two arrays: the sums, and the rounding error of
+    every addition added up (Neumaier summation). NumPy adds the values one
+    after another, so the rounding error of each addition can be found after
+    adding them all, without a Python loop.
+    """
+    sums = np.cumsum(np.concatenate(([float(start)], values)))
+    _, errors = two_sum(sums[:-1], values)
+
+    return sums[1:], getattr(start, "low", 0.0) + np.cumsum(errors)
+
+
+def anchor_state(triangle_number):
+    """Find the rotation and outside right point of a triangle by jumping
+    ahead, as CompensatedFloats holding about twice the digits of a
+    float."""
+    from jump import jump_series
+
+    rotation, point, _, _ = jump_series(triangle_number)
+    with mpmath.workdps(JUMP_DIGITS):
+        values = []
+        for value in (rotation, point.real, point.imag):
+            high = float(value)
+            values.append(CompensatedFloat(high, float(value - high)))
+
+    return values[0], (values[1], values[2])
+
+
+def calculate_compensated_triangles(start, amount, current_rotation,
+                                    previous_outside_right_point,
+                                    config=default_config):
+    """Calculate a range of triangles with NumPy, using compensated sums.
+
+    This works the same as "calculate_triangles", but the rotation and the
+    chain of outside right points are added up with "compensated_cumsum", so
+    the rounding error of every addition is kept instead of building up. The
+    rotation (with its rounding error) is used to correct the cosine and
+    sine, and the saved values are the compensated sums rounded to floats.
+    The rotation and outside right point returned are CompensatedFloats, so
+    the next range carries on without losing the rounding error.
+
+    What is left is the error of each triangle's own rotation and leg, which
+    only grows like the square root of the number of triangles. Every
+    COMPENSATED_ANCHOR_EVERY triangles, the rotation and point are replaced
+    by ones found by jumping ahead, which removes that too.
+    """
+    from jump import can_jump
+
+    end = start + amount
+    if COMPENSATED_ANCHOR_EVERY is None:
+        bounds = [start, end]
+    else:
+        # Split the range after each triangle the state is replaced at, so
+        # it is replaced exactly once no matter how the ranges are split.
+        first_anchor = -(-start // COMPENSATED_ANCHOR_EVERY) * (
+            COMPENSATED_ANCHOR_EVERY)
+        bounds = [start, *range(first_anchor + 1, end,
+                                COMPENSATED_ANCHOR_EVERY), end]
+
+    batches = []
+    for part_start, part_end in zip(bounds, bounds[1:]):
+        if (COMPENSATED_ANCHOR_EVERY is not None
+                and (part_start - 1) % COMPENSATED_ANCHOR_EVERY == 0
+                and can_jump(part_start - 1, config)):
+            with span("anchor"):
+                current_rotation, previous_outside_right_point = (
+                    anchor_state(part_start - 1))
+            count("anchors")
+
+        triangle_data, current_rotation, previous_outside_right_point = (
+            calculate_compensated_range(
+                part_start, part_end - part_start, current_rotation,
+                previous_outside_right_point, config))
+        batches.append(triangle_data)
+
+    if len(batches) == 1:
+        return triangle_data, current_rotation, previous_outside_right_point
+
+    return (TriangleBatch.concatenate(batches), current_rotation,
+            previous_outside_right_point)
+
+
+def calculate_compensated_range(start, amount, current_rotation,
+                                previous_outside_right_point,
+                                config=default_config):
+    """Calculate a range of triangles with compensated sums, without
+    replacing the state at any anchors (see
+    "calculate_compensated_triangles")."""
+    outside_leg = config.outside_leg_length
+    numbers = np.arange(start, start + amount, dtype=np.int64)
+    inside_legs = calculate_inside_legs(numbers, config)
+
+    first = numbers[0] == 1
+    if first:
+        previous_outside_right_point = (0.0, float(inside_legs[0]))
+
+    rotation_steps = np.arctan(outside_leg / inside_legs)
+    if first:
+        rotation_steps[0] = 0.0
+    rotations, rotation_errors = compensated_cumsum(current_rotation,
+                                                    rotation_steps)
+
+    # cos(r + e) is about cos(r) - e * sin(r), and sin(r + e) is about
+    # sin(r) + e * cos(r), since the rounding error e is tiny.
+    rotation_cos = np.cos(rotations)
+    rotation_sin = np.sin(rotations)
+    rotation_cos, rotation_sin = (
+        rotation_cos - rotation_errors * rotation_sin,
+        rotation_sin + rotation_errors * rotation_cos)
+
+    step_x = outside_leg * rotation_cos
+    step_y = -outside_leg * rotation_sin
+    if first:
+        step_x[0] = 0.0
+        step_y[0] = 0.0
+    outside_right_x, outside_right_x_errors = compensated_cumsum(
+        previous_outside_right_point[0], step_x)
+    outside_right_y, outside_right_y_errors = compensated_cumsum(
+        previous_outside_right_point[1], step_y)
+
+    # The outside left point is the previous triangle's outside right point,
+    # including its rounding error.
+    outside_left_x = np.concatenate((
+        [float(previous_outside_right_point[0])], outside_right_x[:-1]))
+    outside_left_x_errors = np.concatenate((
+        [getattr(previous_outside_right_point[0], "low", 0.0)],
+        outside_right_x_errors[:-1]))
+    outside_left_y = np.concatenate((
+        [float(previous_outside_right_point[1])], outside_right_y[:-1]))
+    outside_left_y_errors = np.concatenate((
+        [getattr(previous_outside_right_point[1], "low", 0.0)],
+        outside_right_y_errors[:-1]))
+
+    # The rounding errors are added in last, after the small parts.
+    inside_x = outside_left_x + (outside_left_x_errors + step_x
+                                 - inside_legs * rotation_sin)
+    inside_y = outside_left_y + (outside_left_y_errors + step_y
+                                 - inside_legs * rotation_cos)
+    if first:
+        inside_x[0] = 0.0
+        inside_y[0] = 0.0
+
+    triangle_data = TriangleBatch(dict(zip(HEADERS, (
+        numbers, outside_left_x + outside_left_x_errors,
+        outside_left_y + outside_left_y_errors,
+        outside_right_x + outside_right_x_errors,
+        outside_right_y + outside_right_y_errors, inside_x, inside_y,
+        rotations + rotation_errors))))
+    if first:
+        triangle_data[HEADERS[1]][0] = -outside_leg
+
+    return (triangle_data,
+            CompensatedFloat(rotations[-1], rotation_errors[-1]),
+            (CompensatedFloat(outside_right_x[-1], outside_right_x_errors[-1]),
+             CompensatedFloat(outside_right_y[-1],
+                              outside_right_y_errors[-1])))
+
+
+def calculate_decimal_triangles(start, amount, current_rotation,
+                                previous_outside_right_point,
+                                config=default_config):
+    """Calculate a range of triangles as floats, with compensated sums if
+    COMPENSATED_VALUES is set."""
+    if COMPENSATED_VALUES:
+        return calculate_compensated_triangles(
+            start, amount, current_rotation, previous_outside_right_point,
+            config)
+
+    return calculate_triangles(start, amount, current_rotation,
+                               previous_outside_right_point, config)
+
+
+def calculate_precise_triangles(start, amount, current_rotation,
+                                previous_outside_right_point,
+                                config=default_config):
+    """Calculate a range of triangles using mpmath.
+
+    This works the same as "calculate_triangles", but every value is an
+    mpmath number with PRECISION_DIGITS digits (plus some guard digits, which
+    absorb the rounding error that builds up over many triangles). Use
+    "precise_to_str" to turn the values into strings holding every digit, so
+    they can be saved and read back without losing anything.
+    """
+    outside_leg = mpmath.mpf(config.outside_leg_length)
+    custom_hypotenuse = config.custom_hypotenuse
+    current_rotation = mpmath.mpf(current_rotation)
+    if previous_outside_right_point is not None:
+        previous_outside_right_point = (
+            mpmath.mpf(previous_outside_right_point[0]),
+            mpmath.mpf(previous_outside_right_point[1]))
+
+    if custom_hypotenuse is not None:
+        # Find every triangle that can't be a right triangle before
+        # calculating any of them.
+        hypotenuses = [custom_hypotenuse.precise(triangle_number)
+                       for triangle_number in range(start, start + amount)]
+        not_right = [start + row for row, hypotenuse in enumerate(hypotenuses)
+                     if hypotenuse <= outside_leg]
+        if not_right:
+            raise NotRightTriangleError(not_right)
+
+    triangle_data = TriangleBatch.empty(amount, dtype=object)
+    for row, triangle_number in enumerate(range(start, start + amount)):
+        if custom_hypotenuse is not None:
+            inside_leg = mpmath.sqrt(hypotenuses[row] ** 2 - outside_leg ** 2)
+        else:
+            inside_leg = mpmath.sqrt(triangle_number)
+
+        if triangle_number == 1:
+            outside_left_point = (-outside_leg, inside_leg)
+            outside_right_point = (mpmath.mpf(0), inside_leg)
+            inside_point = (mpmath.mpf(0), mpmath.mpf(0))
+        else:
+            current_rotation += mpmath.atan(outside_leg / inside_leg)
+            rotation_cos, rotation_sin = mpmath.mp.cos_sin(current_rotation)
+
+            # The same rotation as "Triangle.rotate_point", written out so the
+            # cosine and sine are only calculated once for both points.
+            outside_left_point = previous_outside_right_point
+            outside_right_point = (
+                outside_left_point[0] + outside_leg * rotation_cos,
+                outside_left_point[1] - outside_leg * rotation_sin)
+            inside_point = (
+                outside_right_point[0] - inside_leg * rotation_sin,
+                outside_right_point[1] - inside_leg * rotation_cos)
+
+        for key, value in zip(HEADERS, (
+                triangle_number, *outside_left_point, *outside_right_point,
+                *inside_point, current_rotation)):
+            triangle_data[key][row] = value
+
+        previous_outside_right_point = outside_right_point
+
+    return (triangle_data, current_rotation, previous_outside_right_point)
+
+
+def precise_to_str(triangle_data):
+    """Convert the mpmath numbers in a batch of triangles to strings."""
+    return TriangleBatch({
+        key: values if key == HEADERS[0] else
+        np.array([mpf_to_str(value) for value in values], dtype=object)
+        for key, values in triangle_data.items()})
+
+
+def save_every(triangle_data, save_every_n_triangles):
+    """Only keep every "n" triangles from a batch of triangles."""
+    if save_every_n_triangles == 1:
+        return triangle_data
+
+    keep = triangle_data[HEADERS[0]] % save_every_n_triangles == 0
+    return TriangleBatch({key: values[keep]
+                          for key, values in triangle_data.items()})
+
+
+def calculate_saved_triangles(start, amount, current_rotation,
+                              previous_outside_right_point,
+                              save_every_n_triangles, config=default_config):
+    """Calculate a range of triangles, keeping the ones that will be saved.
+
+    Triangles are calculated with mpmath if PRECISION_DIGITS is set, or with
+    NumPy otherwise (with compensated sums if COMPENSATED_VALUES is set).
+    The triangle data to save is returned, along with the rotation and
+    outside right point of the last triangle calculated.
+    """
+    with span("compute"):
+        if PRECISION_DIGITS is not None:
+            (triangle_data, current_rotation,
+             previous_outside_right_point) = calculate_precise_triangles(
+                start, amount, current_rotation, previous_outside_right_point,
+                config)
+            triangle_data = precise_to_str(
+                save_every(triangle_data, save_every_n_triangles))
+        else:
+            (triangle_data, current_rotation,
+             previous_outside_right_point) = calculate_decimal_triangles(
+                start, amount, current_rotation, previous_outside_right_point,
+                config)
+            triangle_data = save_every(triangle_data, save_every_n_triangles)
+    count("triangles", amount)
+
+    return triangle_data, current_rotation, previous_outside_right_point
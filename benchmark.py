@@ -0,0 +1,471 @@
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import matplotlib
+import mpmath
+import numpy as np
+import pandas as pd
+
+from batch import (calculate_triangles, calculate_compensated_triangles,
+                   calculate_precise_triangles)
+from config import Config
+from settings import PRECISION_GUARD_DIGITS
+from triangle import Triangle
+
+# Version of the results file format.
+RESULTS_VERSION = 2
+# How many triangles to calculate for each benchmark.
+FLOAT_AMOUNT = 1000000
+PRECISE_AMOUNT = 10000
+# Exact values take a few milliseconds for each triangle, so fewer are
+# calculated.
+EXACT_AMOUNT = 1000
+# How many digits to calculate with mpmath.
+PRECISE_DIGITS = 50
+# How many triangles to calculate one at a time with "calculate_triangle",
+# for each mode.
+SCALAR_AMOUNTS = {"float": 100000, "exact": 1000,
+                  "custom hypotenuse": 100000}
+# How many rows the data files have when timing saving and reading them.
+STORAGE_AMOUNTS = (1000, 10000, 100000, 1000000, 10000000)
+# How many rows the data files have when timing reading every triangle.
+POINTS_AMOUNTS = STORAGE_AMOUNTS
+# Benchmarks faster than this many seconds are run several times, and the
+# median time is kept, so they aren't thrown off by noise.
+REPEAT_BELOW_SECONDS = 0.5
+REPEATS = 5
+# How many triangles to plot, with and without collections. Plotting one
+# artist for each triangle is too slow for the biggest amount.
+PLOT_AMOUNTS = (10000, 100000, 1000000)
+UNBATCHED_PLOT_AMOUNTS = (10000, 100000)
+# How many times to start the program for each startup benchmark.
+STARTUP_RUNS = 5
+# The commands to time starting the program with. Each one is run from an
+# empty folder.
+STARTUP_COMMANDS = {
+    "help": ["--help"],
+    "generate": ["generate", "--amount", "1", "--out", "startup.csv"]
+}
+# How much slower (as a fraction) than the baseline a benchmark can be before
+# it is reported as a regression.
+REGRESSION_THRESHOLD = 0.1
+# Benchmarks that took less than this many seconds in the baseline, or that
+# are slower by less than this many seconds, are too small to tell apart from
+# noise, so they are never reported as regressions.
+MIN_COMPARED_SECONDS = 0.01
+MIN_SLOWDOWN_SECONDS = 0.005
+
+
+def time_call(function, *args):
+    """Call a function, returning its result and how long it took."""
+    start = time.perf_counter()
+    result = function(*args)
+
+    return result, time.perf_counter() - start
+
+
+def time_median(function, *args, repeats=REPEATS):
+    """Time a function, calling it several times (and keeping the median
+    time) if it is fast enough to be thrown off by noise."""
+    result, seconds = time_call(function, *args)
+    if seconds < REPEAT_BELOW_SECONDS:
+        times = [seconds] + [time_call(function, *args)[1]
+                             for _ in range(repeats - 1)]
+        seconds = statistics.median(times)
+
+    return result, seconds
+
+
+def create_result(benchmark, case, amount, seconds, **extra):
+    """Create the result of one benchmark, as saved in the results file."""
+    return {"benchmark": benchmark, "case": case, "amount": amount,
+            "seconds": seconds, **extra}
+
+
+@contextlib.contextmanager
+def temporary_data_folder():
+    """Run in an empty temporary folder, which has an empty "data" folder."""
+    previous_folder = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        os.mkdir(os.path.join(folder, "data"))
+        os.chdir(folder)
+        try:
+            yield folder
+        finally:
+            os.chdir(previous_folder)
+
+
+def reference_point(amount, digits):
+    """Calculate the last outside right point, with twice as many digits as
+    the values it is compared to."""
+    with mpmath.workdps(2 * digits + PRECISION_GUARD_DIGITS):
+        return calculate_precise_triangles(1, amount, 0, None)[2]
+
+
+def point_error(point, reference, digits):
+    """The distance between a point and a reference point."""
+    # Use the reference point's precision, so the distance isn't rounded away.
+    with mpmath.workdps(2 * digits + PRECISION_GUARD_DIGITS):
+        return float(mpmath.hypot(mpmath.mpf(point[0]) - reference[0],
+                                  mpmath.mpf(point[1]) - reference[1]))
+
+
+def calculate_scalar_triangles(amount, exact=False, custom_hypotenuse=False):
+    """Calculate triangles one at a time with "Triangle.calculate_triangle",
+    returning the last outside right point."""
+    from symbolic import ExpressionTable
+
+    # Exact values and custom hypotenuses are normally turned on in
+    # "settings.py". Turn them on just for this benchmark with a config. Each
+    # run gets its own expression table, so it doesn't reuse the entries of
+    # the run before it.
+    config = Config(custom_hypotenuse_function=custom_hypotenuse,
+                    exact_values=exact)
+    table = ExpressionTable() if exact else None
+    current_rotation = 0
+    previous_outside_right_point = None
+    for triangle_number in range(1, amount + 1):
+        current_triangle = Triangle.calculate_triangle(
+            triangle_number, current_rotation, previous_outside_right_point,
+            table, config)
+        current_rotation = current_triangle.rotation
+        previous_outside_right_point = current_triangle.points['outside right']
+
+    return previous_outside_right_point
+
+
+def calculate_exact_triangles(amount):
+    """Calculate triangles one at a time with exact sympy values."""
+    return calculate_scalar_triangles(amount, exact=True)
+
+
+def benchmark_precision(float_amount=FLOAT_AMOUNT,
+                        precise_amount=PRECISE_AMOUNT,
+                        exact_amount=EXACT_AMOUNT, digits=PRECISE_DIGITS):
+    """Compare the speed and accuracy of decimal, compensated, mpmath and
+    exact values.
+
+    The error is how far the last outside right point is from where it should
+    be.
+    """
+    results = []
+
+    # Decimal values, calculated with NumPy. Finding the error of a long run
+    # would take too long with mpmath, so the error is found for as many
+    # triangles as the mpmath benchmark.
+    _, seconds = time_median(calculate_triangles, 1, float_amount, 0, None)
+    point = calculate_triangles(1, precise_amount, 0, None)[2]
+    results.append(create_result(
+        "precision", "decimal", float_amount, seconds, error=point_error(
+            point, reference_point(precise_amount, digits), digits)))
+
+    # Decimal values with compensated sums, checked the same way.
+    _, seconds = time_median(calculate_compensated_triangles, 1,
+                             float_amount, 0, None)
+    point = calculate_compensated_triangles(1, precise_amount, 0, None)[2]
+    results.append(create_result(
+        "precision", "compensated", float_amount, seconds, error=point_error(
+            point, reference_point(precise_amount, digits), digits)))
+
+    # mpmath values, with the given number of digits.
+    with mpmath.workdps(digits + PRECISION_GUARD_DIGITS):
+        (_, _, point), seconds = time_call(
+            calculate_precise_triangles, 1, precise_amount, 0, None)
+    results.append(create_result(
+        "precision", f"mpmath ({digits} digits)", precise_amount, seconds,
+        error=point_error(point, reference_point(precise_amount, digits),
+                          digits)))
+
+    # Exact values, calculated with sympy. The exact point is evaluated to
+    # the same number of digits as the mpmath values to find its error.
+    point, seconds = time_call(calculate_exact_triangles, exact_amount)
+    with mpmath.workdps(digits):
+        point = (mpmath.mpf(str(point[0].evalf(digits))),
+                 mpmath.mpf(str(point[1].evalf(digits))))
+    results.append(create_result(
+        "precision", "exact", exact_amount, seconds, error=point_error(
+            point, reference_point(exact_amount, digits), digits)))
+
+    print(f"\n{'mode':<20}{'triangles':>12}{'seconds':>12}"
+          f"{'per triangle':>16}{'error':>12}")
+    for result in results:
+        print(f"{result['case']:<20}{result['amount']:>12}"
+              f"{result['seconds']:>12.3f}"
+              f"{result['seconds'] / result['amount']:>16.3e}"
+              f"{result['error']:>12.2e}")
+
+    return results
+
+
+def benchmark_scalar(amounts=SCALAR_AMOUNTS):
+    """Time calculating triangles one at a time, in each mode."""
+    results = []
+    for mode, amount in amounts.items():
+        _, seconds = time_median(
+            calculate_scalar_triangles, amount, mode == "exact",
+            mode == "custom hypotenuse")
+        results.append(create_result("scalar", mode, amount, seconds))
+
+    print(f"\n{'mode':<20}{'triangles':>12}{'seconds':>12}"
+          f"{'per second':>16}")
+    for result in results:
+        print(f"{result['case']:<20}{result['amount']:>12}"
+              f"{result['seconds']:>12.3f}"
+              f"{result['amount'] / result['seconds']:>16.0f}")
+
+    return results
+
+
+def benchmark_storage(amounts=STORAGE_AMOUNTS, points_amounts=POINTS_AMOUNTS,
+                      extensions=(".csv", ".tri")):
+    """Time saving data files, and reading their last triangle and their
+    points, for csv files and stores of each size."""
+    from utils import (write_triangle_data, read_last_triangle,
+                       read_triangle_points)
+
+    results = []
+    with temporary_data_folder(), contextlib.redirect_stdout(None):
+        for amount in amounts:
+            triangle_data = calculate_triangles(1, amount, 0, None)[0]
+
+            for extension in extensions:
+                filename = f"benchmark{extension}"
+                case = extension[1:]
+
+                _, seconds = time_median(write_triangle_data,
+                                          triangle_data, filename, True)
+                results.append(create_result("write", case, amount, seconds))
+
+                _, seconds = time_median(read_last_triangle, filename)
+                results.append(create_result("read last", case, amount,
+                                             seconds))
+
+                if amount in points_amounts:
+                    _, seconds = time_median(read_triangle_points, filename)
+                    results.append(create_result("read points", case, amount,
+                                                 seconds))
+
+    print(f"\n{'benchmark':<14}{'format':<8}{'rows':>12}{'seconds':>12}"
+          f"{'rows per second':>18}")
+    for result in results:
+        print(f"{result['benchmark']:<14}{result['case']:<8}"
+              f"{result['amount']:>12}{result['seconds']:>12.3f}"
+              f"{result['amount'] / result['seconds']:>18.0f}")
+
+    return results
+
+
+def triangle_points(amount):
+    """Calculate triangles, as returned by "read_triangle_points"."""
+    return calculate_triangles(1, amount, 0, None)[0]
+
+
+def time_plot(points, batched):
+    """Time creating a plot and drawing it once (without showing it)."""
+    import matplotlib.pyplot as plt
+    from plot import create_plot
+
+    start = time.perf_counter()
+    fig, _, _ = create_plot(points, show_spiral=False, show_circle=False,
+                            animate_plot=False, batched=batched)
+    fig.canvas.draw()
+    seconds = time.perf_counter() - start
+    plt.close(fig)
+
+    return seconds
+
+
+def benchmark_plotting(amounts=PLOT_AMOUNTS,
+                       unbatched_amounts=UNBATCHED_PLOT_AMOUNTS):
+    """Compare plotting with collections to one artist for each triangle."""
+    # Draw without opening a window.
+    matplotlib.use("Agg")
+
+    results = []
+    for amount in amounts:
+        points = triangle_points(amount)
+        results.append(create_result("plot", "collections", amount,
+                                     time_plot(points, True)))
+        if amount in unbatched_amounts:
+            results.append(create_result("plot", "one artist each", amount,
+                                         time_plot(points, False)))
+
+    print(f"\n{'triangles':>12}{'one artist each':>18}{'collections':>14}")
+    for amount in amounts:
+        times = {result["case"]: f"{result['seconds']:.2f}"
+                 for result in results if result["amount"] == amount}
+        print(f"{amount:>12}{times.get('one artist each', '-'):>18}"
+              f"{times['collections']:>14}")
+
+    return results
+
+
+def benchmark_startup(runs=STARTUP_RUNS, commands=STARTUP_COMMANDS):
+    """Time how long it takes to start the program from the command line.
+
+    Each command is run in a new Python process (a cold start), so the time
+    includes importing every module the command needs.
+    """
+    main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "main.py")
+
+    results = []
+    for name, arguments in commands.items():
+        times = []
+        for _ in range(runs):
+            with tempfile.TemporaryDirectory() as folder:
+                os.mkdir(os.path.join(folder, "data"))
+                start = time.perf_counter()
+                subprocess.run([sys.executable, main_path, *arguments],
+                               cwd=folder, check=True,
+                               stdout=subprocess.DEVNULL)
+                times.append(time.perf_counter() - start)
+        results.append(create_result("startup", name, 1,
+                                     statistics.median(times),
+                                     fastest=min(times)))
+
+    print(f"\n{'command':<12}{'fastest':>12}{'median':>12}")
+    for result in results:
+        print(f"{result['case']:<12}{result['fastest']:>12.3f}"
+              f"{result['seconds']:>12.3f}")
+
+    return results
+
+
+def machine_info():
+    """Describe the machine and library versions the benchmarks ran on."""
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "matplotlib": matplotlib.__version__,
+        "mpmath": mpmath.__version__
+    }
+
+
+def compare_results(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Compare results to the results of a baseline run.
+
+    Benchmarks are matched by their name, case and amount. The ones which are
+    more than "threshold" (as a fraction) slower than the baseline are
+    returned, as tuples of the result and how many times slower it is.
+    Benchmarks too small to tell apart from noise (see MIN_COMPARED_SECONDS
+    and MIN_SLOWDOWN_SECONDS) are shown, but never returned.
+    """
+    if baseline.get("version") != RESULTS_VERSION:
+        print("\nNote: the baseline was saved by another version of the "
+              "benchmarks, so its times might not be comparable.")
+    baseline_seconds = {
+        (result["benchmark"], result["case"], result["amount"]):
+            result["seconds"] for result in baseline["results"]}
+
+    print(f"\n{'benchmark':<14}{'case':<24}{'amount':>10}{'baseline':>12}"
+          f"{'seconds':>12}{'change':>10}")
+    regressions = []
+    for result in results:
+        key = (result["benchmark"], result["case"], result["amount"])
+        if key not in baseline_seconds:
+            continue
+
+        ratio = result["seconds"] / baseline_seconds[key]
+        flag = ""
+        if (baseline_seconds[key] < MIN_COMPARED_SECONDS
+                or result["seconds"] - baseline_seconds[key]
+                < MIN_SLOWDOWN_SECONDS):
+            if ratio > 1 + threshold:
+                flag = "  too small to compare"
+        elif ratio > 1 + threshold:
+            regressions.append((result, ratio))
+            flag = "  slower"
+        print(f"{key[0]:<14}{key[1]:<24}{key[2]:>10}"
+              f"{baseline_seconds[key]:>12.3f}{result['seconds']:>12.3f}"
+              f"{ratio - 1:>+10.1%}{flag}")
+
+    return regressions
+
+
+# Every benchmark that can be run, by name.
+BENCHMARKS = {
+    "startup": benchmark_startup,
+    "scalar": benchmark_scalar,
+    "precision": benchmark_precision,
+    "storage": benchmark_storage,
+    "plot": benchmark_plotting
+}
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Time calculating, saving, reading and plotting "
+                    "triangles, and compare the times to a baseline.")
+    parser.add_argument("benchmarks", nargs="*", metavar="BENCHMARK",
+                        help="the benchmarks to run (all of them by default): "
+                             + ", ".join(BENCHMARKS))
+    parser.add_argument("--output", default="benchmark.json",
+                        help="the file to save the results to as JSON")
+    parser.add_argument("--baseline",
+                        help="a results file to compare the results to")
+    parser.add_argument("--threshold", type=float,
+                        default=REGRESSION_THRESHOLD,
+                        help="how much slower (as a fraction) than the "
+                             "baseline counts as a regression")
+    parser.add_argument("--max-rows", type=int,
+                        help="leave out data files and plots with more rows "
+                             "than this")
+    arguments = parser.parse_args(args)
+    for name in arguments.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"\"{name}\" is not a benchmark.")
+
+    results = []
+    for name in arguments.benchmarks or BENCHMARKS:
+        if name == "storage" and arguments.max_rows is not None:
+            results += benchmark_storage(
+                [amount for amount in STORAGE_AMOUNTS
+                 if amount <= arguments.max_rows])
+        elif name == "plot" and arguments.max_rows is not None:
+            results += benchmark_plotting(
+                [amount for amount in PLOT_AMOUNTS
+                 if amount <= arguments.max_rows])
+        else:
+            results += BENCHMARKS[name]()
+
+    with open(arguments.output, "w") as f:
+        json.dump({
+            "version": RESULTS_VERSION,
+            "created": datetime.datetime.now(
+                datetime.timezone.utc).isoformat(),
+            "machine": machine_info(),
+            "results": results
+        }, f, indent=2)
+    print(f"\nSaved the results to \"{arguments.output}\".")
+
+    if arguments.baseline is not None:
+        with open(arguments.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, arguments.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmarks are more than "
+                  f"{arguments.threshold:.0%} slower than the baseline.")
+
+            return 1
+        print("\nNo benchmarks are slower than the baseline.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
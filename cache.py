@@ -0,0 +1,241 @@
+import contextlib
+import hashlib
+import inspect
+import io
+import json
+import os
+import shutil
+import time
+
+from config import default_config
+from files import replace_file
+from hypotenuse import import_function
+from index import index_path, checkpoint_path, table_path
+from store import is_store, store_path
+from triangle_batch import TriangleBatch
+from settings import (HEADERS, CACHE_FOLDER, CACHE_MAX_BYTES,
+                      PRECISION_DIGITS, COMPENSATED_VALUES,
+                      COMPENSATED_ANCHOR_EVERY, READ_MODE, STORE_EXTENSION)
+
+# Version of the cache. Entries cached by another version are never used.
+CACHE_VERSION = 1
+# The file (in the cache folder) listing the cached entries and the stats.
+CACHE_INDEX_FILE = "index.json"
+
+
+def hypotenuse_source(config):
+    """Get the source of the hypotenuse of a config, so editing a function
+    used as the hypotenuse changes the cache key too."""
+    if not config.custom_hypotenuse_function:
+        return None
+
+    function = config.hypotenuse
+    if isinstance(function, str):
+        if ":" not in function:
+            # An expression is its own source.
+            return function
+        function = import_function(function)
+    try:
+        return inspect.getsource(function)
+    except (OSError, TypeError):
+        # Functions without source code (such as NumPy's) are named instead.
+        return f"{function.__module__}.{function.__qualname__}"
+
+
+def cache_key(config=default_config):
+    """Hash the settings that change the values of the triangles, including
+    PRECISION_DIGITS, COMPENSATED_VALUES and COMPENSATED_ANCHOR_EVERY."""
+    compensated = (not config.exact_values and PRECISION_DIGITS is None
+                   and COMPENSATED_VALUES)
+    parameters = {
+        "version": CACHE_VERSION,
+        "outside leg length": config.outside_leg_length,
+        "exact values": config.exact_values,
+        "hypotenuse": hypotenuse_source(config),
+        "precision digits": (None if config.exact_values
+                             else PRECISION_DIGITS),
+        "compensated values": compensated,
+        # Replacing the state at anchors changes compensated values too.
+        "compensated anchor every": (COMPENSATED_ANCHOR_EVERY if compensated
+                                     else None)
+    }
+
+    return hashlib.sha256(json.dumps(parameters, sort_keys=True).encode()
+                          ).hexdigest()[:32], parameters
+
+
+def cache_file(key, config=default_config):
+    """Get the data file (in the "data" folder) of a cache entry. Decimals
+    are cached in a store, and anything with more digits in a csv file."""
+    if config.exact_values or PRECISION_DIGITS is not None:
+        extension = ".csv"
+    else:
+        extension = STORE_EXTENSION
+
+    return os.path.join(CACHE_FOLDER, key + extension)
+
+
+def data_file_paths(filename):
+    """Get the paths of a data file and every file saved next to it."""
+    if is_store(filename):
+        return [store_path(filename)]
+
+    return [os.path.join("data", filename), index_path(filename),
+            checkpoint_path(filename), table_path(filename)]
+
+
+def data_file_bytes(filename):
+    """Get how many bytes a data file (and the files next to it) take up."""
+    total = 0
+    for path in data_file_paths(filename):
+        if os.path.isdir(path):
+            for folder, _, files in os.walk(path):
+                total += sum(os.path.getsize(os.path.join(folder, file))
+                             for file in files)
+        elif os.path.exists(path):
+            total += os.path.getsize(path)
+
+    return total
+
+
+def remove_data_file(filename):
+    """Delete a data file and every file saved next to it."""
+    for path in data_file_paths(filename):
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+class TriangleCache:
+    """A cache of the first triangles calculated with each group of settings.
+
+    The settings that change the triangles (the outside leg length, exact
+    values, the source of the hypotenuse and the precision) are hashed into
+    a key, and the triangles of each key are kept in their own data file in
+    the cache folder. Asking for a range of triangles reads whatever is
+    cached, and only calculates the triangles past the end of the cached
+    ones (which are then added to the cache).
+
+    The cache is kept under a number of bytes by deleting the entries that
+    were used the longest time ago. How often requests were served from the
+    cache is counted, and saved with the list of entries.
+    """
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.folder = os.path.join("data", CACHE_FOLDER)
+        os.makedirs(self.folder, exist_ok=True)
+        self.index = self.read_index()
+
+    def read_index(self):
+        """Read the list of cached entries and the stats."""
+        try:
+            with open(os.path.join(self.folder, CACHE_INDEX_FILE)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {
+                "entries": {},
+                "stats": {"requests": 0, "hits": 0, "triangles served": 0,
+                          "triangles calculated": 0, "bytes saved": 0,
+                          "evictions": 0}
+            }
+
+    def write_index(self):
+        """Save the list of cached entries and the stats."""
+        with replace_file(os.path.join(self.folder, CACHE_INDEX_FILE)) as f:
+            json.dump(self.index, f, indent=4)
+
+    def get(self, start, stop, config=default_config, verbose=False):
+        """Get the triangles from "start" up to (but not including) "stop" as
+        a TriangleBatch, calculating only the ones that aren't cached."""
+        from main import create_data
+        from utils import read_last_triangle, read_triangle_range
+
+        key, parameters = cache_key(config)
+        entry = self.index["entries"].setdefault(key, {
+            "file": cache_file(key, config),
+            "settings": parameters, "triangles": 0, "bytes": 0})
+        filename = entry["file"]
+
+        # The data file is the source of truth, in case calculating was
+        # interrupted after adding triangles to it.
+        last_triangle = read_last_triangle(filename)
+        cached = (0 if last_triangle is None
+                  else int(last_triangle[HEADERS[0]].iloc[0]))
+        missing = max(stop - 1 - cached, 0)
+
+        stats = self.index["stats"]
+        stats["requests"] += 1
+        if missing:
+            # Messages from calculating are only shown if asked for.
+            with (contextlib.nullcontext() if verbose
+                  else contextlib.redirect_stdout(io.StringIO())):
+                create_data(1, missing, config.replace(data_file=filename))
+            stats["triangles calculated"] += missing
+        else:
+            stats["hits"] += 1
+
+        entry["triangles"] = cached + missing
+        entry["bytes"] = data_file_bytes(filename)
+        entry["last used"] = time.time()
+
+        # The triangles read from the cache didn't have to be calculated.
+        served = max(min(stop, cached + 1) - start, 0)
+        stats["triangles served"] += served
+        stats["bytes saved"] += served * entry["bytes"] // max(
+            entry["triangles"], 1)
+
+        self.evict(keep=key)
+        self.write_index()
+
+        # Values with more digits are read without losing any of them.
+        triangle_dataframe = read_triangle_range(
+            filename, start, stop,
+            "precise" if PRECISION_DIGITS is not None
+            and not config.exact_values else READ_MODE)
+
+        return TriangleBatch.from_dataframe(triangle_dataframe)
+
+    def total_bytes(self):
+        """Get how many bytes every cached entry takes up."""
+        return sum(entry["bytes"] for entry in self.index["entries"].values())
+
+    def evict(self, keep=None):
+        """Delete the least recently used entries (other than "keep") until
+        the cache fits in its size."""
+        entries = self.index["entries"]
+        for key in sorted(entries, key=lambda key: entries[key].get(
+                "last used", 0)):
+            if self.total_bytes() <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+
+            remove_data_file(entries[key]["file"])
+            del entries[key]
+            self.index["stats"]["evictions"] += 1
+
+    def clear(self):
+        """Delete every cached entry, keeping the stats."""
+        for entry in self.index["entries"].values():
+            remove_data_file(entry["file"])
+        self.index["entries"] = {}
+        self.write_index()
+
+    def stats(self):
+        """Get the stats of the cache, along with its hit rates."""
+        stats = dict(self.index["stats"])
+        requested = stats["triangles served"] + stats["triangles calculated"]
+        stats["hit rate"] = stats["hits"] / max(stats["requests"], 1)
+        stats["triangle hit rate"] = (stats["triangles served"]
+                                      / max(requested, 1))
+        stats["entries"] = len(self.index["entries"])
+        stats["bytes"] = self.total_bytes()
+
+        return stats
+
+
+def cached_triangles(start, stop, config=default_config):
+    """Get the triangles from "start" up to (but not including) "stop" with
+    the settings of a config, using the cache."""
+    return TriangleCache().get(start, stop, config)
@@ -0,0 +1,67 @@
+from hypotenuse import load_hypotenuse
+from settings import (DATA_FILE, OUTSIDE_LEG_LENGTH,
+                      CUSTOM_HYPOTENUSE_FUNCTION, HYPOTENUSE, EXACT_VALUES)
+
+
+class Config:
+    """The settings a spiral is calculated and saved with.
+
+    Each setting starts as the one in "settings.py", so a config created
+    without arguments calculates the same spiral as the rest of the program.
+    Several configs can be used in the same process, such as for a sweep over
+    many outside leg lengths, each saving to its own data file.
+    """
+    def __init__(self, data_file=DATA_FILE,
+                 outside_leg_length=OUTSIDE_LEG_LENGTH,
+                 custom_hypotenuse_function=CUSTOM_HYPOTENUSE_FUNCTION,
+                 hypotenuse=HYPOTENUSE, exact_values=EXACT_VALUES):
+        # The data file (in the "data" folder) the triangles are saved to.
+        self.data_file = data_file
+        self.outside_leg_length = outside_leg_length
+        self.custom_hypotenuse_function = custom_hypotenuse_function
+        self.hypotenuse = hypotenuse
+        self.exact_values = exact_values
+        # The custom hypotenuse, or None if the triangle number is used
+        # instead. It is compiled once for the config.
+        self.custom_hypotenuse = (load_hypotenuse(hypotenuse)
+                                  if custom_hypotenuse_function else None)
+
+    def replace(self, **changes):
+        """Create a copy of the config with some settings changed."""
+        settings = {key: value for key, value in vars(self).items()
+                    if key != "custom_hypotenuse"}
+        settings.update(changes)
+
+        return Config(**settings)
+
+    def store_settings(self):
+        """Get the settings saved in the header of a store, which must match
+        for more triangles to be added to it."""
+        return {
+            "OUTSIDE_LEG_LENGTH": self.outside_leg_length,
+            "CUSTOM_HYPOTENUSE_FUNCTION": self.custom_hypotenuse_function,
+            "HYPOTENUSE": (self.custom_hypotenuse.name
+                           if self.custom_hypotenuse is not None else None),
+            "EXACT_VALUES": self.exact_values
+        }
+
+    def __getstate__(self):
+        # Compiled hypotenuses can't be pickled, so they are compiled again
+        # when a config is sent to another process.
+        state = vars(self).copy()
+        del state["custom_hypotenuse"]
+
+        return state
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __repr__(self):
+        settings = ", ".join(f"{key}={value!r}" for key, value
+                             in self.__getstate__().items())
+
+        return f"Config({settings})"
+
+
+# The config set in "settings.py", used when no other config is given.
+default_config = Config()
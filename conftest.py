@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.fixture
+def data_folder(tmp_path, monkeypatch):
+    """Run a test in an empty folder with a "data" folder."""
+    (tmp_path / "data").mkdir()
+    monkeypatch.chdir(tmp_path)
+
+    return tmp_path / "data"
@@ -0,0 +1,146 @@
+import time
+
+import mpmath
+import pandas as pd
+
+from batch import (calculate_triangles, calculate_compensated_triangles,
+                   calculate_precise_triangles)
+from config import default_config
+from jump import can_jump, jump_series
+from settings import (BATCH_SIZE, PRECISE_BATCH_SIZE, JUMP_DIGITS,
+                      DRIFT_PRECISE_TRIANGLES)
+
+
+def default_checkpoints(amount):
+    """Get the powers of 10 up to an amount, and the amount itself."""
+    checkpoints = []
+    checkpoint = 10
+    while checkpoint < amount:
+        checkpoints.append(checkpoint)
+        checkpoint *= 10
+
+    return checkpoints + [amount]
+
+
+def chain_states(calculate, checkpoints, batch_size=BATCH_SIZE,
+                 config=default_config):
+    """Calculate triangles from the first one up to the last checkpoint with
+    a batch function (such as "calculate_triangles").
+
+    The rotation and outside right point at each checkpoint are returned,
+    along with how many seconds calculating took.
+    """
+    states = []
+    current_rotation, previous_outside_right_point = 0, None
+    start = 1
+    seconds = 0.0
+    for checkpoint in checkpoints:
+        # The batches end at each checkpoint, so its state can be kept.
+        while start <= checkpoint:
+            amount = min(batch_size, checkpoint + 1 - start)
+            started = time.perf_counter()
+            _, current_rotation, previous_outside_right_point = calculate(
+                start, amount, current_rotation, previous_outside_right_point,
+                config)
+            seconds += time.perf_counter() - started
+            start += amount
+        states.append((current_rotation, previous_outside_right_point))
+
+    return states, seconds
+
+
+def reference_states(checkpoints, config=default_config):
+    """Find the rotation and outside right point at each checkpoint with
+    JUMP_DIGITS digits, along with an estimate of the largest possible error
+    in each point and how it was found.
+
+    Checkpoints up to DRIFT_PRECISE_TRIANGLES are calculated with mpmath one
+    triangle at a time, and later ones by jumping ahead (unless the config
+    can't jump ahead).
+    """
+    precise = [checkpoint for checkpoint in checkpoints
+               if checkpoint <= DRIFT_PRECISE_TRIANGLES
+               or not can_jump(checkpoint, config)]
+    with mpmath.workdps(JUMP_DIGITS):
+        states, _ = chain_states(calculate_precise_triangles, precise,
+                                 PRECISE_BATCH_SIZE, config)
+    references = dict(zip(precise, ((rotation, point, 0.0, "mpmath")
+                                    for rotation, point in states)))
+
+    for checkpoint in checkpoints:
+        if checkpoint not in references:
+            rotation, point, _, point_error = jump_series(checkpoint)
+            references[checkpoint] = (rotation, (point.real, point.imag),
+                                      float(point_error), "jump")
+
+    return [references[checkpoint] for checkpoint in checkpoints]
+
+
+def state_errors(state, reference):
+    """Find how far the rotation and outside right point of a state (as
+    they would be saved) are from a reference state."""
+    rotation, point = state
+    reference_rotation, reference_point = reference[:2]
+    with mpmath.workdps(JUMP_DIGITS):
+        rotation_error = abs(mpmath.mpf(float(rotation)) - reference_rotation)
+        point_error = mpmath.hypot(
+            mpmath.mpf(float(point[0])) - reference_point[0],
+            mpmath.mpf(float(point[1])) - reference_point[1])
+
+    return float(rotation_error), float(point_error)
+
+
+def drift_report(amount, checkpoints=None, config=default_config):
+    """Compare plain and compensated decimal values (see COMPENSATED_VALUES)
+    with much more precise values, at checkpoints up to "amount" triangles.
+
+    At each checkpoint, how far the rotation and the outside right point of
+    each mode are from the reference is shown, along with the spacing of
+    floats around the point (the smallest error a saved point can have).
+    How fast each mode calculated the triangles is shown too. The report is
+    returned as a dataframe.
+    """
+    if amount <= 0:
+        raise ValueError("A drift report needs a positive amount of "
+                         "triangles.")
+    checkpoints = sorted(set(checkpoints or default_checkpoints(amount)))
+
+    print(f"\nCalculating {checkpoints[-1]} triangles with decimal "
+          "values...")
+    plain, plain_seconds = chain_states(calculate_triangles, checkpoints,
+                                        config=config)
+    print(f"Calculating {checkpoints[-1]} triangles with compensated "
+          "values...")
+    compensated, compensated_seconds = chain_states(
+        calculate_compensated_triangles, checkpoints, config=config)
+    print("Finding the reference values...")
+    references = reference_states(checkpoints, config)
+
+    rows = []
+    for checkpoint, plain_state, compensated_state, reference in zip(
+            checkpoints, plain, compensated, references):
+        plain_errors = state_errors(plain_state, reference)
+        compensated_errors = state_errors(compensated_state, reference)
+        _, reference_point, reference_error, method = reference
+        rows.append({
+            "triangle": checkpoint,
+            "reference": method,
+            "reference error": reference_error,
+            "decimal rotation": plain_errors[0],
+            "decimal point": plain_errors[1],
+            "compensated rotation": compensated_errors[0],
+            "compensated point": compensated_errors[1],
+            "float spacing": max(float(abs(reference_point[0])),
+                                 float(abs(reference_point[1]))) * 2 ** -52
+        })
+
+    report = pd.DataFrame(rows).set_index("triangle")
+    print()
+    print(report.to_string(float_format=lambda value: f"{value:.2e}"))
+    print(f"\n{'mode':<14}{'seconds':>12}{'triangles per second':>24}")
+    for mode, seconds in (("decimal", plain_seconds),
+                          ("compensated", compensated_seconds)):
+        print(f"{mode:<14}{seconds:>12.3f}"
+              f"{checkpoints[-1] / seconds:>24.4g}")
+
+    return report
@@ -0,0 +1,175 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+import shutil
+import subprocess
+
+# Never open a window, even in the worker processes.
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+from PIL import Image
+
+from instrument import span, count
+from settings import ANIMATION_INTERVAL, EXPORT_FPS, EXPORT_PROCESSES
+
+# How many frames each worker process draws at a time.
+EXPORT_CHUNK_SIZE = 8
+
+# The figure and frame drawing function of a worker process, created once by
+# "start_worker".
+worker_plot = None
+
+
+def start_worker(points, options):
+    """Create the plot in a worker process, so each frame only has to be
+    drawn."""
+    global worker_plot
+    import matplotlib.pyplot as plt
+    from plot import create_plot
+
+    # A worker started by forking can inherit another backend.
+    plt.switch_backend("Agg")
+    fig, draw_frame, _ = create_plot(points, **options)
+    worker_plot = (fig, draw_frame)
+
+
+def render_frame(frame):
+    """Draw a frame of the plot, returning it as an RGB image array."""
+    fig, draw_frame = worker_plot
+    draw_frame(frame)
+    fig.canvas.draw()
+
+    return np.asarray(fig.canvas.buffer_rgba())[:, :, :3].copy()
+
+
+def frame_filename(path, frame):
+    """Get the filename of one frame of a PNG sequence."""
+    base, extension = os.path.splitext(path)
+
+    return f"{base}_{frame:05d}{extension}"
+
+
+def save_png_frame(path, frame):
+    """Draw a frame of the plot and save it as a PNG file."""
+    Image.fromarray(render_frame(frame)).save(frame_filename(path, frame))
+
+    return frame
+
+
+def retime_frames(images, interval, fps):
+    """Repeat or skip frames (RGB image arrays, in order) so each one is
+    shown for the interval (in milliseconds) in a video with a fixed number
+    of frames per second."""
+    # The number of video frames there should be by the end of each frame,
+    # rounded, so the timing never drifts.
+    frames_per_image = interval * fps / 1000
+    shown = 0
+    image = None
+    for number, image in enumerate(images, 1):
+        end = round(number * frames_per_image)
+        for _ in range(end - shown):
+            yield image
+        shown, last_shown = max(shown, end), end > shown
+
+    # The last frame (the finished plot) is always shown.
+    if image is not None and not last_shown:
+        yield image
+
+
+def save_gif(path, images, interval):
+    """Encode frames (RGB image arrays, in order) into a GIF with Pillow.
+
+    GIFs store how long each frame is shown, so each one is shown for the
+    interval (in milliseconds).
+    """
+    frames = [Image.fromarray(image) for image in images]
+    if frames:
+        frames[0].save(path, save_all=True, append_images=frames[1:],
+                       duration=interval, loop=0)
+
+
+def save_mp4(path, images, interval, fps):
+    """Encode frames (RGB image arrays, in order) into an MP4 with ffmpeg.
+
+    The video has the given number of frames per second, and each frame is
+    repeated (or skipped) so it is shown for the interval (in milliseconds).
+    The frames are written to ffmpeg as they are drawn, so they never all
+    have to be held in memory.
+    """
+    encoder = None
+    try:
+        for image in retime_frames(images, interval, fps):
+            if encoder is None:
+                height, width, _ = image.shape
+                encoder = subprocess.Popen(
+                    ["ffmpeg", "-y", "-loglevel", "error", "-f", "rawvideo",
+                     "-pix_fmt", "rgb24", "-s", f"{width}x{height}",
+                     "-r", str(fps), "-i", "-", "-c:v", "libx264",
+                     # Most players need an even width and height.
+                     "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+                     "-pix_fmt", "yuv420p", path],
+                    stdin=subprocess.PIPE)
+            encoder.stdin.write(image.tobytes())
+    finally:
+        if encoder is not None:
+            encoder.stdin.close()
+            if encoder.wait():
+                raise RuntimeError(f"ffmpeg could not encode \"{path}\".")
+
+
+def export_plot(points, filename, fps=EXPORT_FPS, processes=EXPORT_PROCESSES,
+                **options):
+    """Save the plot of the given points to a file, without opening a window.
+
+    Every frame of the animation is drawn with the Agg backend, spread over a
+    pool of processes. The format is chosen by the file extension: ".gif"
+    (encoded with Pillow), ".mp4" (encoded with ffmpeg), or ".png" (one file
+    per frame, with the frame number added to the filename). A plot without
+    animations is saved as a single frame. The options are the same as for
+    "create_plot" in "plot.py".
+
+    Each frame is shown for the animation interval, like in the plot window.
+    The frames per second only set the frame rate of MP4 files.
+    """
+    from plot import create_plot
+    import matplotlib.pyplot as plt
+
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in (".gif", ".mp4", ".png"):
+        raise ValueError(f"Can't export to a \"{extension}\" file.")
+    if extension == ".mp4" and shutil.which("ffmpeg") is None:
+        raise RuntimeError("ffmpeg is needed to export to MP4, but it could "
+                           "not be found.")
+
+    path = os.path.join("data", filename)
+    interval = options.get("animation_interval", ANIMATION_INTERVAL)
+    # Exact values are evaluated once here, instead of in every worker
+    # process.
+    points = points.decimals()
+
+    # Find out how many frames there are.
+    fig, _, frames = create_plot(points, **options)
+    plt.close(fig)
+    frames = max(frames, 1)
+
+    with span("export"), ProcessPoolExecutor(
+            processes, initializer=start_worker,
+            initargs=(points, options)) as executor:
+        if extension == ".png":
+            # Each worker saves its own frames.
+            for _ in executor.map(save_png_frame, [path] * frames,
+                                  range(frames),
+                                  chunksize=EXPORT_CHUNK_SIZE):
+                pass
+        else:
+            # The frames come back in order, while later frames are still
+            # being drawn.
+            images = executor.map(render_frame, range(frames),
+                                  chunksize=EXPORT_CHUNK_SIZE)
+            if extension == ".gif":
+                save_gif(path, images, interval)
+            else:
+                save_mp4(path, images, interval, fps)
+    count("frames rendered", frames)
+
+    return frames
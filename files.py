@@ -0,0 +1,12 @@
+import contextlib
+import os
+
+
+@contextlib.contextmanager
+def replace_file(path, mode="w"):
+    """Open a temporary file to write to, which replaces the file at "path"
+    once it is closed. This way the file is never left (or read) half
+    written."""
+    with open(path + ".tmp", mode) as f:
+        yield f
+    os.replace(path + ".tmp", path)
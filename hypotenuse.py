@@ -0,0 +1,121 @@
+import importlib
+
+import mpmath
+import numpy as np
+
+from settings import HYPOTENUSE
+
+# The name of the triangle number in hypotenuse expressions.
+NUMBER_SYMBOL = "n"
+# How many triangle numbers are listed in a "NotRightTriangleError".
+LISTED_TRIANGLES = 10
+
+
+class NotRightTriangleError(Exception):
+    def __init__(self, triangle_numbers):
+        # One triangle number, or every triangle number that can't be a
+        # right triangle.
+        self.triangle_numbers = [int(number) for number
+                                 in np.atleast_1d(triangle_numbers)]
+
+        listed = ", ".join(f"#{number}" for number
+                           in self.triangle_numbers[:LISTED_TRIANGLES])
+        if len(self.triangle_numbers) == 1:
+            message = f"Can't create a right triangle for triangle {listed}."
+        else:
+            message = f"Can't create right triangles for triangles {listed}"
+            unlisted = len(self.triangle_numbers) - LISTED_TRIANGLES
+            if unlisted > 0:
+                message += f" and {unlisted} more"
+            message += "."
+        super().__init__(message)
+
+
+class Hypotenuse:
+    """A custom hypotenuse for the triangles.
+
+    "decimals" is given an array of triangle numbers and returns an array of
+    their hypotenuses, so a whole range is calculated in one call. "precise"
+    and "exact" are given one triangle number, and return an mpmath number or
+    an exact sympy value.
+    """
+    def __init__(self, name, decimals, precise, exact):
+        # The setting the hypotenuse was created from.
+        self.name = name
+        self.decimals = decimals
+        self.precise = precise
+        self.exact = exact
+
+
+def compile_expression(expression):
+    """Create a hypotenuse from an expression of the triangle number "n".
+
+    The expression is parsed and compiled with sympy once, into a NumPy
+    function for decimals, an mpmath function for precise values, and a sympy
+    function for exact values.
+    """
+    import sympy
+
+    number = sympy.Symbol(NUMBER_SYMBOL, integer=True, positive=True)
+    parsed = sympy.sympify(expression, locals={NUMBER_SYMBOL: number})
+
+    numpy_function = sympy.lambdify(number, parsed, "numpy")
+    mpmath_function = sympy.lambdify(number, parsed, "mpmath")
+    sympy_function = sympy.lambdify(number, parsed, "sympy")
+
+    def decimals(numbers):
+        numbers = np.asarray(numbers, dtype=np.float64)
+        # An expression without "n" gives one value for every triangle.
+        return np.broadcast_to(
+            np.asarray(numpy_function(numbers), dtype=np.float64),
+            numbers.shape)
+
+    return Hypotenuse(
+        expression, decimals,
+        lambda number: mpmath.mpf(mpmath_function(mpmath.mpf(number))),
+        lambda number: sympy_function(sympy.Integer(number)))
+
+
+def import_function(path):
+    """Import a function given as "module:function"."""
+    module, _, name = path.partition(":")
+
+    return getattr(importlib.import_module(module), name)
+
+
+def from_function(function, name):
+    """Create a hypotenuse from a function that takes an array of triangle
+    numbers and returns an array of hypotenuses.
+
+    For precise and exact values, the function is given one triangle number
+    at a time, and should return an mpmath number or a sympy value to keep
+    all of their digits.
+    """
+    def decimals(numbers):
+        numbers = np.asarray(numbers)
+        return np.broadcast_to(
+            np.asarray(function(numbers), dtype=np.float64), numbers.shape)
+
+    return Hypotenuse(name, decimals,
+                      lambda number: mpmath.mpf(function(int(number))),
+                      lambda number: function(int(number)))
+
+
+def load_hypotenuse(setting=HYPOTENUSE):
+    """Create the hypotenuse set by HYPOTENUSE (an expression, a function,
+    or the name of a function as "module:function")."""
+    if callable(setting):
+        return from_function(setting, getattr(setting, "__name__", "function"))
+    elif ":" in setting:
+        return from_function(import_function(setting), setting)
+    else:
+        return compile_expression(setting)
+
+
+def check_right_triangles(numbers, hypotenuses, outside_leg):
+    """Raise a "NotRightTriangleError" for every triangle (of arrays of
+    triangle numbers and their hypotenuses) whose hypotenuse isn't longer
+    than the outside leg."""
+    not_right = hypotenuses <= outside_leg
+    if not_right.any():
+        raise NotRightTriangleError(np.asarray(numbers)[not_right])
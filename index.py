@@ -0,0 +1,277 @@
+import json
+import os
+
+import numpy as np
+
+from files import replace_file
+from settings import INDEX_EVERY_ROWS
+
+# Each index entry is a triangle number and the byte offset of its line.
+ENTRY_DTYPE = np.dtype([("number", "<i8"), ("offset", "<i8")])
+# How many bytes to read at a time when building an index.
+SCAN_BLOCK_SIZE = 1 << 24
+
+
+def index_path(filename):
+    """Get the path of the offset index for a csv data file."""
+    return os.path.join("data", filename + ".idx")
+
+
+def checkpoint_path(filename):
+    """Get the path of the checkpoint for a csv data file."""
+    return os.path.join("data", filename + ".ckpt")
+
+
+def table_path(filename):
+    """Get the path of the expression table of a csv data file with exact
+    values (see "symbolic.py")."""
+    return os.path.join("data", filename + ".sym")
+
+
+def read_checkpoint(filename):
+    """Read the checkpoint of a csv data file, or None if there is none.
+
+    The checkpoint holds how many rows the data file has, how many bytes long
+    it is, and the last line, so the last triangle can be read without
+    looking through the data file.
+    """
+    try:
+        with open(checkpoint_path(filename)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return
+
+
+def write_checkpoint(filename, checkpoint):
+    """Replace the checkpoint of a csv data file."""
+    with replace_file(checkpoint_path(filename)) as f:
+        json.dump(checkpoint, f)
+
+
+def read_index(filename):
+    """Read the index entries of a csv data file."""
+    try:
+        with open(index_path(filename), "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return np.empty(0, dtype=ENTRY_DTYPE)
+
+    # Leave out an entry that is still being written.
+    return np.frombuffer(data[:len(data) - len(data) % ENTRY_DTYPE.itemsize],
+                         dtype=ENTRY_DTYPE)
+
+
+def append_index_entries(filename, entries, create_new_file=False):
+    """Add entries to the end of the index of a csv data file."""
+    with open(index_path(filename), "wb" if create_new_file else "ab") as f:
+        f.write(np.asarray(entries, dtype=ENTRY_DTYPE).tobytes())
+
+
+def index_lines(data, first_offset, first_row):
+    """Find the index entries for the complete lines in some bytes.
+
+    The lines start at "first_offset" in the data file, and the first line is
+    row "first_row". The index entries, the offset and text of the last
+    complete line, and how many complete lines were found are returned.
+    """
+    line_ends = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 10)
+    if line_ends.size == 0:
+        return np.empty(0, dtype=ENTRY_DTYPE), None, None, 0
+
+    line_starts = np.concatenate(([0], line_ends[:-1] + 1))
+
+    # Only every INDEX_EVERY_ROWS rows gets an index entry.
+    rows = first_row + np.arange(line_starts.size)
+    indexed = line_starts[rows % INDEX_EVERY_ROWS == 0]
+    entries = np.empty(indexed.size, dtype=ENTRY_DTYPE)
+    for i, start in enumerate(indexed):
+        # The triangle number is the first value on a line.
+        entries[i] = (int(data[start:data.index(b",", start)]),
+                      first_offset + start)
+
+    last_line = data[line_starts[-1]:line_ends[-1]].decode()
+
+    return (entries, first_offset + int(line_starts[-1]), last_line,
+            line_starts.size)
+
+
+def first_checkpoint(f):
+    """Create the checkpoint of a data file with no rows, from the header
+    line of the open data file."""
+    f.seek(0)
+    header = f.readline()
+    if not header.endswith(b"\n"):
+        header = b""
+
+    return {"rows": 0, "size": len(header), "last_offset": None,
+            "last_line": None}
+
+
+def scan_lines(f, checkpoint):
+    """Index the complete lines of an open data file after a checkpoint.
+
+    Nothing is changed, and a partly written line at the end of the data
+    file is left out. The new index entries are returned, along with the
+    new checkpoint (whose size is where the last complete line ends).
+    """
+    checkpoint = dict(checkpoint)
+    offset = checkpoint["size"]
+    f.seek(offset)
+    incomplete = b""
+    found = [np.empty(0, dtype=ENTRY_DTYPE)]
+    for block in iter(lambda: f.read(SCAN_BLOCK_SIZE), b""):
+        data = incomplete + block
+        entries, last_offset, last_line, rows = index_lines(
+            data, offset, checkpoint["rows"])
+        found.append(entries)
+
+        if rows:
+            checkpoint["rows"] += rows
+            checkpoint["last_offset"] = last_offset
+            checkpoint["last_line"] = last_line
+            incomplete = data[data.rindex(b"\n") + 1:]
+        else:
+            incomplete = data
+        offset += len(data) - len(incomplete)
+
+    checkpoint["size"] = offset
+
+    return np.concatenate(found), checkpoint
+
+
+def build_index(filename, checkpoint=None):
+    """Index a csv data file, starting from a checkpoint if one is given.
+
+    Anything after the last complete line of the data file (left behind when
+    saving was interrupted) is removed. The new checkpoint is returned. This
+    changes the data file, so it is only done before adding to it.
+    """
+    path = os.path.join("data", filename)
+
+    with open(path, "r+b") as f:
+        if checkpoint is None:
+            checkpoint = first_checkpoint(f)
+            append_index_entries(filename, [], create_new_file=True)
+
+        entries, checkpoint = scan_lines(f, checkpoint)
+        append_index_entries(filename, entries)
+        # The last line was only partly written. Remove it.
+        f.truncate(checkpoint["size"])
+
+    write_checkpoint(filename, checkpoint)
+
+    return checkpoint
+
+
+def check_index(filename):
+    """Make sure the index of a csv data file matches the data file, before
+    adding to it.
+
+    A partly written line at the end of the data file is removed. The up to
+    date checkpoint is returned, or None if there is no data file.
+    """
+    try:
+        size = os.path.getsize(os.path.join("data", filename))
+    except FileNotFoundError:
+        return
+
+    checkpoint = read_checkpoint(filename)
+
+    if checkpoint is None or size < checkpoint["size"]:
+        # There is no index, or the data file was replaced. Index the whole
+        # data file.
+        return build_index(filename)
+    elif size > checkpoint["size"]:
+        # Data was added after the index was last updated. Only index the
+        # new data.
+        return build_index(filename, checkpoint)
+
+    return checkpoint
+
+
+def current_index(filename):
+    """Get the checkpoint and the index entries of a csv data file, for
+    reading it.
+
+    Nothing is changed, so this is safe while triangles are still being
+    added to the data file. Lines added since the index was last updated
+    are indexed in memory, and a partly written line at the end is left
+    out. (None, None) is returned if there is no data file.
+    """
+    path = os.path.join("data", filename)
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return None, None
+
+    checkpoint = read_checkpoint(filename)
+    if checkpoint is not None and size == checkpoint["size"]:
+        return checkpoint, read_index(filename)
+
+    with open(path, "rb") as f:
+        if checkpoint is None or size < checkpoint["size"]:
+            # There is no index, or the data file was replaced.
+            checkpoint = first_checkpoint(f)
+            entries = np.empty(0, dtype=ENTRY_DTYPE)
+        else:
+            # The writer adds index entries before updating the
+            # checkpoint, so leave out entries past the checkpoint.
+            entries = read_index(filename)
+            entries = entries[entries["offset"] < checkpoint["size"]]
+        new_entries, checkpoint = scan_lines(f, checkpoint)
+
+    return checkpoint, np.concatenate((entries, new_entries))
+
+
+def update_index(filename, data, create_new_file):
+    """Update the index of a csv data file after some lines were added to it.
+
+    The added lines are given as bytes. If the data file was just created,
+    the lines start with the header line.
+    """
+    if create_new_file:
+        header_length = data.index(b"\n") + 1
+        checkpoint = {"rows": 0, "size": header_length,
+                      "last_offset": None, "last_line": None}
+        append_index_entries(filename, [], create_new_file=True)
+        data = data[header_length:]
+    else:
+        checkpoint = read_checkpoint(filename)
+
+    entries, last_offset, last_line, rows = index_lines(
+        data, checkpoint["size"], checkpoint["rows"])
+    append_index_entries(filename, entries)
+
+    if rows:
+        checkpoint["rows"] += rows
+        checkpoint["last_offset"] = last_offset
+        checkpoint["last_line"] = last_line
+    checkpoint["size"] += len(data)
+    write_checkpoint(filename, checkpoint)
+
+
+def find_range_offsets(filename, start, stop):
+    """Find which bytes of a csv data file hold the triangles from "start" up
+    to (but not including) "stop".
+
+    The bytes found can also hold some triangles just before or after the
+    range.
+    """
+    checkpoint, entries = current_index(filename)
+    if entries.size == 0:
+        # The data file has no triangles.
+        return checkpoint["size"], checkpoint["size"]
+
+    # The last indexed line at or before the start of the range. The first
+    # line always has an index entry.
+    first = max(np.searchsorted(entries["number"], start, side="right") - 1, 0)
+    start_offset = entries["offset"][first]
+
+    # The first indexed line at or after the end of the range.
+    last = np.searchsorted(entries["number"], stop, side="left")
+    if last < entries.size:
+        stop_offset = entries["offset"][last]
+    else:
+        stop_offset = checkpoint["size"]
+
+    return int(start_offset), int(stop_offset)
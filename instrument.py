@@ -0,0 +1,146 @@
+import atexit
+import contextlib
+import json
+import threading
+import time
+
+from files import replace_file
+from settings import METRICS_FILE, METRICS_INTERVAL
+
+# The prefix of every metric name in the Prometheus format.
+METRICS_PREFIX = "spirals"
+
+# Nothing is measured unless there is a file to save the measurements to.
+enabled = METRICS_FILE is not None
+
+# The time of every finished span, by name, as lists of how many times the
+# span ran, its total seconds, and its longest run in seconds.
+spans = {}
+# Counters (such as how many triangles were calculated), by name.
+counters = {}
+# Spans and counters are updated by the writer thread too.
+lock = threading.Lock()
+started = time.time()
+
+# Used in place of a span when nothing is measured, so a disabled span costs
+# only a function call.
+no_span = contextlib.nullcontext()
+
+
+class Span:
+    """Time how long a block of code takes, under a name."""
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+        return self
+
+    def __exit__(self, *exception):
+        seconds = time.perf_counter() - self.start
+        with lock:
+            times = spans.setdefault(self.name, [0, 0.0, 0.0])
+            times[0] += 1
+            times[1] += seconds
+            times[2] = max(times[2], seconds)
+
+        return False
+
+
+def span(name):
+    """Time a "with" block under a name (such as "compute" or "write")."""
+    if not enabled:
+        return no_span
+
+    return Span(name)
+
+
+def count(name, amount=1):
+    """Add to a counter (such as "triangles" or "bytes written")."""
+    if not enabled:
+        return
+
+    with lock:
+        counters[name] = counters.get(name, 0) + amount
+
+
+def snapshot():
+    """Get a copy of every span and counter so far."""
+    with lock:
+        return {
+            "time": time.time(),
+            "uptime": time.time() - started,
+            "spans": {name: {"count": times[0], "seconds": times[1],
+                             "max seconds": times[2]}
+                      for name, times in spans.items()},
+            "counters": dict(counters)
+        }
+
+
+def metric_name(name):
+    """Turn a span or counter name into a Prometheus metric name."""
+    return f"{METRICS_PREFIX}_{name.replace(' ', '_')}"
+
+
+def format_prometheus(measurements):
+    """Format measurements in the Prometheus text format."""
+    lines = [f"# TYPE {METRICS_PREFIX}_uptime_seconds gauge",
+             f"{METRICS_PREFIX}_uptime_seconds {measurements['uptime']}"]
+
+    for suffix, key, kind in (("span_runs_total", "count", "counter"),
+                              ("span_seconds_total", "seconds", "counter"),
+                              ("span_max_seconds", "max seconds", "gauge")):
+        lines.append(f"# TYPE {metric_name(suffix)} {kind}")
+        for name, times in measurements["spans"].items():
+            lines.append(f"{metric_name(suffix)}{{span=\"{name}\"}} "
+                         f"{times[key]}")
+
+    for name, value in measurements["counters"].items():
+        lines.append(f"# TYPE {metric_name(name)}_total counter")
+        lines.append(f"{metric_name(name)}_total {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+def dump(previous=None):
+    """Save the measurements to METRICS_FILE, returning them.
+
+    A file ending in ".prom" is replaced with the measurements in the
+    Prometheus text format (for the node exporter's textfile collector). Any
+    other file gets a line of JSON added to it, which also has how fast each
+    counter went up since the "previous" measurements.
+    """
+    measurements = snapshot()
+
+    if METRICS_FILE.endswith(".prom"):
+        with replace_file(METRICS_FILE) as f:
+            f.write(format_prometheus(measurements))
+    else:
+        if previous is not None:
+            seconds = measurements["time"] - previous["time"]
+            measurements["rates"] = {
+                name: (value - previous["counters"].get(name, 0)) / seconds
+                for name, value in measurements["counters"].items()}
+        with open(METRICS_FILE, "a") as f:
+            f.write(json.dumps(measurements) + "\n")
+
+    return measurements
+
+
+def dump_periodically(stopped):
+    """Save the measurements every METRICS_INTERVAL seconds."""
+    previous = None
+    while not stopped.wait(METRICS_INTERVAL):
+        previous = dump(previous)
+
+
+if enabled:
+    # Save the measurements while the program runs, so long runs can be
+    # watched, and once more when it exits.
+    stop_dumping = threading.Event()
+    threading.Thread(target=dump_periodically, args=(stop_dumping,),
+                     daemon=True).start()
+    atexit.register(lambda: (stop_dumping.set(), dump()))
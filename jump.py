@@ -0,0 +1,259 @@
+import math
+
+import mpmath
+
+from batch import calculate_precise_triangles
+from config import Config, default_config
+from settings import OUTSIDE_LEG_LENGTH, JUMP_PREFIX, JUMP_DIGITS
+
+# How many terms of the Taylor series are used around each end of a jump.
+SERIES_ORDER = 14
+# How many Bernoulli number terms of the Euler-Maclaurin formula are used.
+EULER_MACLAURIN_TERMS = 4
+# How many terms are used when integrating by parts.
+INTEGRATION_TERMS = 10
+
+# The rotation and outside right point (as a complex number) of triangle
+# JUMP_PREFIX, calculated one triangle at a time. Every jump starts here.
+prefix_state = None
+# The config the series are for: the outside leg set in "settings.py",
+# without a custom hypotenuse (even if "settings.py" turns one on).
+SERIES_CONFIG = Config(custom_hypotenuse_function=False)
+
+
+def series_multiply(a, b):
+    """Multiply two Taylor series (lists of coefficients)."""
+    return [mpmath.fsum(a[j] * b[k - j] for j in range(k + 1))
+            for k in range(min(len(a), len(b)))]
+
+
+def series_divide(a, b):
+    """Divide one Taylor series by another."""
+    quotient = []
+    for k in range(min(len(a), len(b))):
+        quotient.append((a[k] - mpmath.fsum(
+            quotient[j] * b[k - j] for j in range(k))) / b[0])
+
+    return quotient
+
+
+def series_derivative(a):
+    """Differentiate a Taylor series. The result is one term shorter."""
+    return [k * a[k] for k in range(1, len(a))]
+
+
+def series_integral(a, constant):
+    """Integrate a Taylor series. The result is one term longer."""
+    return [constant] + [a[k] / (k + 1) for k in range(len(a))]
+
+
+def series_exp(a):
+    """Find the Taylor series of e to the power of a Taylor series."""
+    result = [mpmath.exp(a[0])]
+    for k in range(1, len(a)):
+        result.append(mpmath.fsum(
+            j * a[j] * result[k - j] for j in range(1, k + 1)) / k)
+
+    return result
+
+
+def series_power(exponent, order):
+    """Find the Taylor series of (1 + t) to some power."""
+    return [mpmath.binomial(exponent, k) for k in range(order + 1)]
+
+
+def rotation_step_antiderivative(x):
+    """Integrate the rotation of each triangle, atan(leg / sqrt(x))."""
+    leg = mpmath.mpf(OUTSIDE_LEG_LENGTH)
+    root = mpmath.sqrt(x)
+
+    return (x * mpmath.atan(leg / root) + leg * root
+            - leg ** 2 * mpmath.atan(root / leg))
+
+
+def smooth_rotation(x):
+    """Find the Taylor series of the smooth rotation function around x.
+
+    The series is in t, where the triangle number is x * (1 + t). Summing the
+    rotation of each triangle with the Euler-Maclaurin formula gives a smooth
+    function E, where the rotation of triangle n is E(n) plus a constant. The
+    series of E is returned, along with an estimate of how far E is from the
+    actual sum at x (the size of the first Euler-Maclaurin term left out).
+    """
+    leg = mpmath.mpf(OUTSIDE_LEG_LENGTH)
+    order = SERIES_ORDER + 2 * EULER_MACLAURIN_TERMS + 1
+
+    # The rotation of triangle x * (1 + t) is atan(u), where u is
+    # leg / sqrt(x * (1 + t)). Its series is found by integrating
+    # u' / (1 + u ** 2).
+    u = [leg / mpmath.sqrt(x) * c for c in series_power(-0.5, order)]
+    u_squared = series_multiply(u, u)
+    step = series_integral(series_divide(
+        series_derivative(u), [1 + u_squared[0]] + u_squared[1:]),
+        mpmath.atan(u[0]))
+
+    def step_derivative_series(m):
+        """The series of the m-th derivative of the rotation step, with
+        respect to the triangle number."""
+        return [step[k + m] * mpmath.ff(k + m, m) / x ** m
+                for k in range(len(step) - m)]
+
+    # The antiderivative, which has the rotation step as its derivative with
+    # respect to the triangle number (so x times it with respect to t).
+    antiderivative = series_integral(
+        [x * c for c in step], rotation_step_antiderivative(x))
+
+    smooth = [antiderivative[k] + step[k] / 2 for k in range(SERIES_ORDER + 1)]
+    for j in range(1, EULER_MACLAURIN_TERMS + 1):
+        factor = mpmath.bernoulli(2 * j) / mpmath.factorial(2 * j)
+        derivative = step_derivative_series(2 * j - 1)
+        for k in range(SERIES_ORDER + 1):
+            smooth[k] += factor * derivative[k]
+
+    j = EULER_MACLAURIN_TERMS + 1
+    error = abs(mpmath.bernoulli(2 * j) / mpmath.factorial(2 * j)
+                * step_derivative_series(2 * j - 1)[0])
+
+    return smooth, error
+
+
+def chain_terms(x, offset):
+    """Find the terms needed to sum the chain of outside legs up to x.
+
+    The outside right point moves by leg * e^(-i * rotation) with every
+    triangle (as a complex number). The rotation is "offset" plus the smooth
+    rotation function. The Euler-Maclaurin formula turns the sum of the moves
+    into an integral plus derivative terms at each end. The integral is found
+    by integrating by parts, which works well because the rotation changes
+    slowly for big triangle numbers.
+
+    The antiderivative and the derivative terms at x are returned, along with
+    the rotation there and estimates of the error in each of them.
+    """
+    leg = mpmath.mpf(OUTSIDE_LEG_LENGTH)
+    smooth, rotation_error = smooth_rotation(x)
+    rotation = offset + smooth[0]
+
+    # The move at x * (1 + t), as a series in t.
+    move = [leg * mpmath.expj(-rotation) * c for c in series_exp(
+        [0] + [-1j * c for c in smooth[1:]])]
+
+    def move_derivative(m):
+        """The m-th derivative of the move, with respect to the triangle
+        number."""
+        return move[m] * mpmath.factorial(m) / x ** m
+
+    terms = move[0] / 2
+    for j in range(1, EULER_MACLAURIN_TERMS + 1):
+        terms += (mpmath.bernoulli(2 * j) / mpmath.factorial(2 * j)
+                  * move_derivative(2 * j - 1))
+    j = EULER_MACLAURIN_TERMS + 1
+    terms_error = abs(mpmath.bernoulli(2 * j) / mpmath.factorial(2 * j)
+                      * move_derivative(2 * j - 1))
+
+    # Integrate leg * e^(-i * rotation) by parts, over the rotation. With
+    # A = leg / rotation' and D = (1 / rotation') * d/dx, the antiderivative
+    # is e^(-i * rotation) * (i * A + D(A) - i * D(D(A)) - ...).
+    slope = series_derivative(smooth)
+    amplitude = series_divide([leg * x] + [0] * (len(slope) - 1), slope)
+    antiderivative = 0
+    coefficient = 1j
+    for m in range(INTEGRATION_TERMS + 1):
+        antiderivative += coefficient * amplitude[0]
+        amplitude = series_divide(series_derivative(amplitude), slope)
+        coefficient *= -1j
+    antiderivative_error = abs(amplitude[0])
+    antiderivative *= mpmath.expj(-rotation)
+
+    return {
+        "rotation": rotation,
+        "rotation error": rotation_error,
+        "antiderivative": antiderivative,
+        "terms": terms,
+        "error": antiderivative_error + terms_error
+    }
+
+
+def calculate_prefix():
+    """Calculate the state of triangle JUMP_PREFIX one triangle at a time."""
+    global prefix_state
+
+    if prefix_state is None:
+        with mpmath.workdps(JUMP_DIGITS):
+            _, rotation, point = calculate_precise_triangles(
+                1, JUMP_PREFIX, 0, None, SERIES_CONFIG)
+            prefix_state = (rotation, mpmath.mpc(point[0], point[1]))
+
+    return prefix_state
+
+
+def jump_series(triangle_number):
+    """Find the rotation and outside right point (as a complex number) of a
+    triangle past JUMP_PREFIX with the Euler-Maclaurin formula, as mpmath
+    numbers with JUMP_DIGITS digits.
+
+    Estimates of the largest possible error in the rotation and in the point
+    are returned too. This is only for the outside leg set in "settings.py",
+    without a custom hypotenuse.
+    """
+    with mpmath.workdps(JUMP_DIGITS):
+        prefix_rotation, prefix_point = calculate_prefix()
+
+        start = chain_terms(mpmath.mpf(JUMP_PREFIX), 0)
+        # The rotation is the smooth rotation function plus a constant, which
+        # is found from the rotation at the end of the prefix.
+        offset = prefix_rotation - start["rotation"]
+        start = chain_terms(mpmath.mpf(JUMP_PREFIX), offset)
+        end = chain_terms(mpmath.mpf(triangle_number), offset)
+
+        point = (prefix_point + end["antiderivative"] - start["antiderivative"]
+                 + end["terms"] - start["terms"])
+
+        rotation_error = start["rotation error"] + end["rotation error"]
+        # An error in the rotation moves every outside leg after the prefix.
+        point_error = (start["error"] + end["error"] + rotation_error
+                       * OUTSIDE_LEG_LENGTH * (triangle_number - JUMP_PREFIX))
+
+    return end["rotation"], point, rotation_error, point_error
+
+
+def can_jump(triangle_number, config=default_config):
+    """Check if a triangle can be jumped to with the Euler-Maclaurin formula,
+    instead of being calculated one triangle at a time."""
+    return (triangle_number > JUMP_PREFIX
+            and config.custom_hypotenuse is None
+            and config.outside_leg_length == SERIES_CONFIG.outside_leg_length)
+
+
+def jump_ahead(triangle_number, config=default_config):
+    """Find the rotation and outside right point of a triangle directly.
+
+    The first JUMP_PREFIX triangles are calculated one at a time (only once).
+    Past that, the sums of the rotations and of the outside legs are found
+    with the Euler-Maclaurin formula, so any triangle number takes the same
+    amount of time. The rotation, the outside right point, and estimates of
+    the largest possible error in each of them are returned.
+
+    The series are for the outside leg set in "settings.py", so a config
+    with another outside leg is calculated one triangle at a time too.
+    """
+    if not can_jump(triangle_number, config):
+        # Close triangles (and custom hypotenuses, which can't be summed
+        # this way) are calculated one triangle at a time.
+        with mpmath.workdps(JUMP_DIGITS):
+            _, rotation, point = calculate_precise_triangles(
+                1, triangle_number, 0, None, config)
+
+        return float(rotation), (float(point[0]), float(point[1])), 0.0, 0.0
+
+    rotation, point, rotation_error, point_error = jump_series(
+        triangle_number)
+    point = (float(point.real), float(point.imag))
+
+    # Rounding to a float adds its own error.
+    rotation_error = float(rotation_error) + abs(
+        math.ulp(float(rotation)))
+    point_error = float(point_error) + max(abs(math.ulp(value))
+                                           for value in point)
+
+    return float(rotation), point, rotation_error, point_error
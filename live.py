@@ -0,0 +1,339 @@
+import io
+import os
+
+import numpy as np
+
+from instrument import span, count
+from raster import point_keys
+from store import (is_store, read_store_header, store_length, column_path,
+                   COLUMN_DTYPE)
+from triangle_batch import TriangleBatch
+from settings import (HEADERS, SHOW_TRIANGLES, PLOT_TRIANGLE_POINT,
+                      RASTER_PLOT, RASTER_SIZE, RASTER_COLORMAP, PLOT_TITLE,
+                      LIVE_INTERVAL, LIVE_COLLECTION_ROWS)
+
+# The grid starts this far from the middle in every direction, and doubles
+# whenever a point lands outside of it.
+START_HALF_WIDTH = 16.0
+
+
+class DataFileFollower:
+    """Read the triangles added to a data file since it was last read, like
+    "tail -f".
+
+    Only the new part of the data file is read and parsed each time, so
+    following a data file that is still being calculated (such as with an
+    amount of -1) costs the same no matter how big the data file gets. Only
+    complete rows are read. A partly written row is read once it is done.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.reset()
+
+    def reset(self):
+        """Start reading the data file from the beginning again."""
+        # How far into the data file has been read: a number of rows for a
+        # store, or of bytes for a csv file.
+        self.position = 0
+        # The expression table of a csv file with exact values.
+        self.table = None
+        # If the data file was replaced since it was last read (such as by a
+        # new calculation), so everything read before should be thrown away.
+        self.restarted = False
+
+    def read_new(self):
+        """Get the triangles added since the last call as a TriangleBatch of
+        decimals, or None if there are none."""
+        if is_store(self.filename):
+            return self.read_new_rows()
+
+        return self.read_new_lines()
+
+    def read_new_rows(self):
+        """Read the rows added to a store."""
+        if read_store_header(self.filename) is None:
+            return
+        # Only rows written to every column are read.
+        length = store_length(self.filename)
+        if length < self.position:
+            self.reset()
+            self.restarted = True
+        if length == self.position:
+            return
+
+        columns = {}
+        for key in HEADERS:
+            with open(column_path(self.filename, key), "rb") as f:
+                f.seek(self.position * COLUMN_DTYPE.itemsize)
+                columns[key] = np.fromfile(f, dtype=COLUMN_DTYPE,
+                                           count=length - self.position)
+        columns[HEADERS[0]] = columns[HEADERS[0]].astype(np.int64)
+        self.position = length
+
+        return TriangleBatch(columns)
+
+    def read_new_lines(self):
+        """Read the lines added to a csv file."""
+        from index import table_path
+        from utils import read_csv_data
+
+        path = os.path.join("data", self.filename)
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            return
+        if size < self.position:
+            self.reset()
+            self.restarted = True
+        if size == self.position:
+            return
+
+        with open(path, "rb") as f:
+            f.seek(self.position)
+            data = f.read(size - self.position)
+        if self.position == 0:
+            # Skip the header line.
+            header_end = data.find(b"\n") + 1
+            if header_end == 0:
+                return
+            self.position = header_end
+            data = data[header_end:]
+        complete = data.rfind(b"\n") + 1
+        if complete == 0:
+            return
+
+        if self.table is None and os.path.exists(table_path(self.filename)):
+            # The table is followed instead of loaded, since loading drops
+            # a partly written entry that is still being saved.
+            from symbolic import ExpressionTable
+            self.table = ExpressionTable(table_path(self.filename))
+        if self.table is not None:
+            # Entries are saved before the rows that refer to them.
+            self.table.read_new_entries()
+
+        triangle_dataframe = read_csv_data(io.BytesIO(data[:complete]),
+                                           names=HEADERS, table=self.table)
+        self.position += complete
+
+        return TriangleBatch.from_dataframe(triangle_dataframe).decimals()
+
+
+class LiveGrid:
+    """A grid counting how many points land in each of its cells, which grows
+    to fit the points added to it.
+
+    The grid is centered on the middle of the spirals. When a point lands
+    outside of it, the grid doubles in width, and every 2 by 2 block of cells
+    is added up into one cell. Adding points and growing only depend on the
+    new points and on the size of the grid, not on how many points were
+    added before.
+    """
+    def __init__(self, size=RASTER_SIZE, half_width=START_HALF_WIDTH):
+        # When the grid grows, each 2 by 2 block of cells has to land on one
+        # cell in the middle, so the size is rounded up to a multiple of 4.
+        self.size = -(-size // 4) * 4
+        self.half_width = half_width
+        self.grid = np.zeros((self.size, self.size), dtype=np.int64)
+
+    def extent(self):
+        """Get the extent (left, right, bottom, top) of the grid."""
+        return (-self.half_width, self.half_width, -self.half_width,
+                self.half_width)
+
+    def grow(self):
+        """Double the width of the grid, keeping it centered."""
+        half = self.size // 2
+        # Sum each 2 by 2 block of cells, then put the smaller grid in the
+        # middle of an empty grid.
+        blocks = self.grid.reshape(half, 2, half, 2).sum(axis=(1, 3))
+        self.grid = np.zeros_like(self.grid)
+        start = half // 2
+        self.grid[start:start + half, start:start + half] = blocks
+        self.half_width *= 2
+
+    def add(self, x, y):
+        """Count the points with x and y values in arrays."""
+        if len(x) == 0:
+            return
+
+        farthest = max(np.abs(x).max(), np.abs(y).max())
+        while farthest >= self.half_width:
+            self.grow()
+
+        cell_size = 2 * self.half_width / self.size
+        column = np.clip(((x + self.half_width) / cell_size).astype(np.int64),
+                         0, self.size - 1)
+        row = np.clip(((y + self.half_width) / cell_size).astype(np.int64),
+                      0, self.size - 1)
+        self.grid += np.bincount(row * self.size + column,
+                                 minlength=self.grid.size).reshape(
+            self.size, self.size)
+
+
+def live_plot(filename, show_triangles=SHOW_TRIANGLES,
+              plot_triangle_point=PLOT_TRIANGLE_POINT, raster=RASTER_PLOT,
+              interval=LIVE_INTERVAL, size=RASTER_SIZE,
+              colormap=RASTER_COLORMAP,
+              collection_rows=LIVE_COLLECTION_ROWS, show=True):
+    """Plot a data file, adding the triangles added to it on a timer.
+
+    With "raster", the points are counted on a grid (like RASTER_PLOT), so
+    refreshing and drawing take the same time no matter how many triangles
+    there are. Otherwise, new triangles (or points) are added to the last
+    collection, until it has "collection_rows" of them and a new one is
+    started, so a refresh never copies more than that. Only the last
+    collection is drawn on each refresh, on top of a saved picture of the
+    rest of the plot (blitting). The view doubles in size whenever a
+    triangle lands outside of it, and only then is everything drawn again.
+
+    The figure and a function which reads and plots the new triangles (the
+    timer's callback) are returned.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import PolyCollection
+    from matplotlib.colors import LogNorm
+
+    follower = DataFileFollower(filename)
+    x_key, y_key = point_keys(plot_triangle_point)
+
+    fig = plt.figure()
+    ax = plt.axes(aspect="equal")
+    ax.set_title(PLOT_TITLE)
+
+    if raster:
+        grid = LiveGrid(size)
+        image = ax.imshow(np.ma.masked_equal(grid.grid, 0), origin="lower",
+                          extent=grid.extent(), cmap=colormap,
+                          norm=LogNorm(vmin=1, vmax=1),
+                          interpolation="nearest")
+        fig.colorbar(image, ax=ax, label="triangles")
+    else:
+        ax.grid()
+        # The shapes in the last collection, which new ones are added to.
+        shapes = []
+        collections = []
+        # Half the width of the view, which is centered on the middle of the
+        # spirals like the grid of a raster plot.
+        view = [START_HALF_WIDTH]
+        ax.set_xlim(-START_HALF_WIDTH, START_HALF_WIDTH)
+        ax.set_ylim(-START_HALF_WIDTH, START_HALF_WIDTH)
+        # A picture of the plot without the last collection, saved whenever
+        # everything is drawn.
+        background = [None]
+
+        def save_background(event):
+            background[0] = fig.canvas.copy_from_bbox(fig.bbox)
+            # The last collection is animated, so it was left out.
+            if collections:
+                ax.draw_artist(collections[-1])
+
+        fig.canvas.mpl_connect("draw_event", save_background)
+
+    def add_shapes(new_shapes):
+        """Add triangles (or points) to the last collection, starting a new
+        collection when it is full. The collections that were filled are
+        returned."""
+        filled = []
+        while len(new_shapes):
+            if not collections or len(shapes[-1]) >= collection_rows:
+                if collections:
+                    # A full collection stops changing, so it can be part of
+                    # the saved picture of the plot.
+                    collections[-1].set_animated(False)
+                    filled.append(collections[-1])
+                if show_triangles:
+                    collections.append(ax.add_collection(PolyCollection(
+                        np.empty((0, 3, 2)), closed=True, facecolors="none",
+                        edgecolors="black", linewidths=2)))
+                else:
+                    collections.append(ax.scatter(
+                        [], [], s=5 ** 2, c="black", marker="."))
+                collections[-1].set_animated(True)
+                shapes.append(new_shapes[:0])
+
+            room = collection_rows - len(shapes[-1])
+            shapes[-1] = np.concatenate((shapes[-1], new_shapes[:room]))
+            if show_triangles:
+                collections[-1].set_verts(shapes[-1])
+            else:
+                collections[-1].set_offsets(shapes[-1])
+            new_shapes = new_shapes[room:]
+
+        return filled
+
+    def draw_shapes(new_shapes, filled):
+        """Draw the changes to the collections, growing the view if the new
+        shapes don't fit in it."""
+        farthest = np.abs(new_shapes).max() if len(new_shapes) else 0
+        grown = farthest >= view[0]
+        while farthest >= view[0]:
+            view[0] *= 2
+        if grown:
+            ax.set_xlim(-view[0], view[0])
+            ax.set_ylim(-view[0], view[0])
+
+        canvas = fig.canvas
+        if grown or background[0] is None or not canvas.supports_blit:
+            # Everything is drawn, which saves the picture again.
+            background[0] = None
+            canvas.draw_idle()
+
+            return
+
+        canvas.restore_region(background[0])
+        if filled:
+            for collection in filled:
+                ax.draw_artist(collection)
+            background[0] = canvas.copy_from_bbox(fig.bbox)
+        ax.draw_artist(collections[-1])
+        canvas.blit(fig.bbox)
+
+    def refresh():
+        with span("live refresh"):
+            triangle_data = follower.read_new()
+
+            if follower.restarted:
+                # The data file was replaced, so start over.
+                follower.restarted = False
+                if raster:
+                    grid.__init__(size)
+                else:
+                    for collection in collections:
+                        collection.remove()
+                    collections.clear()
+                    shapes.clear()
+                    view[0] = START_HALF_WIDTH
+                    ax.set_xlim(-START_HALF_WIDTH, START_HALF_WIDTH)
+                    ax.set_ylim(-START_HALF_WIDTH, START_HALF_WIDTH)
+                fig.canvas.draw_idle()
+
+            if triangle_data is None:
+                return
+            count("triangles followed", len(triangle_data))
+
+            if raster:
+                grid.add(np.asarray(triangle_data[x_key]),
+                         np.asarray(triangle_data[y_key]))
+                image.set_data(np.ma.masked_equal(grid.grid, 0))
+                image.set_extent(grid.extent())
+                image.norm.vmax = max(grid.grid.max(), 1)
+                fig.canvas.draw_idle()
+            else:
+                if show_triangles:
+                    new_shapes = triangle_data.vertices()
+                else:
+                    new_shapes = np.stack((triangle_data[x_key],
+                                           triangle_data[y_key]), axis=1)
+                draw_shapes(new_shapes, add_shapes(new_shapes))
+
+    refresh()
+    timer = fig.canvas.new_timer(interval=interval)
+    timer.add_callback(refresh)
+    timer.start()
+    # Keep the timer from being garbage collected while the window is open.
+    fig.live_timer = timer
+
+    if show:
+        plt.show()
+
+    return fig, refresh
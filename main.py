@@ -1,10 +1,15 @@
-import pandas as pd
+import argparse
+import ast
+import os
+import signal
+import sys
+import threading
 
-from plot import plot_points
-from triangle import Triangle
-from utils import (read_last_triangle, read_triangle_points, get_input,
-                   write_triangle_data)
-from settings import HEADERS, DATA_FILE, EXACT_VALUES
+# Other modules are imported only where they are used, so running the program
+# doesn't wait for libraries it won't need (such as Matplotlib when only
+# calculating triangles). This also lets settings be changed from the command
+# line before any module reads them.
+import settings
 
 
 def plot_data():
@@ -12,7 +17,29 @@ def plot_data():
     # Try to read a data file to get triangle data to plot. The constant
     # DATA_FILE can be changed to the data file name in "settings.py". The
     # program looks for the file in the "data" folder.
-    points = read_triangle_points(DATA_FILE)
+    if settings.LIVE_PLOT:
+        # Keep adding the triangles added to the data file.
+        from live import live_plot
+        live_plot(settings.DATA_FILE)
+
+        return
+    elif settings.RASTER_PLOT:
+        # Plot the density of the points, without reading them all at once.
+        from raster import plot_density
+        plot_density(settings.DATA_FILE)
+
+        return
+    elif settings.VIEW_PLOT:
+        # Only read and draw the triangles that can be seen.
+        from viewport import view_plot
+        view_plot(settings.DATA_FILE)
+
+        return
+
+    from plot import plot_points
+    from utils import read_triangle_points
+
+    points = read_triangle_points(settings.DATA_FILE)
     
     if points:
         # If data was found, plot the data. There are some plotting options
@@ -20,22 +47,97 @@ def plot_data():
         plot_points(points)
 
 
-def create_data():
-    """Calculate a range of triangles and save the data to a file."""
-    # Only save every "n" triangles.
-    save_every_n_triangles = get_input(
-        "Save every n triangles: ", int, default=1)
-    # How many triangles to calculate. A value of -1 will continue forever.
-    amount = get_input("Amount of triangles: ", int, default=15)
+def export_data(filename=None):
+    """Export the plot of saved triangle data to a file, without showing it.
+
+    The export file is asked for if it isn't given.
+    """
+    # Imported first, since it switches Matplotlib to drawing without a
+    # window.
+    from export import export_plot
+    from utils import read_triangle_points, get_input
+
+    if filename is None:
+        filename = get_input("Export file: ", str,
+                             default=settings.EXPORT_FILE)
+    points = read_triangle_points(settings.DATA_FILE)
+
+    if points:
+        print(f"\nExporting the plot to \"{filename}\"...")
+        frames = export_plot(points, filename)
+        print(f"Done. Exported {frames} frames.")
+
+
+def overlap_data(plot_triangle_point=None, show_turns=False):
+    """Measure how far saved triangles are from the Spiral of Theodorus, once
+    it is moved onto the reverse Wurzelschnecke."""
+    from overlap import measure_overlap
+    from utils import read_triangle_points
+
+    if plot_triangle_point is None:
+        plot_triangle_point = settings.PLOT_TRIANGLE_POINT
+    points = read_triangle_points(settings.DATA_FILE)
+
+    if points:
+        print(f"\nMeasuring the {plot_triangle_point} points...")
+        overlap = measure_overlap(points, plot_triangle_point)
+
+        if show_turns:
+            print(f"\n{'turn':>8}{'points':>12}{'max distance':>16}"
+                  f"{'mean distance':>16}")
+            for turn in overlap["turns"]:
+                print(f"{turn['turn']:>8}{turn['points']:>12}"
+                      f"{turn['max']:>16.3e}{turn['mean']:>16.3e}")
+
+        print(f"\nPoints measured: {overlap['points']}")
+        print(f"Turns of the Spiral of Theodorus: {len(overlap['turns'])}")
+        print(f"Largest distance: {overlap['max']:.3e}")
+        print(f"Mean distance: {overlap['mean']:.3e}")
+
+
+def create_data(save_every_n_triangles=None, amount=None, config=None):
+    """Calculate a range of triangles and save the data to a file.
+
+    The triangles are calculated with the settings of a config, and saved to
+    its data file (the ones in "settings.py" if no config is given). Anything
+    not given is asked for.
+    """
+    from batch import calculate_saved_triangles
+    from config import default_config
+    from instrument import span, count
+    from jump import can_jump
+    from shard import count_saved
+    from store import is_store
+    from triangle import Triangle
+    from triangle_batch import TriangleBatch
+    from utils import read_last_triangle, get_input, write_triangle_data
+    from settings import (BATCH_SIZE, PRECISE_BATCH_SIZE,
+                          INFINITE_BATCH_SIZE, PRECISION_DIGITS,
+                          SHARD_PROCESSES)
+
+    if config is None:
+        config = default_config
+
+    if save_every_n_triangles is None:
+        # Only save every "n" triangles.
+        save_every_n_triangles = get_input(
+            "Save every n triangles: ", int, default=1)
+    if amount is None:
+        # How many triangles to calculate. A value of -1 will continue
+        # forever.
+        amount = get_input("Amount of triangles: ", int, default=15)
     
     # If exact values will be used. Warn the user how it could take a while.
-    if EXACT_VALUES:
+    if config.exact_values:
         print("\nNote: exact values are being used. This could take a while.")
+    elif PRECISION_DIGITS is not None:
+        print(f"\nNote: values with {PRECISION_DIGITS} digits are being used. "
+              "This could take a while.")
     
     # Check if triangle data already exists. The constant DATA_FILE can be
     # changed to the data file name in "settings.py". The program looks for the
     # file in the "data" folder.
-    last_triangle_dataframe = read_last_triangle(DATA_FILE)
+    last_triangle_dataframe = read_last_triangle(config.data_file, config)
     
     if last_triangle_dataframe is not None:
         # Data has been found that already exists. Get the data from the last
@@ -61,8 +163,15 @@ def create_data():
         # data file doesn't exist yet, or none was found).
         create_new_file = True
 
-    # Create the dictionary to store the triangle data.
-    triangle_data = {key: [] for key in HEADERS}
+    table = None
+    if config.exact_values:
+        # Exact values are kept in an expression table, which is saved next
+        # to a csv data file (see "symbolic.py").
+        from symbolic import open_table
+        table = open_table(config.data_file, create_new_file)
+
+    # Create the batch to store the triangle data.
+    triangle_data = TriangleBatch.empty(0)
     
     if amount < 0:
         # If the amount of triangles to calculate is a negative number, such as
@@ -73,39 +182,68 @@ def create_data():
         # Create a data file if there is none. The calculated data will be
         # continually stored here as more triangles are calculated.
         if create_new_file:
-            write_triangle_data(pd.DataFrame({key: [] for key in HEADERS}),
-                                DATA_FILE, create_new_file)
+            write_triangle_data(TriangleBatch.empty(0), config.data_file,
+                                create_new_file, config=config)
             create_new_file = False
 
         print("\nCalculating triangles forever (until the program is "
               "interrupted)...")
-        
-        while True:
-            current_triangle = Triangle.calculate_triangle(
-                triangle_number, current_rotation,
-                previous_outside_right_point)
-
-            # Update the current rotation.
-            current_rotation = current_triangle.rotation
-            # Update the current outside right point, needed for creating the
-            # next triangle.
-            previous_outside_right_point = current_triangle.points[
-                'outside right']
-            
-            # Save the data.
-            if triangle_number % save_every_n_triangles == 0:
-                # Add this triangle's data to the dictionary used to create a
-                # pandas dataframe.
-                triangle_data = {key: [] for key in HEADERS}
-                current_triangle.save_triangle_data(triangle_data)
-                print("\nCreating dataframe...")
-                # Create the data frame for the triangle data.
-                triangle_dataframe = pd.DataFrame(triangle_data)
-                print("Done.")
-                write_triangle_data(triangle_dataframe, DATA_FILE,
-                                    create_new_file)
 
-            triangle_number += 1
+        # The data is saved in large batches by a background thread, so
+        # calculating triangles doesn't have to wait for the data file.
+        from writer import TriangleWriter
+        writer = TriangleWriter(config.data_file, create_new_file,
+                                table=table, config=config)
+
+        # Stop calculating (and save everything calculated so far) when the
+        # program is interrupted with Ctrl+C. The interruption is only
+        # noted, so a triangle is never half calculated or half saved.
+        stop_requested = threading.Event()
+        previous_handler = signal.signal(
+            signal.SIGINT, lambda signal_number, frame: stop_requested.set())
+
+        try:
+            while not stop_requested.is_set():
+                if config.exact_values:
+                    with span("compute"):
+                        current_triangle = Triangle.calculate_triangle(
+                            triangle_number, current_rotation,
+                            previous_outside_right_point, table, config)
+                    count("triangles")
+
+                    # Update the current rotation.
+                    current_rotation = current_triangle.rotation
+                    # Update the current outside right point, needed for
+                    # creating the next triangle.
+                    previous_outside_right_point = current_triangle.points[
+                        'outside right']
+
+                    # Save the data.
+                    if triangle_number % save_every_n_triangles == 0:
+                        triangle_data = TriangleBatch.empty(1, dtype=object)
+                        triangle_data.put(0, current_triangle)
+                        writer.put(triangle_data)
+
+                    triangle_number += 1
+                else:
+                    # Calculate a small batch at a time, so an interruption
+                    # is noticed quickly.
+                    (triangle_data, current_rotation,
+                     previous_outside_right_point) = (
+                        calculate_saved_triangles(
+                            triangle_number, INFINITE_BATCH_SIZE,
+                            current_rotation, previous_outside_right_point,
+                            save_every_n_triangles, config))
+                    if len(triangle_data):
+                        writer.put(triangle_data)
+
+                    triangle_number += INFINITE_BATCH_SIZE
+        finally:
+            signal.signal(signal.SIGINT, previous_handler)
+
+            print("\nSaving the remaining data...")
+            writer.close()
+            print(f"Done. Calculated up to triangle {triangle_number - 1}.")
     else:
         # Calculate a set amount of triangles.
         start = current_triangle_number
@@ -113,39 +251,373 @@ def create_data():
     
         print(f"\nCalculating triangles from {start} to {end}...")
         
-        for triangle_number in range(start, end + 1):
-            current_triangle = Triangle.calculate_triangle(
-                triangle_number, current_rotation,
-                previous_outside_right_point)
-            
-            # Update the current rotation.
-            current_rotation = current_triangle.rotation
-            # Update the current outside right point, needed for creating the
-            # next triangle.
-            previous_outside_right_point = current_triangle.points[
-                'outside right']
-            
-            # Save the data.
-            if triangle_number % save_every_n_triangles == 0:
-                # Add this triangle's data to the dictionary used to create a
-                # pandas dataframe.
-                current_triangle.save_triangle_data(triangle_data)
-    
-        print("Done.")
+        # Shards can only start quickly if they can jump ahead. Otherwise
+        # every shard would calculate all of the triangles before it with
+        # mpmath first, which is much slower than not sharding.
+        if (SHARD_PROCESSES > 1 and is_store(config.data_file)
+                and not config.exact_values and PRECISION_DIGITS is None
+                and can_jump(start + amount // SHARD_PROCESSES, config)):
+            # Split the triangles between several processes, which each save
+            # their own part of the store.
+            from shard import generate_sharded
+            generate_sharded(config.data_file, start, amount,
+                             save_every_n_triangles, SHARD_PROCESSES,
+                             create_new_file,
+                             (current_rotation, previous_outside_right_point),
+                             config)
+            print("Done.")
+
+            return
+        elif config.exact_values:
+            # Make room for every triangle that will be saved.
+            triangle_data = TriangleBatch.empty(
+                count_saved(start, end, save_every_n_triangles), dtype=object)
+            row = 0
+            for triangle_number in range(start, end + 1):
+                with span("compute"):
+                    current_triangle = Triangle.calculate_triangle(
+                        triangle_number, current_rotation,
+                        previous_outside_right_point, table, config)
+                count("triangles")
+                
+                # Update the current rotation.
+                current_rotation = current_triangle.rotation
+                # Update the current outside right point, needed for creating
+                # the next triangle.
+                previous_outside_right_point = current_triangle.points[
+                    'outside right']
+                
+                # Save the data.
+                if triangle_number % save_every_n_triangles == 0:
+                    # Add this triangle's data to the batch.
+                    triangle_data.put(row, current_triangle)
+                    row += 1
+        else:
+            # Calculate the triangles in large batches. Decimal values are
+            # calculated with NumPy, which is much faster than one triangle
+            # at a time. Each batch is saved as soon as it is calculated, so
+            # only one batch is ever held in memory.
+            print("Saving each batch as it is calculated...")
+            # Values with more digits take much more memory each.
+            batch_size = (BATCH_SIZE if PRECISION_DIGITS is None
+                          else PRECISE_BATCH_SIZE)
+            for batch_start in range(start, end + 1, batch_size):
+                batch_amount = min(batch_size, end + 1 - batch_start)
+                (batch_data, current_rotation,
+                 previous_outside_right_point) = calculate_saved_triangles(
+                    batch_start, batch_amount, current_rotation,
+                    previous_outside_right_point, save_every_n_triangles,
+                    config)
+                write_triangle_data(batch_data, config.data_file,
+                                    create_new_file, verbose=False,
+                                    table=table, config=config)
+                create_new_file = False
+
+            if not create_new_file:
+                print("Done.")
+
+                return
     
-        print("\nCreating dataframe...")
-        # Create the data frame for the triangle data.
-        triangle_dataframe = pd.DataFrame(triangle_data)
         print("Done.")
         
-        write_triangle_data(triangle_dataframe, DATA_FILE, create_new_file)
+        write_triangle_data(triangle_data, config.data_file, create_new_file,
+                            table=table, config=config)
+
+
+def convert_data(source=None, destination=None, config=None):
+    """Convert a csv data file into a store, or a store into a csv file.
+
+    A new store records the settings of a config (the ones in "settings.py"
+    if no config is given), since a csv file doesn't record the settings it
+    was calculated with. The data files are asked for if they aren't given.
+    """
+    from config import default_config
+    from store import is_store, csv_to_store, store_to_csv
+    from utils import get_input
+
+    if config is None:
+        config = default_config
+
+    if source is None:
+        source = get_input("Data file to convert: ", str,
+                           default=settings.DATA_FILE)
+
+    if destination is None:
+        if is_store(source):
+            default = os.path.splitext(source)[0] + ".csv"
+        else:
+            default = os.path.splitext(source)[0] + settings.STORE_EXTENSION
+        destination = get_input("Converted data file: ", str,
+                                default=default)
+
+    print(f"\nConverting \"{source}\" to \"{destination}\"...")
+    if is_store(source):
+        store_to_csv(source, destination)
+    else:
+        print("Note: the store will record the settings in \"settings.py\" "
+              "(which can be changed with --set), so they should be the ones "
+              f"\"{source}\" was calculated with.")
+        csv_to_store(source, destination, config)
+    print("Done.")
+
+
+def cache_data(action, amount=0):
+    """Show the stats of the triangle cache, make sure the first "amount"
+    triangles (with the settings in "settings.py") are cached, or clear the
+    cache."""
+    from cache import TriangleCache
+
+    cache = TriangleCache()
+    if action == "fill":
+        print(f"\nCaching the first {amount} triangles...")
+        cache.get(1, amount + 1, verbose=True)
+        print("Done.")
+    elif action == "clear":
+        cache.clear()
+        print("\nCleared the cache.")
+
+    stats = cache.stats()
+    print(f"\nRequests: {stats['requests']}")
+    print(f"Hit rate: {stats['hit rate']:.1%}")
+    print(f"Triangles served from the cache: {stats['triangles served']} "
+          f"({stats['triangle hit rate']:.1%})")
+    print(f"Triangles calculated: {stats['triangles calculated']}")
+    print(f"Bytes saved: {stats['bytes saved']}")
+    print(f"Entries: {stats['entries']} ({stats['bytes']} of "
+          f"{cache.max_bytes} bytes, {stats['evictions']} evicted)")
+
+
+def parse_setting(text):
+    """Parse a "NAME=VALUE" setting given on the command line.
+
+    The value is converted to the type of the setting it replaces, so
+    HYPOTENUSE=2 is the string "2" and BATCH_SIZE=1e6 is the integer 1000000.
+    Settings that are None by default take a Python literal (such as 10, True
+    or None), or a string if the value isn't one.
+    """
+    name, separator, value = text.partition("=")
+    if not separator or not name.isupper() or not hasattr(settings, name):
+        raise argparse.ArgumentTypeError(
+            f"\"{text}\" is not a setting from \"settings.py\" in the form "
+            "NAME=VALUE.")
+
+    current = getattr(settings, name)
+    if isinstance(current, str):
+        # Strings (such as hypotenuse functions and file names) are used
+        # exactly as they are written.
+        return name, value
+
+    try:
+        literal = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        literal = value
+    if current is None:
+        return name, literal
+
+    # Numbers can be given to any number setting (whole numbers become
+    # integers for integer settings, but other numbers are kept so lengths
+    # like OUTSIDE_LEG_LENGTH can be changed to 1.5).
+    number = (isinstance(literal, (int, float))
+              and not isinstance(literal, bool))
+    if isinstance(current, bool):
+        matches = isinstance(literal, bool)
+    elif isinstance(current, int):
+        matches = number
+        if number and float(literal).is_integer():
+            literal = int(literal)
+    elif isinstance(current, float):
+        matches = number
+        if matches:
+            literal = float(literal)
+    elif isinstance(current, (list, tuple)):
+        matches = isinstance(literal, (list, tuple))
+        if matches:
+            literal = type(current)(literal)
+    else:
+        matches = isinstance(literal, type(current))
+    if not matches:
+        raise argparse.ArgumentTypeError(
+            f"\"{value}\" is not a valid value for {name}, which should be "
+            f"like {current!r}.")
+
+    return name, literal
+
+
+def create_parser():
+    """Create the parser for running the program from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Calculate and plot the reverse Wurzelschnecke. Without "
+                    "a command, a menu of options is shown.")
+    parser.add_argument(
+        "--set", type=parse_setting, action="append", default=[],
+        metavar="NAME=VALUE",
+        help="change a setting from \"settings.py\" (can be repeated)")
+    commands = parser.add_subparsers(dest="command")
+
+    generate = commands.add_parser(
+        "generate", help="calculate triangles and save them to a data file")
+    generate.add_argument("--amount", type=int, required=True,
+                          help="how many triangles to calculate (-1 to "
+                               "continue until interrupted)")
+    generate.add_argument("--every", type=int, default=1,
+                          help="only save every n triangles")
+    generate.add_argument("--out", help="the data file (in the \"data\" "
+                                        "folder) to add the triangles to")
+
+    plot = commands.add_parser("plot", help="plot a data file")
+    plot.add_argument("--file", help="the data file (in the \"data\" "
+                                     "folder) to plot")
+    plot.add_argument("--raster", action="store_true",
+                      help="plot the density of the points")
+    plot.add_argument("--live", action="store_true",
+                      help="keep adding the triangles added to the data "
+                           "file, while it is being calculated")
+    plot.add_argument("--view", action="store_true",
+                      help="only draw the triangles that can be seen, "
+                           "while panning and zooming")
+    plot.add_argument("--export", metavar="FILE",
+                      help="save the plot to a .gif, .mp4 or .png file, "
+                           "without opening a window")
+
+    sweep = commands.add_parser(
+        "sweep", help="calculate triangles for every combination of outside "
+                      "leg lengths and hypotenuses, each in its own data "
+                      "file")
+    sweep.add_argument("--amount", type=int, required=True,
+                       help="how many triangles to calculate for each "
+                            "variant")
+    sweep.add_argument("--every", type=int, default=1,
+                       help="only save every n triangles")
+    sweep.add_argument("--leg", type=float, nargs="+",
+                       help="the outside leg lengths")
+    sweep.add_argument("--hypotenuse", nargs="+",
+                       help="the hypotenuses, as expressions of the triangle "
+                            "number n (\"none\" uses the triangle number)")
+    sweep.add_argument("--out", help="the data file (in the \"data\" "
+                                     "folder) the variants' data files are "
+                                     "named after")
+    sweep.add_argument("--processes", type=int,
+                       help="how many variants to calculate at the same time")
+
+    cache = commands.add_parser(
+        "cache", help="use the cache of triangles calculated with each group "
+                      "of settings")
+    cache.add_argument("action", choices=("stats", "fill", "clear"),
+                       help="show how often the cache was used, make sure "
+                            "triangles are cached, or delete every cached "
+                            "triangle")
+    cache.add_argument("--amount", type=int, default=0,
+                       help="how many triangles to cache (with \"fill\")")
+
+    drift = commands.add_parser(
+        "drift", help="compare decimal and compensated values with much "
+                      "more precise ones, to see how far they drift")
+    drift.add_argument("--amount", type=int, required=True,
+                       help="how many triangles to calculate")
+    drift.add_argument("--checkpoints", type=int, nargs="+",
+                       help="the triangles to compare at (powers of 10 by "
+                            "default)")
+
+    verify = commands.add_parser(
+        "verify", help="check that every triangle in a data file is shaped "
+                       "and ordered correctly")
+    verify.add_argument("--file", help="the data file (in the \"data\" "
+                                       "folder) to check")
+    verify.add_argument("--processes", type=int,
+                        help="how many chunks to check at the same time")
+
+    convert = commands.add_parser(
+        "convert", help="convert a data file between csv and a store")
+    convert.add_argument("source")
+    convert.add_argument("destination")
+
+    overlap = commands.add_parser(
+        "overlap", help="measure how far the points of a data file are from "
+                        "the Spiral of Theodorus")
+    overlap.add_argument("--file", help="the data file (in the \"data\" "
+                                        "folder) to measure")
+    overlap.add_argument("--point",
+                         choices=("outside left", "outside right", "inside"),
+                         help="which point of the triangles to measure")
+    overlap.add_argument("--turns", action="store_true",
+                         help="show the distances for each turn")
+
+    return parser
+
+
+def run_command(arguments):
+    """Run a command given on the command line."""
+    if arguments.command == "generate":
+        if arguments.out is not None:
+            settings.DATA_FILE = arguments.out
+        create_data(arguments.every, arguments.amount)
+    elif arguments.command == "plot":
+        if arguments.file is not None:
+            settings.DATA_FILE = arguments.file
+        if arguments.raster:
+            settings.RASTER_PLOT = True
+        if arguments.view:
+            settings.VIEW_PLOT = True
+        if arguments.live:
+            settings.LIVE_PLOT = True
+
+        if arguments.export is not None:
+            export_data(arguments.export)
+        else:
+            plot_data()
+    elif arguments.command == "sweep":
+        from config import Config
+        from sweep import sweep_configs, run_sweep
+
+        base = Config()
+        if arguments.out is not None:
+            base = base.replace(data_file=arguments.out)
+        run_sweep(sweep_configs(arguments.leg, arguments.hypotenuse, base),
+                  arguments.amount, arguments.every,
+                  arguments.processes or settings.SWEEP_PROCESSES)
+    elif arguments.command == "cache":
+        cache_data(arguments.action, arguments.amount)
+    elif arguments.command == "drift":
+        from drift import drift_report
+
+        drift_report(arguments.amount, arguments.checkpoints)
+    elif arguments.command == "verify":
+        from verify import verify_data
+
+        if arguments.file is not None:
+            settings.DATA_FILE = arguments.file
+        problems = verify_data(
+            settings.DATA_FILE,
+            processes=arguments.processes or settings.VERIFY_PROCESSES)
+        if problems:
+            sys.exit(1)
+    elif arguments.command == "convert":
+        convert_data(arguments.source, arguments.destination)
+    elif arguments.command == "overlap":
+        if arguments.file is not None:
+            settings.DATA_FILE = arguments.file
+        overlap_data(arguments.point, arguments.turns)
+
+
+def main(args=None):
+    arguments = create_parser().parse_args(args)
+    # Change the settings before any other module reads them.
+    for name, value in arguments.set:
+        setattr(settings, name, value)
+
+    if arguments.command is not None:
+        run_command(arguments)
+
+        return
 
+    from utils import get_input
 
-def main():
     # If either data should be plotted, or new data should be created.
     choice = get_input(
-        "\nOptions:\n\t[1] Plot data.\n\t[2] Create data.\nChoice: ",
-        int, default=1, valid_inputs=(1, 2))
+        "\nOptions:\n\t[1] Plot data.\n\t[2] Create data."
+        "\n\t[3] Convert data.\n\t[4] Export plot."
+        "\n\t[5] Measure overlap.\nChoice: ",
+        int, default=1, valid_inputs=(1, 2, 3, 4, 5))
     
     if choice == 1:
         # Plot triangle data saved in a data file. The constant DATA_FILE can
@@ -159,6 +631,21 @@ def main():
         # new data will be added on to the end of the csv file. If not, a new
         # file with the given name will be created (in the "data" folder).
         create_data()
+    elif choice == 3:
+        # Convert a data file between the csv format and the binary store
+        # format. Data files ending in STORE_EXTENSION (set in "settings.py")
+        # are stores, and can be used for DATA_FILE just like a csv file.
+        convert_data()
+    elif choice == 4:
+        # Save the plot (and its animations) to a GIF, MP4 or PNG files in
+        # the "data" folder, without opening a window. The format and
+        # plotting options can be set in "settings.py".
+        export_data()
+    elif choice == 5:
+        # Measure how far the plotted points are from the Spiral of
+        # Theodorus, once it is moved onto the reverse Wurzelschnecke like in
+        # the plot's animation.
+        overlap_data()
 
 
 if __name__ == "__main__":
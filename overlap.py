@@ -0,0 +1,129 @@
+import math
+
+import numpy as np
+
+from instrument import span, count
+from theodorus import theodorus_spiral, alignment_matrix, transform_points
+from settings import PLOT_TRIANGLE_POINT
+
+# How many points are measured at a time, which limits the memory used.
+OVERLAP_CHUNK_POINTS = 1000000
+# Points closer to the middle than this (squared) distance are compared with
+# every point of the start of the spiral, where the turns are too short for
+# the angle-sorted search.
+CENTER_RADIUS_SQUARED = 16
+# How many points on each side of where a point's angle lands on a turn of the
+# spiral are compared with it.
+SEARCH_NEIGHBORS = 2
+
+
+def find_nearest(points):
+    """Find the nearest point of the Spiral of Theodorus to each point, where
+    the points are in the Spiral of Theodorus' own coordinates.
+
+    The spiral's points are sorted by their angle (counting every turn), so
+    for each point, only the spiral points on the turns just inside and just
+    outside of it, near its angle, are compared with it. The distances and
+    the indices of the nearest spiral points are returned.
+    """
+    radii_squared = (points ** 2).sum(axis=1)
+    angles = np.arctan2(points[:, 1], points[:, 0])
+
+    # The spiral has to reach a turn past the farthest point.
+    amount = math.ceil((math.sqrt(radii_squared.max(initial=0))
+                        + 2 * math.pi) ** 2)
+    spiral_points, spiral_angles = theodorus_spiral(amount)
+
+    # Point "k" of the spiral is the square root of k + 1 from the middle, so
+    # the spiral point with the same distance tells which turn a point is
+    # on.
+    same_radius = np.clip(np.rint(radii_squared - 1).astype(np.int64), 0,
+                          amount)
+    turns = np.rint((spiral_angles[same_radius] - angles) / (2 * math.pi))
+
+    candidates = []
+    for turn in (-1, 0, 1):
+        position = np.searchsorted(spiral_angles,
+                                   angles + 2 * math.pi * (turns + turn))
+        for offset in range(-SEARCH_NEIGHBORS, SEARCH_NEIGHBORS):
+            candidates.append(np.clip(position + offset, 0, amount))
+    candidates = np.stack(candidates, axis=1)
+
+    offsets = spiral_points[candidates] - points[:, np.newaxis]
+    distances = np.hypot(offsets[:, :, 0], offsets[:, :, 1])
+    nearest = distances.argmin(axis=1)
+    rows = np.arange(len(points))
+    distances, nearest = distances[rows, nearest], candidates[rows, nearest]
+
+    # Points near the middle are compared with the whole start of the spiral.
+    center = np.flatnonzero(radii_squared < CENTER_RADIUS_SQUARED)
+    if center.size:
+        start = spiral_points[:2 * CENTER_RADIUS_SQUARED + 1]
+        offsets = start - points[center, np.newaxis]
+        center_distances = np.hypot(offsets[:, :, 0], offsets[:, :, 1])
+        center_nearest = center_distances.argmin(axis=1)
+        center_distances = center_distances[np.arange(center.size),
+                                            center_nearest]
+
+        closer = center_distances < distances[center]
+        distances[center[closer]] = center_distances[closer]
+        nearest[center[closer]] = center_nearest[closer]
+
+    return distances, nearest
+
+
+def measure_overlap(triangle_data, plot_triangle_point=PLOT_TRIANGLE_POINT,
+                    chunk_points=OVERLAP_CHUNK_POINTS):
+    """Measure how far a point of each triangle (of a TriangleBatch) is from
+    the Spiral of Theodorus, once it is moved onto the reverse Wurzelschnecke
+    like in the plot's animation.
+
+    The distance from each point to the nearest point of the Spiral of
+    Theodorus is found, and the largest and mean distances are returned,
+    overall and for each turn of the Spiral of Theodorus (by the turn of the
+    nearest point).
+    """
+    from raster import point_keys
+
+    x_key, y_key = point_keys(plot_triangle_point)
+    # Distances don't change when both spirals are moved, so the points are
+    # moved onto the Spiral of Theodorus instead.
+    to_spiral = np.linalg.inv(alignment_matrix())
+
+    distances = []
+    turns = []
+    with span("overlap"):
+        for start in range(0, len(triangle_data), chunk_points):
+            stop = start + chunk_points
+            points = np.stack(
+                (np.asarray(triangle_data[x_key][start:stop],
+                            dtype=np.float64),
+                 np.asarray(triangle_data[y_key][start:stop],
+                            dtype=np.float64)), axis=1)
+            chunk_distances, nearest = find_nearest(
+                transform_points(to_spiral, points))
+            distances.append(chunk_distances)
+            turns.append((theodorus_spiral(int(nearest.max()))[1][nearest]
+                          // (2 * math.pi)).astype(np.int64))
+            count("points measured", len(points))
+
+    distances = np.concatenate(distances)
+    turns = np.concatenate(turns)
+
+    # The largest and mean distance of the points on each turn.
+    points_per_turn = np.bincount(turns)
+    turn_max = np.zeros(len(points_per_turn))
+    np.maximum.at(turn_max, turns, distances)
+    turn_sums = np.bincount(turns, weights=distances)
+    measured_turns = np.flatnonzero(points_per_turn)
+
+    return {
+        "points": len(distances),
+        "max": float(distances.max()),
+        "mean": float(distances.mean()),
+        "turns": [{"turn": int(turn),
+                   "points": int(points_per_turn[turn]),
+                   "max": float(turn_max[turn]),
+                   "mean": float(turn_sums[turn] / points_per_turn[turn])}
+                  for turn in measured_turns]
+    }
@@ -1,27 +1,17 @@
 import math
-import time
 
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection, PolyCollection
 from matplotlib.patches import Polygon
 from matplotlib.animation import FuncAnimation
 import numpy as np
 
-from triangle import Triangle
+from instrument import span
+from theodorus import theodorus_points, spiral_transforms, transform_points
 from settings import (ANIMATION_INTERVAL, PLOT_TITLE,
                       SPIRAL_OF_THEODORUS_AMOUNT, SHOW_CIRCLE, SHOW_TRIANGLES,
                       ANIMATE_PLOT, CONNECT_POINTS, PLOT_TRIANGLE_POINT,
-                      SHOW_SPIRAL)
-
-
-def rotate_points(origin, x_points, y_points, angle):
-    """Rotate a list of points counterclockwise around an origin."""
-    points = [(x_points[i], y_points[i]) for i in range(len(x_points))]
-    for i, point in enumerate(points):
-        points[i] = Triangle.rotate_point(origin, point, angle)
-    x_points = [point[0] for point in points]
-    y_points = [point[1] for point in points]
-    
-    return x_points, y_points
+                      SHOW_SPIRAL, COLOR_GRADIENT)
 
 
 def plot_circle():
@@ -53,20 +43,82 @@ def plot_circle():
              marker=".", markersize=10, color=[1, 0, 1])
 
 
-def pause_plot_animation(plot_animation, seconds=1):
-    # Pause the animation.
-    plot_animation.pause()
-    time.sleep(seconds)
-    plot_animation.resume()
+def point_colors(amount, color_percent_done=False):
+    """Get the color of every point, as an array of RGB colors."""
+    colors = np.zeros((amount, 3))
+    if color_percent_done:
+        # Color using a gradient based on the progress through the points.
+        colors[:, 1] = np.arange(1, amount + 1) / amount
+
+    return colors
+
 
+def plot_collections(ax, triangles, point_index, show_triangles, connect,
+                     color_percent_done=False):
+    """Plot every triangle (or point) at once using collections.
 
-def plot_points(points, show_circle=SHOW_CIRCLE, show_triangles=SHOW_TRIANGLES,
+    Adding one artist for each triangle is very slow for many triangles.
+    Instead, all of the triangles are added as one collection, all of the
+    lines connecting points as another, and all of the points as one
+    scatter plot. The triangles are given as an array with the shape
+    (amount, 3, 2).
+
+    A function is returned which changes the collections to only show the
+    first "amount" triangles, and returns the collections (for animating).
+    """
+    colors = point_colors(len(triangles), color_percent_done)
+    plotted_points = triangles[:, point_index]
+    collections = []
+
+    if connect:
+        # Connect each point to the previous point with a straight line.
+        lines = np.stack((plotted_points[:-1], plotted_points[1:]), axis=1)
+        line_collection = LineCollection(lines, colors=colors[1:])
+        collections.append(ax.add_collection(line_collection))
+
+    # Plot either the entire triangles or just one of their points.
+    if show_triangles:
+        collections.append(ax.add_collection(PolyCollection(
+            triangles, closed=True, facecolors="none", edgecolors=colors,
+            linewidths=2)))
+    else:
+        collections.append(ax.scatter(
+            plotted_points[:, 0], plotted_points[:, 1], s=5 ** 2, c=colors,
+            marker="."))
+
+    def show_first(amount):
+        if connect:
+            line_collection.set_segments(lines[:amount - 1])
+        if show_triangles:
+            collections[-1].set_verts(triangles[:amount])
+        else:
+            collections[-1].set_offsets(plotted_points[:amount])
+
+        return collections
+
+    return show_first
+
+
+def create_plot(points, show_circle=SHOW_CIRCLE, show_triangles=SHOW_TRIANGLES,
                 animate_plot=ANIMATE_PLOT, connect=CONNECT_POINTS,
                 plot_triangle_point=PLOT_TRIANGLE_POINT,
-                show_spiral=SHOW_SPIRAL):
-    """Plot the given points."""
-    # Points is a list containing each triangle's data needed for plotting (as
-    # a list).
+                show_spiral=SHOW_SPIRAL, color_percent_done=COLOR_GRADIENT,
+                batched=True, animation_interval=ANIMATION_INTERVAL):
+    """Create a plot of a TriangleBatch, without showing it.
+
+    When not animated, the points are plotted all at once using collections,
+    unless "batched" is False (then one artist is added for each triangle).
+
+    The figure is returned, along with a function which draws a frame of the
+    animation and the number of frames (0 if nothing is animated). Drawing a
+    frame only depends on the frame number, not on the frames drawn before
+    it, and it returns the artists that changed, so only they need to be
+    redrawn.
+    """
+    # Points is a TriangleBatch of the triangles to plot. Only the points of
+    # each triangle are needed, as an array with the shape (amount, 3, 2).
+    triangles = points.vertices()
+
     if plot_triangle_point == "outside left":
         point_index = 0
     elif plot_triangle_point == "outside right":
@@ -94,13 +146,13 @@ def plot_points(points, show_circle=SHOW_CIRCLE, show_triangles=SHOW_TRIANGLES,
         ax.set_title(PLOT_TITLE)
     ax.grid()
 
-    def plot_point(index, color_percent_done=False):
-        """Animate the points being plot one by one."""
-        point = points[index]
+    def plot_point(index):
+        """Plot a single triangle (or point)."""
+        point = triangles[index]
 
         # Color using a gradient based on the current progress.
         if color_percent_done:
-            percent_done = (index + 1) / len(points)
+            percent_done = (index + 1) / len(triangles)
             plot_color = [0, percent_done, 0]
         else:
             # plot_color = [0, 0.85, 1]
@@ -108,13 +160,15 @@ def plot_points(points, show_circle=SHOW_CIRCLE, show_triangles=SHOW_TRIANGLES,
     
         if connect and index > 0:
             # Connect this point to the previous point with a straight line.
-            ax.plot([points[index - 1][point_index][0], point[point_index][0]],
-                    [points[index - 1][point_index][1], point[point_index][1]],
+            ax.plot([triangles[index - 1][point_index][0],
+                     point[point_index][0]],
+                    [triangles[index - 1][point_index][1],
+                     point[point_index][1]],
                     color=plot_color)
          
         # Plot either the entire current triangle or just its inside point.
         if show_triangles:
-            ax.add_patch(Polygon(np.array(point[:3]), closed=True, fill=False,
+            ax.add_patch(Polygon(point, closed=True, fill=False,
                                  linewidth=2, color=plot_color))
         else:
             ax.plot(point[point_index][0], point[point_index][1], marker=".",
@@ -122,100 +176,79 @@ def plot_points(points, show_circle=SHOW_CIRCLE, show_triangles=SHOW_TRIANGLES,
     
     if show_circle:
         plot_circle()
+
+    # The functions that draw each part of the animation, and how many frames
+    # each part has.
+    animations = []
     
     # If the points should be periodically shown (animated), or shown all at
     # once (not animated).
-    if animate_plot:
-        animation = FuncAnimation(fig, plot_point, frames=len(points),
-                                  interval=ANIMATION_INTERVAL, repeat=False)
+    if batched or animate_plot:
+        show_first = plot_collections(ax, triangles, point_index,
+                                      show_triangles, connect,
+                                      color_percent_done)
+        if animate_plot:
+            # Show the points one by one, by showing one more of them in
+            # each frame.
+            show_first(0)
+            animations.append(
+                (lambda frame: show_first(frame + 1), len(triangles)))
     else:
-        for i in range(len(points)):
+        for i in range(len(triangles)):
             plot_point(i)
     
     # Do an animation showing how the Spiral of Theodorus overlaps with the
     # reverse Wurzelschnecke.
     if show_spiral:
-        # How many triangles to calculate for the Spiral of Theodorus.
-        amount = SPIRAL_OF_THEODORUS_AMOUNT
-        # Start the rotation at 0 radians.
-        current_rotation = 0
-        
-        # The starting points of the Spiral of Theodorus.
-        x_points = [1, 1]
-        y_points = [0, 1]
-    
-        # Create the points for the Spiral of Theodorus.
-        for n in range(2, amount + 1):
-            # Use the previous point to calculate the next point.
-            current_point = (x_points[-1], y_points[-1] + 1)
-            
-            # Find the rotation.
-            current_rotation += math.atan(1 / math.sqrt(n - 1))
-            
-            # Rotate the point.
-            current_point = Triangle.rotate_point(
-                (x_points[-1], y_points[-1]), current_point,
-                current_rotation)
-            
-            # Add the new point to the list of points.
-            x_points.append(current_point[0])
-            y_points.append(current_point[1])
+        # The points of the Spiral of Theodorus, which are moved by each
+        # frame of the animation.
+        spiral_points = theodorus_points(SPIRAL_OF_THEODORUS_AMOUNT)
         
-        # Setup the rotation animation of the spiral.
-        flip_spiral_frames = 1
-        rotate_spiral_frames = 50
-        move_spiral_frames = 50
-        x_distance = 2
+        # Setup the animation of the spiral. Pause for a second before each
+        # step of the animation, by holding the previous frame.
+        transforms = spiral_transforms(
+            flip_frames=1, rotate_frames=50, move_frames=50,
+            hold_frames=math.ceil(1000 / animation_interval))
         spiral_line, = ax.plot([], [], linewidth=2,
                                color=[1, 0, 0])
 
-        def move_spiral(index, x_points, y_points):
-            if index == 0:
-                # Set the starting coordinates for the Spiral of Theodorus.
-                spiral_line.set_data(x_points, y_points)
-            elif index <= flip_spiral_frames:
-                pause_plot_animation(move_spiral_animation)
-                
-                # Flip the x coordinates about the line x=1. The Spiral of
-                # Theodorus will then be rotated, followed by being translated,
-                # in order to overlap with the reverse Wurzelschnecke.
-                current_x_points = spiral_line.get_xdata()
-                flipped_x_points = [-p + 2 for p in current_x_points]
-                spiral_line.set_xdata(flipped_x_points)
-                
-            elif index <= flip_spiral_frames + rotate_spiral_frames:
-                if index == flip_spiral_frames + 1:
-                    pause_plot_animation(move_spiral_animation)
-                
-                # Rotate the Spiral of Theodorus until it is lined up
-                # correctly. It will be rotated by by arctan(1) radians
-                # clockwise.
-                current_x_points = spiral_line.get_xdata()
-                current_y_points = spiral_line.get_ydata()
-                rotated_x_points, rotated_y_points = rotate_points(
-                    (1, 1), current_x_points, current_y_points,
-                    -math.atan(1) / rotate_spiral_frames)
-                spiral_line.set_data(rotated_x_points, rotated_y_points)
-            else:
-                if index == flip_spiral_frames + rotate_spiral_frames + 1:
-                    pause_plot_animation(move_spiral_animation)
-
-                # Translate the Spiral of Theodorus until it overlaps. It will
-                # be translated 2 units to the left.
-                current_x_points = spiral_line.get_xdata()
-                moved_x_points = [point - x_distance / move_spiral_frames for
-                                  point in current_x_points]
-                spiral_line.set_xdata(moved_x_points)
+        def move_spiral(frame):
+            # Hold the last frame once the spiral is in place.
+            transform = transforms[min(frame, len(transforms) - 1)]
+            spiral_line.set_data(*transform_points(
+                transform, spiral_points).T)
+
+            return [spiral_line]
+
+        animations.append((move_spiral, len(transforms)))
+
+    def draw_frame(frame):
+        """Draw a frame of every animated part of the plot."""
+        artists = []
+        for draw_part, frames in animations:
+            artists.extend(draw_part(min(frame, frames - 1)))
+
+        return artists
+
+    frames = max((frames for _, frames in animations), default=0)
+
+    return fig, draw_frame, frames
+
+
+def plot_points(points, **options):
+    """Plot a TriangleBatch (see "create_plot" for the options)."""
+    with span("render"):
+        fig, draw_frame, frames = create_plot(points, **options)
+
+    if frames:
+        # Both animations run together, and only the artists they change are
+        # redrawn each frame (blitting). The rest of the plot is drawn once.
+        animation = FuncAnimation(
+            fig, draw_frame, frames=frames,
+            interval=options.get("animation_interval", ANIMATION_INTERVAL),
+            repeat=False, blit=True)
         
-        # Create the animation. Add 1 to the number of frames, since the first
-        # one is used as a setup.
-        move_spiral_animation = FuncAnimation(
-            fig, move_spiral, frames=(flip_spiral_frames + rotate_spiral_frames
-                                      + move_spiral_frames + 1),
-            interval=ANIMATION_INTERVAL, repeat=False,
-            fargs=(x_points, y_points))
-            
         # Save the animation.
-        # move_spiral_animation.save("data/animation.gif", fps=15)
-        
+        # animation.save("data/animation.gif", fps=15)
+
     plt.show()
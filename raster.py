@@ -0,0 +1,189 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from files import replace_file
+from instrument import span, count
+from store import is_store, open_store, column_path, choose_level
+from utils import is_decimal_dataframe, parse_exact_values, find_table
+from settings import (HEADERS, PLOT_TRIANGLE_POINT, RASTER_SIZE,
+                      RASTER_CHUNK_ROWS, RASTER_COLORMAP, PLOT_TITLE)
+
+# Version of the cached grid format. Caches with another version are ignored.
+GRID_VERSION = 2
+
+
+def point_keys(plot_triangle_point=PLOT_TRIANGLE_POINT):
+    """Get the headers of the x and y values of the plotted point."""
+    if plot_triangle_point == "outside left":
+        return HEADERS[1], HEADERS[2]
+    elif plot_triangle_point == "outside right":
+        return HEADERS[3], HEADERS[4]
+    else:
+        # The inside point.
+        return HEADERS[5], HEADERS[6]
+
+
+def grid_path(filename):
+    """Get the path of the cached density grid of a data file."""
+    return os.path.join("data", filename + ".grid.npz")
+
+
+def data_file_key(filename, x_key):
+    """Get the size and modification time of a data file, which change
+    whenever triangles are added to it."""
+    if is_store(filename):
+        # Every column of a store changes together.
+        path = column_path(filename, x_key)
+    else:
+        path = os.path.join("data", filename)
+    status = os.stat(path)
+
+    return status.st_size, status.st_mtime_ns
+
+
+def read_point_chunks(filename, x_key, y_key, chunk_rows=RASTER_CHUNK_ROWS,
+                      level=0):
+    """Read the x and y values of a point from a data file (or a level of a
+    store's pyramid), a chunk at a time.
+
+    Only one chunk is held in memory at a time, no matter how big the data
+    file is.
+    """
+    if is_store(filename):
+        columns = open_store(filename, level)
+        length = len(columns[x_key])
+        for start in range(0, length, chunk_rows):
+            yield (np.asarray(columns[x_key][start:start + chunk_rows]),
+                   np.asarray(columns[y_key][start:start + chunk_rows]))
+    else:
+        table = find_table(filename)
+        for chunk in pd.read_csv(os.path.join("data", filename),
+                                 usecols=[x_key, y_key],
+                                 chunksize=chunk_rows):
+            if not is_decimal_dataframe(chunk):
+                # The csv file has exact values. Evaluate them as decimals.
+                chunk = parse_exact_values(chunk.astype(str), table)
+            chunk = chunk.astype(np.float64)
+            yield chunk[x_key].to_numpy(), chunk[y_key].to_numpy()
+
+
+def find_bounds(filename, x_key, y_key, level=0):
+    """Find the smallest and largest x and y values of a point."""
+    bounds = [np.inf, -np.inf, np.inf, -np.inf]
+    for x, y in read_point_chunks(filename, x_key, y_key, level=level):
+        if len(x):
+            bounds = [min(bounds[0], x.min()), max(bounds[1], x.max()),
+                      min(bounds[2], y.min()), max(bounds[3], y.max())]
+
+    return bounds
+
+
+def accumulate_grid(filename, plot_triangle_point=PLOT_TRIANGLE_POINT,
+                    size=RASTER_SIZE):
+    """Count how many points land in each cell of a grid.
+
+    The data file is read twice, a chunk at a time: once to find the bounds
+    of the points, and once to count them. The cells are square, and the
+    longest side of the grid has "size" cells. The grid (indexed by row then
+    column, starting from the bottom left) and its extent (left, right,
+    bottom, top) are returned, or None if the data file has no triangles.
+
+    For a store, the coarsest level of its pyramid with at least as many
+    triangles as a square grid has cells is read, and each triangle of it is
+    counted as all the triangles it stands for.
+    """
+    x_key, y_key = point_keys(plot_triangle_point)
+    level, step = choose_level(filename, size ** 2) if is_store(
+        filename) else (0, 1)
+
+    left, right, bottom, top = find_bounds(filename, x_key, y_key, level)
+    if left > right:
+        return
+
+    # Make room for the points on the far edges, and for a single point.
+    cell_size = max(right - left, top - bottom, 1e-12) / size
+    width = min(int((right - left) / cell_size) + 1, size)
+    height = min(int((top - bottom) / cell_size) + 1, size)
+
+    grid = np.zeros(width * height, dtype=np.int64)
+    for x, y in read_point_chunks(filename, x_key, y_key, level=level):
+        column = np.minimum(((x - left) / cell_size).astype(np.int64),
+                            width - 1)
+        row = np.minimum(((y - bottom) / cell_size).astype(np.int64),
+                         height - 1)
+        grid += np.bincount(row * width + column,
+                            minlength=grid.size) * step
+        count("rows binned", len(x))
+
+    extent = (float(left), float(left + width * cell_size),
+              float(bottom), float(bottom + height * cell_size))
+
+    return grid.reshape(height, width), extent
+
+
+def load_grid(filename, plot_triangle_point=PLOT_TRIANGLE_POINT,
+              size=RASTER_SIZE):
+    """Get the density grid of a data file, using the cached grid if the data
+    file hasn't changed since it was made."""
+    x_key, _ = point_keys(plot_triangle_point)
+    key = np.array([GRID_VERSION, size, *data_file_key(filename, x_key)])
+    path = grid_path(filename)
+
+    try:
+        with np.load(path) as cache:
+            if (np.array_equal(cache["key"], key)
+                    and str(cache["point"]) == plot_triangle_point):
+                return cache["grid"], tuple(cache["extent"].tolist())
+    except (OSError, KeyError, ValueError):
+        pass
+
+    with span("raster"):
+        result = accumulate_grid(filename, plot_triangle_point, size)
+    if result is not None:
+        grid, extent = result
+        with replace_file(path, "wb") as f:
+            np.savez(f, key=key, point=plot_triangle_point, grid=grid,
+                     extent=extent)
+
+    return result
+
+
+def plot_density(filename, plot_triangle_point=PLOT_TRIANGLE_POINT,
+                 size=RASTER_SIZE, colormap=RASTER_COLORMAP, show=True):
+    """Plot how many points land in each cell of a grid, on a log scale.
+
+    This can plot far more triangles than plotting every point, since the
+    data file is streamed in chunks, and only the grid is drawn.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import LogNorm
+
+    print("\nReading the data file...")
+    try:
+        result = load_grid(filename, plot_triangle_point, size)
+    except FileNotFoundError:
+        print("\nNo data file was found.")
+
+        return
+    if result is None:
+        print("\nThe data file found doesn't contain anything.")
+
+        return
+    grid, extent = result
+
+    fig = plt.figure()
+    ax = plt.axes(aspect="equal")
+    ax.set_title(PLOT_TITLE)
+    # Empty cells are left blank, since the log of 0 can't be taken.
+    image = ax.imshow(np.ma.masked_equal(grid, 0), origin="lower",
+                      extent=extent, cmap=colormap,
+                      norm=LogNorm(vmin=1, vmax=max(grid.max(), 1)),
+                      interpolation="nearest")
+    fig.colorbar(image, ax=ax, label="triangles")
+
+    if show:
+        plt.show()
+
+    return fig
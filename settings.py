@@ -10,7 +10,9 @@ SHOW_SPIRAL = True
 # How many spiral of theodorus triangles to plot when doing the animation
 # showing how the Spiral of Theodorus overlaps with the reverse Wurzelschnecke.
 SPIRAL_OF_THEODORUS_AMOUNT = 16
-# If triangle values should be exact instead of decimal approximations.
+# If triangle values should be exact instead of decimal approximations. Exact
+# values are kept as short expressions in a table, which is saved next to a
+# csv data file (ending in ".sym"), and the data file refers to its entries.
 EXACT_VALUES = False
 # Show the circle the triangles go around.
 SHOW_CIRCLE = False
@@ -24,6 +26,11 @@ CONNECT_POINTS = False
 ANIMATION_INTERVAL = 100
 # The title of the plot.
 PLOT_TITLE = "Two Spirals"
+# How many triangles a plot of a store needs at least. Only the coarsest
+# level of the store's pyramid (see PYRAMID_FACTOR) with this many triangles
+# is read, so plotting a store with a billion triangles reads about this many
+# rows. Set to None to always read every triangle.
+PLOT_MIN_POINTS = 100000
 # The file to save the triangle data to.
 DATA_FILE = "triangles.csv"
 # The header names in the csv data file. The first one, the index of the csv
@@ -32,7 +39,172 @@ HEADERS = ["number", "outside left x", "outside left y", "outside right x",
            "outside right y", "inside x", "inside y", "rotation"]
 # The length of the outside leg of the triangle.
 OUTSIDE_LEG_LENGTH = 1
-# If a custom function for calculating the hypotenuse of the triangles should
-# be used. The function is called "calculate_hypotenuse" and can be found in
-# "utils.py".
+# If a custom hypotenuse should be used for the triangles, instead of the
+# square root of the triangle number plus 1. The hypotenuse is set by
+# HYPOTENUSE.
 CUSTOM_HYPOTENUSE_FUNCTION = False
+# The custom hypotenuse of the triangles. This can be an expression of the
+# triangle number "n" (such as "sqrt(n + 1)" or "n ** 0.6 + 1"), which is
+# compiled once with sympy, so it also works with exact values and
+# PRECISION_DIGITS. It can also be a function (or the name of one, as
+# "module:function") that takes a NumPy array of triangle numbers and
+# returns an array of hypotenuses.
+HYPOTENUSE = "sqrt(n + 1)"
+# How many triangles to calculate at once when exact values aren't used.
+# Larger batches are faster, but use more memory.
+BATCH_SIZE = 1000000
+# How many triangles to calculate at once with PRECISION_DIGITS. Each value
+# is a Python object (and a long string when saved), so these batches take
+# thousands of times more memory per triangle and are kept much smaller.
+PRECISE_BATCH_SIZE = 10000
+# Data files with this extension are saved in a binary format instead of as a
+# csv file. Each column is stored as 64 bit floats in its own file, inside a
+# folder with the data file's name.
+STORE_EXTENSION = ".tri"
+# Stores also keep a pyramid of levels with fewer triangles, so zoomed out
+# plots of huge stores only read a small part of them. Each level keeps every
+# PYRAMID_FACTOR-th triangle of the level below it, and there are
+# PYRAMID_LEVELS levels (every 10th, every 100th, and so on up to every
+# 1000000th triangle).
+PYRAMID_FACTOR = 10
+PYRAMID_LEVELS = 6
+# How values in a csv data file are read. Options are: "decimal" (fast, using
+# pandas' float parser), "exact" (every value is parsed by sympy), or "auto"
+# (decimal, unless the file has exact values that can't be read as decimals).
+READ_MODE = "auto"
+# When calculating triangles forever, data is saved by a background writer.
+# How many batches of triangle data can wait to be saved before calculating
+# pauses to let the writer catch up.
+WRITER_QUEUE_SIZE = 64
+# The writer saves its data once this many rows are waiting, or once this
+# many seconds have passed since it last saved.
+WRITER_FLUSH_ROWS = 100000
+WRITER_FLUSH_SECONDS = 5
+# How often (in seconds) the writer makes sure saved data is on the disk.
+WRITER_FSYNC_SECONDS = 30
+# How many triangles to calculate at once when calculating triangles forever
+# (when exact values aren't used).
+INFINITE_BATCH_SIZE = 10000
+# Csv data files get an index next to them (ending in ".idx"), which stores
+# where the line of every this many triangles starts in the file. This is used
+# to quickly read a range of triangles.
+INDEX_EVERY_ROWS = 4096
+# How many digits to calculate triangle values to, using mpmath. This is much
+# faster than exact values, and much more precise than decimal values. Set to
+# None to use decimal values (or exact values, if EXACT_VALUES is True). Every
+# digit is saved when the data file is a csv file.
+PRECISION_DIGITS = None
+# Extra digits used when calculating with mpmath, since rounding errors build
+# up over many triangles.
+PRECISION_GUARD_DIGITS = 10
+# When jumping ahead to a triangle, this many triangles are first calculated
+# one at a time. The rest are summed with a formula that is more accurate for
+# bigger triangle numbers.
+JUMP_PREFIX = 10000
+# How many digits are used when jumping ahead.
+JUMP_DIGITS = 40
+# If decimal values are calculated with compensated sums, which keep track of
+# the rounding error of every addition to the rotation and to the chain of
+# points. This is a little slower than plain decimal values, but the rounding
+# error doesn't build up over billions of triangles. It isn't used with
+# PRECISION_DIGITS or exact values.
+COMPENSATED_VALUES = False
+# With compensated values, the rotation and outside right point are replaced
+# every this many triangles with much more precise ones found by jumping
+# ahead, so what little error is left starts over from nothing. Set to None
+# to never do this. Triangles before JUMP_PREFIX (and configs that can't jump
+# ahead) are never replaced.
+COMPENSATED_ANCHOR_EVERY = 100000000
+# The drift report (the "drift" command) checks the triangles up to this
+# number against a run with mpmath. Later triangles are checked against
+# jumping ahead, since an mpmath run that long would take too long.
+DRIFT_PRECISE_TRIANGLES = 100000
+# How many processes calculate triangles at the same time. Each process jumps
+# ahead to its own range of triangles. This is only used for decimal values
+# saved to a store (a data file ending in STORE_EXTENSION), calculated with
+# the outside leg set here and without a custom hypotenuse, and only once
+# the shards start past JUMP_PREFIX.
+SHARD_PROCESSES = 1
+# How many variants of a sweep (see "sweep.py") are calculated at the same
+# time, each in its own process. None uses every CPU core. Variants don't
+# split their triangles into shards, so this is the most processes a sweep
+# uses.
+SWEEP_PROCESSES = None
+# The file (in the "data" folder) the summary of a sweep is saved to (in csv
+# format), with a row for each variant.
+SWEEP_SUMMARY_FILE = "sweep.csv"
+# The folder (in the "data" folder) where the first triangles calculated with
+# each group of settings are cached (see "cache.py"). Asking the cache for a
+# range of triangles only calculates the ones past the end of the cached
+# ones.
+CACHE_FOLDER = "cache"
+# The most bytes the cache takes up. The entries used the longest time ago
+# are deleted to make room.
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+# Checking a data file (the "verify" command, see "verify.py") splits it into
+# chunks of this many rows (for a store) or bytes (for a csv file), which are
+# checked at the same time by a pool of processes.
+VERIFY_CHUNK_ROWS = 2000000
+VERIFY_CHUNK_BYTES = 64 * 1024 ** 2
+# How many processes check chunks at the same time. None uses every CPU core.
+VERIFY_PROCESSES = None
+# How far a value can be from what it should be when checking a data file,
+# as a fraction of how far the triangle is from the middle (plus 1), since
+# the rounding error of a float grows with its size.
+VERIFY_TOLERANCE = 1e-9
+# Color the plotted points with a gradient, from black for the first point to
+# green for the last point.
+COLOR_GRADIENT = False
+# The default file (in the "data" folder) to export the plot to. The format
+# is chosen by the extension: ".gif", ".mp4" (needs ffmpeg), or ".png" (one
+# file per frame).
+EXPORT_FILE = "animation.gif"
+# How many frames per second exported MP4 files have. Each frame of the plot
+# is still shown for ANIMATION_INTERVAL, by repeating or skipping frames.
+EXPORT_FPS = 15
+# How many processes draw frames when exporting. None uses every CPU core.
+EXPORT_PROCESSES = None
+# Plot how many triangles land in each cell of a grid (on a log color scale),
+# instead of plotting every triangle. This can plot hundreds of millions of
+# triangles, since the data file is read a chunk at a time. The grid is
+# cached next to the data file (ending in ".grid.npz"), so changing the
+# colormap doesn't read the data file again.
+RASTER_PLOT = False
+# How many cells the longest side of the grid has. For a store, only the
+# coarsest level of its pyramid with at least one triangle for each cell of a
+# square grid is read, and the counts are scaled up to match.
+RASTER_SIZE = 1000
+# How many rows of the data file are read at a time.
+RASTER_CHUNK_ROWS = 1000000
+# The Matplotlib colormap used to color the grid.
+RASTER_COLORMAP = "viridis"
+# Plot in a window which only reads and draws the triangles that can be seen,
+# so large data files can be panned and zoomed. A spatial index is built the
+# first time a data file is viewed and saved next to it (ending in
+# ".view.npz"), then built again whenever triangles are added. Only stores
+# can be viewed, since a csv file would have to be read all at once (the
+# "convert" command turns a csv file into a store).
+VIEW_PLOT = False
+# The most triangles drawn at once when viewing. If more can be seen, an
+# evenly spread part of them is drawn, until the view is zoomed in further.
+VIEW_MAX_TRIANGLES = 200000
+# Plot a data file while it is still being calculated (such as with an amount
+# of -1), adding the triangles added to it every LIVE_INTERVAL milliseconds.
+# Only the new part of the data file is read each time. With RASTER_PLOT, the
+# points are counted on a grid that grows to fit them, so refreshing takes
+# the same time no matter how long the calculation has run.
+LIVE_PLOT = False
+# How often (in milliseconds) a live plot reads the new triangles.
+LIVE_INTERVAL = 1000
+# The most triangles in each collection of a live plot. New triangles are
+# added to the last collection, and only it is redrawn each time, so this
+# limits how much is copied and drawn each time.
+LIVE_COLLECTION_ROWS = 100000
+# Save timings of each step (such as calculating, saving and reading
+# triangles) and counters (such as how many triangles were calculated) to
+# this file while the program runs. A file ending in ".prom" is kept up to
+# date in the Prometheus text format. Any other file gets a line of JSON
+# added every time. Set to None to measure nothing.
+METRICS_FILE = None
+# How often (in seconds) the measurements are saved.
+METRICS_INTERVAL = 10
@@ -0,0 +1,136 @@
+from concurrent.futures import ProcessPoolExecutor
+import math
+import time
+
+from batch import calculate_decimal_triangles, save_every, anchor_state
+from config import default_config
+from jump import jump_ahead, can_jump
+from store import (create_store, store_length, resize_store,
+                   open_store_rows, update_pyramid)
+from settings import HEADERS, BATCH_SIZE, COMPENSATED_VALUES
+
+
+def count_saved(first, last, save_every_n_triangles):
+    """Count how many triangles from "first" to "last" are saved."""
+    return (last // save_every_n_triangles
+            - (first - 1) // save_every_n_triangles)
+
+
+def generate_shard(filename, first, last, save_every_n_triangles, row,
+                   state=None, config=default_config):
+    """Calculate the triangles from "first" to "last" into rows of a store,
+    with the settings of a config.
+
+    The shard starts from the given state (a rotation and an outside right
+    point), or jumps ahead to the triangle before "first" if there is none.
+    A report of how the shard went is returned.
+    """
+    started = time.perf_counter()
+
+    if state is not None:
+        current_rotation, previous_outside_right_point = state
+        rotation_error = point_error = 0.0
+    elif first == 1:
+        current_rotation, previous_outside_right_point = 0, None
+        rotation_error = point_error = 0.0
+    else:
+        (current_rotation, previous_outside_right_point, rotation_error,
+         point_error) = jump_ahead(first - 1, config)
+        if COMPENSATED_VALUES and can_jump(first - 1, config):
+            # Compensated sums carry on from the digits a float leaves out
+            # of the jump too.
+            current_rotation, previous_outside_right_point = anchor_state(
+                first - 1)
+    start_state = (current_rotation, previous_outside_right_point)
+
+    rows = count_saved(first, last, save_every_n_triangles)
+    # Empty files can't be memory mapped.
+    columns = open_store_rows(filename, row, row + rows) if rows else {}
+
+    row = 0
+    for batch_start in range(first, last + 1, BATCH_SIZE):
+        batch_amount = min(BATCH_SIZE, last + 1 - batch_start)
+        (triangle_data, current_rotation,
+         previous_outside_right_point) = calculate_decimal_triangles(
+            batch_start, batch_amount, current_rotation,
+            previous_outside_right_point, config)
+        triangle_data = save_every(triangle_data, save_every_n_triangles)
+
+        saved = len(triangle_data[HEADERS[0]])
+        for key, column in columns.items():
+            column[row:row + saved] = triangle_data[key]
+        row += saved
+
+    for column in columns.values():
+        column.flush()
+
+    return {
+        "first": first,
+        "last": last,
+        "start state": start_state,
+        "end state": (current_rotation, previous_outside_right_point),
+        "rotation error": rotation_error,
+        "point error": point_error,
+        "seconds": time.perf_counter() - started
+    }
+
+
+def generate_sharded(filename, start, amount, save_every_n_triangles,
+                     processes, create_new_file, state=None,
+                     config=default_config):
+    """Calculate triangles in shards, spread over a pool of processes.
+
+    The triangles from "start" to "start + amount - 1" are split into one
+    shard per process. Every shard other than the first jumps ahead to its
+    first triangle, and writes into its own rows of a store. The first shard
+    continues from the given state (a rotation and an outside right point).
+
+    At each boundary between shards, the estimated error of the jump is
+    reported, along with how far the end of one shard actually is from the
+    start of the next one (which also includes the rounding error built up
+    while calculating the shard before it).
+    """
+    if create_new_file:
+        create_store(filename, config)
+    first_row = store_length(filename)
+
+    # Split the triangles into shards of (nearly) the same size.
+    end = start + amount - 1
+    shard_size = math.ceil(amount / processes)
+    shards = [(first, min(first + shard_size - 1, end))
+              for first in range(start, end + 1, shard_size)]
+
+    # Make room in the store for every shard's rows.
+    resize_store(filename, first_row + count_saved(
+        start, end, save_every_n_triangles))
+
+    try:
+        with ProcessPoolExecutor(processes) as executor:
+            futures = [executor.submit(
+                generate_shard, filename, first, last, save_every_n_triangles,
+                first_row + count_saved(start, first - 1,
+                                        save_every_n_triangles),
+                state if first == start else None, config)
+                for first, last in shards]
+            reports = [future.result() for future in futures]
+    except BaseException:
+        # Don't leave rows of zeros in the store.
+        resize_store(filename, first_row)
+        raise
+    # The shards wrote straight into the store's rows, so the pyramid is
+    # built from them once they are all done.
+    update_pyramid(filename)
+
+    print(f"\n{'boundary':>12}{'rotation error':>18}{'point error':>16}"
+          f"{'rotation gap':>16}{'point gap':>14}")
+    for previous, report in zip(reports, reports[1:]):
+        previous_rotation, previous_point = previous["end state"]
+        rotation, point = report["start state"]
+        point_gap = math.hypot(point[0] - previous_point[0],
+                               point[1] - previous_point[1])
+        print(f"{report['first']:>12}{report['rotation error']:>18.2e}"
+              f"{report['point error']:>16.2e}"
+              f"{abs(rotation - previous_rotation):>16.2e}"
+              f"{point_gap:>14.2e}")
+
+    return reports
@@ -0,0 +1,276 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import default_config
+from settings import (HEADERS, STORE_EXTENSION, PYRAMID_FACTOR,
+                      PYRAMID_LEVELS)
+
+# Written at the start of every store's header, to recognize store folders.
+STORE_FORMAT = "triangle store"
+STORE_VERSION = 1
+# Every column is stored as little endian 64 bit floats.
+COLUMN_DTYPE = np.dtype("<f8")
+# How many csv rows to convert at a time.
+CONVERT_CHUNK_SIZE = 1000000
+
+
+def is_store(filename):
+    """Check if a data file name is for a binary store."""
+    return filename.endswith(STORE_EXTENSION)
+
+
+def store_path(filename):
+    """Get the path of a store folder in the "data" folder."""
+    return os.path.join("data", filename)
+
+
+def level_path(filename, level):
+    """Get the path of the folder holding a level of a store's pyramid.
+
+    Level 0 is every triangle, and is kept in the store folder itself.
+    """
+    if level == 0:
+        return store_path(filename)
+
+    return os.path.join(store_path(filename), f"level_{level}")
+
+
+def column_path(filename, header, level=0):
+    """Get the path of the file holding one column of a store (or of a level
+    of its pyramid)."""
+    return os.path.join(level_path(filename, level),
+                        header.replace(" ", "_") + ".f64")
+
+
+def read_store_header(filename):
+    """Read the header of a store, or None if there is no store."""
+    try:
+        with open(os.path.join(store_path(filename), "header.json")) as f:
+            header = json.load(f)
+    except FileNotFoundError:
+        return
+
+    if header.get("format") != STORE_FORMAT:
+        raise ValueError(f"\"{filename}\" is not a triangle store.")
+
+    return header
+
+
+def changed_settings(filename, config=default_config):
+    """Get the names of the settings a store was calculated with that are
+    different in a config."""
+    header = read_store_header(filename)
+    if header is None:
+        return []
+
+    # Stores from before a setting was saved aren't checked for it.
+    return [name for name, value in config.store_settings().items()
+            if header["settings"].get(name, value) != value]
+
+
+def create_store(filename, config=default_config):
+    """Create an empty store, replacing any store with the same name. The
+    settings of the config are saved in its header."""
+    os.makedirs(store_path(filename), exist_ok=True)
+
+    # The header records the schema and the settings used to calculate the
+    # triangles, so a store can be checked before more data is added to it.
+    header = {
+        "format": STORE_FORMAT,
+        "version": STORE_VERSION,
+        "dtype": COLUMN_DTYPE.str,
+        "columns": HEADERS,
+        "settings": config.store_settings(),
+        # Each level of the pyramid keeps every "factor"-th row of the level
+        # below it.
+        "pyramid": {"factor": PYRAMID_FACTOR, "levels": PYRAMID_LEVELS}
+    }
+    with open(os.path.join(store_path(filename), "header.json"), "w") as f:
+        json.dump(header, f, indent=4)
+
+    for level in range(PYRAMID_LEVELS + 1):
+        os.makedirs(level_path(filename, level), exist_ok=True)
+        for key in HEADERS:
+            open(column_path(filename, key, level), "wb").close()
+
+
+def pyramid_steps(header):
+    """Get how many triangles apart the rows of each level of a store's
+    pyramid are, starting with level 0 (every row)."""
+    # Stores made before pyramids were added only have level 0.
+    pyramid = header.get("pyramid", {"factor": 1, "levels": 0})
+
+    return [pyramid["factor"] ** level
+            for level in range(pyramid["levels"] + 1)]
+
+
+def level_length(length, step):
+    """Get how many rows a level keeps of a store with "length" rows."""
+    # The first row is always kept.
+    return -(-length // step)
+
+
+def store_length(filename, level=0):
+    """Get how many triangles are saved in a store (or in a level of its
+    pyramid)."""
+    # If writing was interrupted, some columns can be longer than others. Only
+    # rows that made it into every column count.
+    return min(os.path.getsize(column_path(filename, key, level))
+               for key in HEADERS) // COLUMN_DTYPE.itemsize
+
+
+def write_rows(path, row, values, sync=False):
+    """Write an array to a column file, starting at a row."""
+    with open(path, "r+b") as f:
+        # Write after the last complete row, which drops any partly written
+        # row left behind by an interrupted write.
+        f.seek(row * COLUMN_DTYPE.itemsize)
+        f.truncate()
+        # Write straight from the array, without copying it to bytes.
+        f.write(memoryview(np.ascontiguousarray(values, dtype=COLUMN_DTYPE)))
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def update_pyramid(filename, sync=False):
+    """Bring every level of a store's pyramid up to date with its rows.
+
+    Only the rows added since a level was last updated are read, so the
+    levels are built as triangles are added. A level left behind by an
+    interrupted write catches up too.
+    """
+    steps = pyramid_steps(read_store_header(filename))
+    if len(steps) == 1:
+        return
+    length = store_length(filename)
+    columns = open_store(filename)
+
+    for level, step in enumerate(steps[1:], start=1):
+        row = min(store_length(filename, level), level_length(length, step))
+        for key in HEADERS:
+            write_rows(column_path(filename, key, level), row,
+                       columns[key][row * step:length:step], sync)
+
+
+def append_to_store(filename, triangle_data, sync=False):
+    """Add triangle data (anything with a column for each header, such as a
+    TriangleBatch or a dataframe) to a store, and to its pyramid.
+
+    If "sync" is True, the data is synced to the disk before returning.
+    """
+    length = store_length(filename)
+
+    for key in HEADERS:
+        write_rows(column_path(filename, key), length, triangle_data[key],
+                   sync)
+
+    update_pyramid(filename, sync)
+
+
+def resize_store(filename, length):
+    """Make every column of a store hold a number of rows.
+
+    New rows are filled with zeros, to be written later (see
+    "open_store_rows"). The pyramid isn't changed until "update_pyramid" is
+    called once the rows are written.
+    """
+    for key in HEADERS:
+        with open(column_path(filename, key), "r+b") as f:
+            f.truncate(length * COLUMN_DTYPE.itemsize)
+
+
+def open_store_rows(filename, start, stop):
+    """Memory map rows of every column of a store, so they can be written."""
+    return {key: np.memmap(column_path(filename, key), dtype=COLUMN_DTYPE,
+                           mode="r+", offset=start * COLUMN_DTYPE.itemsize,
+                           shape=(stop - start,))
+            for key in HEADERS}
+
+
+def open_store(filename, level=0):
+    """Memory map every column of a store (or of a level of its pyramid).
+
+    Only the pages of a column that are actually used get read from disk, so
+    a slice of a huge store is cheap.
+    """
+    length = store_length(filename, level)
+
+    columns = {}
+    for key in HEADERS:
+        if length == 0:
+            # Empty files can't be memory mapped.
+            columns[key] = np.empty(0, dtype=COLUMN_DTYPE)
+        else:
+            columns[key] = np.memmap(column_path(filename, key, level),
+                                     dtype=COLUMN_DTYPE, mode="r",
+                                     shape=(length,))
+
+    return columns
+
+
+def choose_level(filename, min_rows):
+    """Find the coarsest level of a store's pyramid with at least "min_rows"
+    rows, returning the level and how many triangles apart its rows are.
+
+    Levels that aren't up to date (after an interrupted write) are skipped.
+    """
+    if min_rows is None:
+        return 0, 1
+    length = store_length(filename)
+
+    steps = pyramid_steps(read_store_header(filename))
+    for level in reversed(range(1, len(steps))):
+        rows = level_length(length, steps[level])
+        if rows >= min_rows and store_length(filename, level) == rows:
+            return level, steps[level]
+
+    return 0, 1
+
+
+def store_to_dataframe(columns, start=None, stop=None):
+    """Create a dataframe from a slice of a store's columns."""
+    triangle_dataframe = pd.DataFrame(
+        {key: np.array(columns[key][start:stop]) for key in HEADERS})
+    triangle_dataframe[HEADERS[0]] = triangle_dataframe[
+        HEADERS[0]].astype(np.int64)
+
+    return triangle_dataframe
+
+
+def csv_to_store(csv_filename, store_filename, config=default_config):
+    """Convert a csv data file into a store.
+
+    A csv file doesn't record the settings its triangles were calculated
+    with, so the store's header gets the settings of the config, which
+    should be the ones the csv file was calculated with.
+    """
+    create_store(store_filename, config)
+
+    for chunk in pd.read_csv(os.path.join("data", csv_filename),
+                             chunksize=CONVERT_CHUNK_SIZE, dtype=str):
+        try:
+            chunk = chunk.astype(np.float64)
+        except ValueError:
+            # The csv file has exact values. Evaluate them as decimals.
+            from utils import parse_exact_values, find_table
+            chunk = parse_exact_values(
+                chunk, find_table(csv_filename)).astype(np.float64)
+        append_to_store(store_filename, chunk)
+
+
+def store_to_csv(store_filename, csv_filename):
+    """Convert a store into a csv data file."""
+    columns = open_store(store_filename)
+    length = len(columns[HEADERS[0]])
+
+    path = os.path.join("data", csv_filename)
+    pd.DataFrame({key: [] for key in HEADERS}).to_csv(path, index=False)
+    with open(path, "a") as f:
+        for start in range(0, length, CONVERT_CHUNK_SIZE):
+            store_to_dataframe(
+                columns, start, start + CONVERT_CHUNK_SIZE).to_csv(
+                    f, header=False, index=False)
@@ -0,0 +1,162 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import contextlib
+import io
+import itertools
+import os
+import time
+
+import pandas as pd
+
+import settings
+from config import default_config
+from hypotenuse import NotRightTriangleError
+from settings import SWEEP_PROCESSES, SWEEP_SUMMARY_FILE
+
+# The hypotenuse given to a sweep to use the triangle number instead of a
+# custom hypotenuse.
+NO_HYPOTENUSE = "none"
+
+
+def variant_file(data_file, config):
+    """Get the data file of a variant of a sweep, next to the sweep's data
+    file, such as "triangles.sweep-1a2b3c4d5e6f.csv".
+
+    The name holds a hash of the settings that change the triangles, so
+    running a sweep again only adds to the data files of variants with the
+    same settings, instead of adding triangles calculated with other
+    settings to them.
+    """
+    from cache import cache_key
+
+    name, extension = os.path.splitext(data_file)
+    key, _ = cache_key(config)
+
+    return f"{name}.sweep-{key[:12]}{extension}"
+
+
+def sweep_configs(leg_lengths=None, hypotenuses=None, base=default_config):
+    """Create a config for every combination of outside leg lengths and
+    hypotenuses (expressions, or NO_HYPOTENUSE), each saving to its own data
+    file. Settings that aren't swept are the base config's."""
+    if not leg_lengths:
+        leg_lengths = [base.outside_leg_length]
+    if not hypotenuses:
+        hypotenuses = [base.hypotenuse if base.custom_hypotenuse_function
+                       else NO_HYPOTENUSE]
+
+    configs = []
+    for leg_length, hypotenuse in itertools.product(leg_lengths,
+                                                    hypotenuses):
+        changes = {"outside_leg_length": leg_length,
+                   "custom_hypotenuse_function": hypotenuse != NO_HYPOTENUSE}
+        if hypotenuse != NO_HYPOTENUSE:
+            changes["hypotenuse"] = hypotenuse
+        config = base.replace(**changes)
+        configs.append(config.replace(
+            data_file=variant_file(base.data_file, config)))
+
+    return configs
+
+
+def last_saved_triangle(data_file):
+    """Get the number of the last triangle saved to a data file, or 0 if
+    none are saved."""
+    from utils import read_last_triangle
+
+    last_triangle_dataframe = read_last_triangle(data_file)
+    if last_triangle_dataframe is None:
+        return 0
+
+    return int(last_triangle_dataframe["number"].tolist()[0])
+
+
+def limit_processes():
+    """Keep each variant in its own process. The variants already use every
+    process the sweep is allowed, so they aren't split into shards."""
+    settings.SHARD_PROCESSES = 1
+
+
+def run_variant(config, amount, save_every_n_triangles):
+    """Calculate the triangles of one variant of a sweep, adding them to its
+    data file. A report of how the variant went is returned.
+
+    Decimal triangles are saved a batch at a time, so a variant that fails
+    can still have saved some of them. How far the data file got is read
+    from the data file itself, and such a data file is marked as partial.
+    """
+    from main import create_data
+
+    error = None
+    first_saved = last_saved_triangle(config.data_file)
+    started = time.perf_counter()
+    # The variants run at the same time, so their messages are left out.
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            create_data(save_every_n_triangles, amount, config)
+        except Exception as variant_error:
+            # One variant failing doesn't stop the others, and is shown in
+            # the summary.
+            error = variant_error
+    seconds = time.perf_counter() - started
+    last_saved = last_saved_triangle(config.data_file)
+
+    return {
+        "data file": config.data_file,
+        "outside leg": config.outside_leg_length,
+        "hypotenuse": (config.hypotenuse if config.custom_hypotenuse_function
+                       else NO_HYPOTENUSE),
+        "triangles": last_saved - first_saved,
+        "seconds": seconds,
+        "triangles per second": (last_saved - first_saved) / seconds,
+        # The data file has triangles, but not every one it should have.
+        "partial": error is not None and last_saved > 0,
+        "first error": (error.triangle_numbers[0]
+                        if isinstance(error, NotRightTriangleError)
+                        else None),
+        "error": (f"{type(error).__name__}: {error}" if error is not None
+                  else "")
+    }
+
+
+def run_sweep(configs, amount, save_every_n_triangles=1,
+              processes=SWEEP_PROCESSES, summary_file=SWEEP_SUMMARY_FILE):
+    """Calculate "amount" triangles for each config, spread over a pool of at
+    most "processes" processes.
+
+    Each variant adds its triangles to its own data file, like the "generate"
+    command. A summary of every variant (how fast it went, and the first
+    triangle that couldn't be a right triangle) is printed, saved to the
+    summary file in the "data" folder (unless it is None), and returned as a
+    dataframe.
+    """
+    if amount <= 0:
+        raise ValueError("A sweep needs a positive amount of triangles.")
+
+    print(f"\nCalculating {amount} triangles for {len(configs)} variants...")
+    reports = [None] * len(configs)
+    with ProcessPoolExecutor(processes,
+                             initializer=limit_processes) as executor:
+        futures = {executor.submit(run_variant, config, amount,
+                                   save_every_n_triangles): row
+                   for row, config in enumerate(configs)}
+        for future in as_completed(futures):
+            report = future.result()
+            reports[futures[future]] = report
+            print(f"Finished \"{report['data file']}\".")
+
+    summary = pd.DataFrame(reports, index=pd.RangeIndex(
+        1, len(reports) + 1, name="variant"))
+    summary["first error"] = summary["first error"].astype("Int64")
+    print()
+    print(summary.drop(columns="error").to_string(
+        float_format=lambda value: f"{value:.6g}", na_rep=""))
+    for variant, error in summary["error"].items():
+        if error:
+            print(f"Variant {variant} failed: {error}")
+
+    if summary_file is not None:
+        path = os.path.join("data", summary_file)
+        summary.to_csv(path)
+        print(f"\nSaved the summary to \"{path}\".")
+
+    return summary
@@ -0,0 +1,326 @@
+import ast
+import os
+import threading
+
+import mpmath
+import sympy
+
+from index import table_path
+from settings import PRECISION_GUARD_DIGITS
+
+# References to table entries are named with this prefix and the position of
+# the entry, such as "e12".
+REFERENCE_PREFIX = "e"
+# How many digits are calculated when a value is turned into a float.
+FLOAT_DIGITS = 17
+
+# The functions and constants an entry of a table file can use: the ones
+# "write_expression" writes. Only these are looked up when reading an entry,
+# so a table file can't run any other code.
+ENTRY_FUNCTIONS = {
+    "Integer": sympy.Integer, "Rational": sympy.Rational,
+    "Float": sympy.Float, "Add": sympy.Add, "Mul": sympy.Mul,
+    "Pow": sympy.Pow,
+    # sympy's functions, such as "atan", "cos" and "sin".
+    **{name: getattr(sympy, name) for name in dir(sympy)
+       if isinstance(getattr(sympy, name), sympy.FunctionClass)}
+}
+# Such as "pi" and "E".
+ENTRY_CONSTANTS = {name: getattr(sympy, name) for name in dir(sympy)
+                   if isinstance(getattr(sympy, name), sympy.Basic)
+                   and getattr(sympy, name).is_Atom}
+
+
+class Reference(sympy.Symbol):
+    """A real number that refers to an entry of an expression table.
+
+    sympy treats it like any other symbol, so it can be used in expressions
+    (which are then added to the table). Its decimal value is calculated by
+    the table when it is asked for, such as with "float" or "evalf".
+    """
+    def __new__(cls, table, index):
+        # Symbols are normally cached by name, but references with the same
+        # name can belong to different tables.
+        reference = sympy.Symbol.__xnew__(cls, f"{REFERENCE_PREFIX}{index}",
+                                          real=True)
+        reference.table = table
+        reference.index = index
+
+        return reference
+
+    def __float__(self):
+        return float(self.table.evaluate(self.index, FLOAT_DIGITS))
+
+    def _eval_evalf(self, prec):
+        digits = mpmath.libmp.prec_to_dps(prec)
+
+        return sympy.Float(self.table.evaluate(self.index, digits), digits)
+
+
+class References(dict):
+    """The references of a table by name, used when reading a table file."""
+    def __init__(self, table):
+        super().__init__()
+        self.table = table
+
+    def __missing__(self, name):
+        # Other names (such as "exp") are sympy's.
+        if not (name.startswith(REFERENCE_PREFIX)
+                and name[len(REFERENCE_PREFIX):].isdigit()):
+            raise KeyError(name)
+
+        return self.table.references[int(name[len(REFERENCE_PREFIX):])]
+
+
+def write_expression(expression):
+    """Write an expression as Python code that creates it again with sympy.
+
+    This is much faster than sympy's printers, and much faster to read back
+    than parsing with sympy.
+    """
+    if isinstance(expression, Reference):
+        return expression.name
+    elif expression.is_Integer:
+        return f"Integer({expression.p})"
+    elif expression.is_Rational:
+        return f"Rational({expression.p}, {expression.q})"
+    elif expression.is_Atom:
+        # Such as floats and pi.
+        return sympy.srepr(expression)
+
+    return (f"{type(expression).__name__}("
+            f"{', '.join(write_expression(arg) for arg in expression.args)})")
+
+
+def read_expression(line, references):
+    """Create an expression again from a line written by "write_expression",
+    looking up the references in "references" (see "References").
+
+    The line is parsed, not run, and only the calls, numbers and names that
+    "write_expression" writes are allowed. Anything else raises a
+    ValueError.
+    """
+    def constant(node, kind):
+        # bools are ints too, but aren't ever written.
+        return isinstance(node, ast.Constant) and type(node.value) is kind
+
+    def build(node):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            if (node.func.id == "Float" and len(node.args) == 1
+                    and constant(node.args[0], str)
+                    and [keyword.arg for keyword in node.keywords]
+                    == ["precision"]
+                    and constant(node.keywords[0].value, int)):
+                # Floats are written as a string of their digits and their
+                # precision, such as "Float('1.5', precision=53)". Only
+                # Float gets a string, since other functions would parse it
+                # with sympy (which runs it).
+                return sympy.Float(node.args[0].value,
+                                   precision=node.keywords[0].value.value)
+            elif (node.func.id in ENTRY_FUNCTIONS
+                  and node.func.id != "Float" and not node.keywords):
+                return ENTRY_FUNCTIONS[node.func.id](
+                    *(build(arg) for arg in node.args))
+        elif isinstance(node, ast.Name):
+            if node.id in ENTRY_CONSTANTS:
+                return ENTRY_CONSTANTS[node.id]
+            try:
+                return references[node.id]
+            except (KeyError, IndexError):
+                # Not a reference to an earlier entry.
+                pass
+        elif constant(node, int):
+            return node.value
+        elif (isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub)
+              and constant(node.operand, int)):
+            return -node.operand.value
+
+        raise ValueError(f"\"{line}\" isn't an expression written by "
+                         "\"write_expression\".")
+
+    try:
+        tree = ast.parse(line, mode="eval")
+    except SyntaxError as error:
+        raise ValueError(f"\"{line}\" isn't an expression.") from error
+
+    return build(tree.body)
+
+
+def evaluate_expression(expression, values):
+    """Calculate the value of an expression with mpmath, using the values of
+    the table entries it refers to."""
+    if isinstance(expression, Reference):
+        return values[expression.index]
+    elif expression.is_Rational:
+        return mpmath.mpf(expression.p) / expression.q
+    elif expression.is_Add:
+        return mpmath.fsum(evaluate_expression(arg, values)
+                           for arg in expression.args)
+    elif expression.is_Mul:
+        return mpmath.fprod(evaluate_expression(arg, values)
+                            for arg in expression.args)
+    elif expression.is_Pow:
+        return mpmath.power(*(evaluate_expression(arg, values)
+                              for arg in expression.args))
+    elif expression.is_Function and hasattr(mpmath,
+                                            expression.func.__name__):
+        # Such as "atan", "cos" and "sin".
+        return getattr(mpmath, expression.func.__name__)(
+            *(evaluate_expression(arg, values) for arg in expression.args))
+
+    # Anything else (such as pi) is evaluated by sympy.
+    decimals = {reference: sympy.Float(values[reference.index],
+                                       mpmath.mp.dps)
+                for reference in expression.atoms(Reference)}
+
+    return mpmath.mpf(expression.xreplace(decimals).evalf(mpmath.mp.dps))
+
+
+class ExpressionTable:
+    """A table of exact values, where each expression is only stored once.
+
+    An entry refers to earlier entries with references, so a value that is
+    built up over many triangles (such as the rotation, which is a sum of
+    every triangle's angle) is a short expression of earlier entries,
+    instead of one huge expression. Repeated expressions (such as "sqrt(n)"
+    and "atan(1/sqrt(n))") are only added once.
+
+    Decimal values are only calculated when they are asked for, with as many
+    digits as are needed, and are cached for each number of digits.
+
+    The entries of a table for a data file are saved to a file next to it,
+    one entry per line.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        # The expressions, and references to them, by position.
+        self.entries = []
+        self.references = []
+        # The position of each expression.
+        self.positions = {}
+        # How many entries are saved to the file.
+        self.saved = 0
+        # How many bytes of the file have been read.
+        self.read_bytes = 0
+        # Lists of the values of the first entries, by number of digits.
+        self.values = {}
+        # Entries are added by the thread calculating triangles, while the
+        # writer thread saves them.
+        self.lock = threading.RLock()
+
+    def add(self, expression):
+        """Get a reference to an expression, adding the expression to the
+        table if it isn't in it yet."""
+        if isinstance(expression, Reference):
+            return expression
+        expression = sympy.sympify(expression)
+
+        with self.lock:
+            index = self.positions.get(expression)
+            if index is None:
+                index = len(self.entries)
+                self.entries.append(expression)
+                self.references.append(Reference(self, index))
+                self.positions[expression] = index
+
+            return self.references[index]
+
+    def evaluate(self, index, digits):
+        """Get the value of an entry as an mpmath number, with "digits"
+        correct digits."""
+        with self.lock:
+            values = self.values.setdefault(digits, [])
+            # Each entry only refers to earlier entries, so the entries are
+            # evaluated in order, and each is only evaluated once.
+            with mpmath.workdps(digits + PRECISION_GUARD_DIGITS):
+                while len(values) <= index:
+                    values.append(evaluate_expression(
+                        self.entries[len(values)], values))
+
+            return values[index]
+
+    def save(self, sync=False):
+        """Add the entries that aren't saved yet to the table's file.
+
+        If "sync" is True, the file is synced to the disk before returning.
+        """
+        if self.path is None:
+            return
+
+        with self.lock:
+            lines = "".join(write_expression(expression) + "\n"
+                            for expression in self.entries[self.saved:])
+            with open(self.path, "a") as f:
+                f.write(lines)
+                if sync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            self.saved = len(self.entries)
+
+    def load(self):
+        """Read the entries saved in the table's file."""
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            # Drop a partly written line left behind by an interruption.
+            complete = data.rfind(b"\n") + 1
+            f.truncate(complete)
+
+        self.add_lines(data[:complete])
+
+    def read_new_entries(self):
+        """Read the entries added to the table's file since it was last read.
+
+        Unlike "load", the file isn't changed, so this can follow a table that
+        another process is still adding entries to. A partly written last
+        line is left to be read next time.
+        """
+        with open(self.path, "rb") as f:
+            f.seek(self.read_bytes)
+            data = f.read()
+
+        self.add_lines(data[:data.rfind(b"\n") + 1])
+
+    def add_lines(self, data):
+        """Add the entries of complete lines read from the table's file."""
+        references = References(self)
+        for line in data.decode().splitlines():
+            try:
+                expression = read_expression(line, references)
+            except ValueError as error:
+                raise ValueError(f"\"{self.path}\" has an entry that isn't "
+                                 f"an expression: {error}") from None
+            self.positions[expression] = len(self.entries)
+            self.entries.append(expression)
+            self.references.append(Reference(self, len(self.references)))
+        self.saved = len(self.entries)
+        self.read_bytes += len(data)
+
+
+# The tables of data files, so each table file is only read once.
+tables = {}
+# The table used when calculating triangles without a data file.
+shared_table = ExpressionTable()
+
+
+def open_table(filename, create_new_file=False):
+    """Get the expression table of a data file, reading its file if needed.
+
+    If "create_new_file" is True, the table starts empty, replacing any table
+    file. Stores save decimal values, so their table isn't saved.
+    """
+    from store import is_store
+
+    if filename in tables and not create_new_file:
+        return tables[filename]
+
+    if is_store(filename):
+        table = ExpressionTable()
+    else:
+        table = ExpressionTable(table_path(filename))
+        if create_new_file or not os.path.exists(table.path):
+            open(table.path, "w").close()
+        else:
+            table.load()
+    tables[filename] = table
+
+    return table
@@ -0,0 +1,42 @@
+import os
+
+import numpy as np
+
+from batch import calculate_triangles
+from cache import TriangleCache, cache_key, cache_file
+from config import Config
+from settings import HEADERS
+
+
+def test_cache_only_calculates_missing_tail(data_folder):
+    cache = TriangleCache()
+    cache.get(1, 1001)
+    triangle_data = cache.get(500, 1501)
+    stats = cache.stats()
+    assert stats["triangles calculated"] == 1500
+    assert stats["triangles served"] == 501
+
+    expected, _, _ = calculate_triangles(1, 1500, 0, None)
+    for key in HEADERS:
+        assert np.array_equal(triangle_data[key], expected[key][499:])
+
+
+def test_cache_evicts_least_recently_used(data_folder):
+    first, second, third = (Config(outside_leg_length=leg)
+                            for leg in (1, 2, 3))
+    cache = TriangleCache()
+    cache.get(1, 1001, first)
+    entry_bytes = cache.total_bytes()
+
+    # Room for two entries.
+    cache = TriangleCache(max_bytes=int(2.5 * entry_bytes))
+    cache.get(1, 1001, second)
+    # Using the first entry again makes the second the least recently used.
+    cache.get(1, 11, first)
+    cache.get(1, 1001, third)
+
+    keys = {cache_key(config)[0] for config in (first, third)}
+    assert set(cache.index["entries"]) == keys
+    assert cache.stats()["evictions"] == 1
+    assert not os.path.exists(os.path.join(
+        "data", cache_file(cache_key(second)[0], second)))
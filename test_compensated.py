@@ -0,0 +1,48 @@
+import numpy as np
+
+import batch
+from batch import calculate_compensated_triangles, CompensatedFloat
+from drift import reference_states, state_errors
+from settings import HEADERS, JUMP_PREFIX
+
+
+def test_compensated_anchors_in_a_loop(monkeypatch):
+    # Far more anchors than Python's recursion limit, with a stand-in for
+    # jumping ahead so the test stays quick.
+    anchors = []
+    monkeypatch.setattr(batch, "COMPENSATED_ANCHOR_EVERY", 50)
+    monkeypatch.setattr(batch, "anchor_state", lambda triangle_number: (
+        anchors.append(triangle_number) or (CompensatedFloat(0.0),
+                                            (CompensatedFloat(0.0),
+                                             CompensatedFloat(0.0)))))
+
+    start, amount = JUMP_PREFIX + 1, 100000
+    triangle_data, _, _ = calculate_compensated_triangles(start, amount, 0.0,
+                                                          (0.0, 0.0))
+
+    assert np.array_equal(triangle_data[HEADERS[0]],
+                          np.arange(start, start + amount))
+    assert anchors == list(range(JUMP_PREFIX + 50, start + amount - 1, 50))
+
+
+def test_compensated_anchors_once_per_interval(monkeypatch):
+    every = JUMP_PREFIX // 2
+    amount = 3 * JUMP_PREFIX
+    anchors = []
+    anchor_state = batch.anchor_state
+    monkeypatch.setattr(batch, "COMPENSATED_ANCHOR_EVERY", every)
+    monkeypatch.setattr(batch, "anchor_state", lambda triangle_number: (
+        anchors.append(triangle_number) or anchor_state(triangle_number)))
+    reference = reference_states([amount])[0]
+
+    # The state is replaced at the same triangles however the range is
+    # split into batches.
+    for batch_size in (amount, 7000):
+        anchors.clear()
+        rotation, point = 0.0, None
+        for start in range(1, amount + 1, batch_size):
+            triangle_data, rotation, point = calculate_compensated_triangles(
+                start, min(batch_size, amount + 1 - start), rotation, point)
+
+        assert anchors == list(range(JUMP_PREFIX + every, amount, every))
+        assert max(state_errors((rotation, point), reference)) <= 1e-13
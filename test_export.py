@@ -0,0 +1,15 @@
+import pytest
+
+from export import retime_frames
+
+
+@pytest.mark.parametrize("interval, fps, expected", [
+    # Each frame is shown for 1.5 video frames.
+    (100, 15, [0, 0, 1, 2, 3, 3]),
+    # Each frame is shown for 3 video frames.
+    (100, 30, [0, 0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3]),
+    # Frames are skipped, but the last one is still shown.
+    (20, 15, [1, 3]),
+])
+def test_frames_are_shown_for_the_interval(interval, fps, expected):
+    assert list(retime_frames(range(4), interval, fps)) == expected
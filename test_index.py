@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+
+from batch import calculate_triangles
+from index import (build_index, check_index, current_index, read_checkpoint,
+                   read_index, checkpoint_path, index_path)
+from utils import write_triangle_data, read_triangle_range
+from settings import HEADERS
+
+
+def test_index_survives_partial_line(data_folder):
+    filename = "triangles.csv"
+    path = data_folder / filename
+    triangle_data, rotation, point = calculate_triangles(1, 10000, 0, None)
+    write_triangle_data(triangle_data, filename, True, verbose=False)
+    size = os.path.getsize(path)
+    checkpoint = read_checkpoint(filename)
+    assert checkpoint["rows"] == 10000 and checkpoint["size"] == size
+
+    # Leave half of a line at the end, as an interruption would.
+    with open(path, "ab") as f:
+        f.write(b"10001,1.5,2.")
+
+    # Reading doesn't change the data file or its index.
+    reading_checkpoint, entries = current_index(filename)
+    assert reading_checkpoint == checkpoint
+    assert np.array_equal(entries, read_index(filename))
+    triangles = read_triangle_range(filename, 9990, 10010)
+    assert list(triangles[HEADERS[0]]) == list(range(9990, 10001))
+    assert os.path.getsize(path) == size + 12
+    assert read_checkpoint(filename) == checkpoint
+
+    # Adding to the data file removes the half line first.
+    assert check_index(filename) == checkpoint
+    assert os.path.getsize(path) == size
+    triangle_data, _, _ = calculate_triangles(10001, 5000, rotation, point)
+    write_triangle_data(triangle_data, filename, False, verbose=False)
+
+    # The index matches one built from the whole data file.
+    entries = read_index(filename)
+    checkpoint = read_checkpoint(filename)
+    os.remove(index_path(filename))
+    os.remove(checkpoint_path(filename))
+    assert build_index(filename) == checkpoint
+    assert np.array_equal(read_index(filename), entries)
+    assert checkpoint["rows"] == 15000
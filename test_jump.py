@@ -0,0 +1,15 @@
+from drift import reference_states, state_errors
+from jump import jump_ahead
+from settings import JUMP_PREFIX
+
+
+def test_jump_ahead_matches_mpmath():
+    triangle_number = 2 * JUMP_PREFIX
+    rotation, point, rotation_error, point_error = jump_ahead(
+        triangle_number)
+    reference = reference_states([triangle_number])[0]
+
+    assert reference[3] == "mpmath"
+    errors = state_errors((rotation, point), reference)
+    assert errors[0] <= rotation_error
+    assert errors[1] <= point_error
@@ -0,0 +1,27 @@
+import argparse
+
+import pytest
+
+from main import parse_setting
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("HYPOTENUSE=2", ("HYPOTENUSE", "2")),
+    ("BATCH_SIZE=1e6", ("BATCH_SIZE", 1000000)),
+    ("OUTSIDE_LEG_LENGTH=1.5", ("OUTSIDE_LEG_LENGTH", 1.5)),
+    ("VERIFY_TOLERANCE=1", ("VERIFY_TOLERANCE", 1.0)),
+    ("LIVE_PLOT=True", ("LIVE_PLOT", True)),
+    ("PRECISION_DIGITS=50", ("PRECISION_DIGITS", 50)),
+    ("METRICS_FILE=metrics.prom", ("METRICS_FILE", "metrics.prom")),
+])
+def test_setting_keeps_its_type(text, expected):
+    name, value = parse_setting(text)
+    assert (name, value) == expected
+    assert type(value) is type(expected[1])
+
+
+@pytest.mark.parametrize("text", [
+    "LIVE_PLOT=1", "BATCH_SIZE=many", "NOT_A_SETTING=1", "BATCH_SIZE"])
+def test_invalid_setting(text):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_setting(text)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch import calculate_triangles
+from config import Config
+from store import (csv_to_store, store_to_csv, open_store, read_store_header,
+                   changed_settings, pyramid_steps, choose_level)
+from utils import write_triangle_data, read_last_triangle
+from settings import HEADERS, PYRAMID_FACTOR
+
+
+def test_store_round_trip(data_folder):
+    config = Config(outside_leg_length=2)
+    triangle_data, _, _ = calculate_triangles(1, 3000, 0, None, config)
+    write_triangle_data(triangle_data, "triangles.csv", True, verbose=False)
+
+    # The store records the settings it is told the csv file was
+    # calculated with.
+    csv_to_store("triangles.csv", "triangles.tri", config)
+    assert read_store_header("triangles.tri")["settings"][
+        "OUTSIDE_LEG_LENGTH"] == 2
+    assert changed_settings("triangles.tri", config) == []
+    assert changed_settings("triangles.tri", Config()) == [
+        "OUTSIDE_LEG_LENGTH"]
+
+    # Every value survives the store, and converting back to csv.
+    columns = open_store("triangles.tri")
+    for key in HEADERS:
+        assert np.array_equal(columns[key], triangle_data[key])
+    store_to_csv("triangles.tri", "copy.csv")
+    assert (pd.read_csv(data_folder / "copy.csv", float_precision="round_trip")
+            .equals(pd.read_csv(data_folder / "triangles.csv",
+                                float_precision="round_trip")))
+    assert read_last_triangle("triangles.tri", config)[
+        HEADERS[0]].tolist() == [3000]
+    # Triangles calculated with other settings are never added to it.
+    with pytest.raises(ValueError):
+        read_last_triangle("triangles.tri", Config())
+
+
+def test_pyramid_follows_appends(data_folder):
+    triangle_data, rotation, point = calculate_triangles(1, 2345, 0, None)
+    write_triangle_data(triangle_data, "triangles.tri", True, verbose=False)
+    more_data, _, _ = calculate_triangles(2346, 1000, rotation, point)
+    write_triangle_data(more_data, "triangles.tri", False, verbose=False)
+
+    # Each level keeps every PYRAMID_FACTOR-th triangle of the level below
+    # it, including the ones added later.
+    numbers = np.arange(1, 3346)
+    for level, step in enumerate(pyramid_steps(
+            read_store_header("triangles.tri"))):
+        assert np.array_equal(open_store("triangles.tri", level)[HEADERS[0]],
+                              numbers[::step])
+
+    # Plots read the coarsest level with enough triangles.
+    assert choose_level("triangles.tri", 300) == (1, PYRAMID_FACTOR)
+    assert choose_level("triangles.tri", 30) == (2, PYRAMID_FACTOR ** 2)
+    assert choose_level("triangles.tri", 4000) == (0, 1)
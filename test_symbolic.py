@@ -0,0 +1,44 @@
+import pytest
+import sympy
+
+from symbolic import ExpressionTable
+
+
+def test_table_save_load_and_partial_line(data_folder):
+    path = str(data_folder / "triangles.csv.sym")
+    table = ExpressionTable(path)
+    root = table.add(sympy.sqrt(2))
+    angle = table.add(sympy.atan(1 / root))
+    table.add(sympy.cos(angle) + sympy.Float(1.5) * sympy.pi)
+    assert table.add(sympy.sqrt(2)) is root
+    table.save()
+
+    # Leave half of an entry at the end, as an interruption would.
+    with open(path, "a") as f:
+        f.write("Add(e0, ")
+
+    loaded = ExpressionTable(path)
+    loaded.load()
+    assert len(loaded.entries) == 3
+    assert [str(entry) for entry in loaded.entries] == [
+        str(entry) for entry in table.entries]
+    assert float(loaded.references[2]) == pytest.approx(
+        float(sympy.cos(sympy.atan(1 / sympy.sqrt(2))) + 1.5 * sympy.pi))
+    with open(path) as f:
+        assert f.read().endswith(")\n")
+
+
+@pytest.mark.parametrize("line", [
+    "sympify('_' + '_import_' + \"_('os').system('echo PWNED')\")",
+    "__import__('os')",
+    "cos('x')",
+    "e5",
+    "Integer(1).func"
+])
+def test_table_file_cant_run_code(data_folder, line):
+    path = str(data_folder / "triangles.csv.sym")
+    with open(path, "w") as f:
+        f.write(f"Integer(1)\n{line}\n")
+
+    with pytest.raises(ValueError):
+        ExpressionTable(path).load()
@@ -0,0 +1,31 @@
+import pytest
+
+from batch import calculate_triangles
+from triangle import Triangle
+from settings import HEADERS
+
+
+def test_batch_matches_scalar():
+    amount = 2000
+    triangle_data, rotation, point = calculate_triangles(1, amount, 0, None)
+
+    current_rotation, previous_outside_right_point = 0, None
+    for row in range(amount):
+        triangle = Triangle.calculate_triangle(
+            row + 1, current_rotation, previous_outside_right_point)
+        current_rotation = triangle.rotation
+        previous_outside_right_point = triangle.points["outside right"]
+
+        # The rotations match exactly, and the points to within about 1e-16
+        # times the number of triangles (see "calculate_triangles").
+        assert triangle_data[HEADERS[7]][row] == current_rotation
+        allowed = 1e-16 * (row + 1) * (1 + abs(
+            previous_outside_right_point[0]) + abs(
+            previous_outside_right_point[1]))
+        for name, (x, y) in triangle.points.items():
+            x_key, y_key = (f"{name} x", f"{name} y")
+            assert abs(triangle_data[x_key][row] - x) <= allowed
+            assert abs(triangle_data[y_key][row] - y) <= allowed
+
+    assert rotation == current_rotation
+    assert point == pytest.approx(previous_outside_right_point, abs=1e-12)
@@ -0,0 +1,26 @@
+from batch import calculate_triangles
+from utils import write_triangle_data
+from verify import verify_data
+
+
+def test_verify_finds_corrupted_row(data_folder):
+    triangle_data, _, _ = calculate_triangles(1, 5000, 0, None)
+    write_triangle_data(triangle_data, "triangles.csv", True, verbose=False)
+    assert verify_data("triangles.csv", processes=2) == {}
+
+    # Move the inside point of triangle 1234 (on line 1235, after the
+    # header).
+    path = data_folder / "triangles.csv"
+    lines = path.read_text().splitlines(keepends=True)
+    values = lines[1234].split(",")
+    assert values[0] == "1234"
+    values[5] = str(float(values[5]) + 0.001)
+    lines[1234] = ",".join(values)
+    path.write_text("".join(lines))
+
+    problems = verify_data("triangles.csv", processes=2)
+    assert set(problems) == {"inside leg", "right angle"}
+    for problem in problems.values():
+        assert problem["row"] == 1234
+        assert problem["triangle"] == 1234
+        assert problem["wrong rows"] == 1
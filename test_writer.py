@@ -0,0 +1,42 @@
+import os
+import signal
+import threading
+
+import numpy as np
+
+import settings
+
+from batch import calculate_triangles
+from config import Config
+from main import create_data
+from utils import read_triangle_range
+from settings import HEADERS
+
+
+def test_interrupted_run_is_saved_and_resumed(data_folder, monkeypatch):
+    config = Config(data_file="triangles.csv")
+    # Small batches, so there isn't much to save when interrupted.
+    monkeypatch.setattr(settings, "INFINITE_BATCH_SIZE", 100)
+
+    # Interrupt calculating forever, as Ctrl+C would.
+    timer = threading.Timer(0.5, os.kill, (os.getpid(), signal.SIGINT))
+    timer.start()
+    try:
+        create_data(1, -1, config)
+    finally:
+        timer.cancel()
+
+    # Everything calculated before the interruption was saved.
+    saved = read_triangle_range("triangles.csv", 1, 10 ** 12)
+    last = int(saved[HEADERS[0]].iloc[-1])
+    assert last > 0
+    assert np.array_equal(saved[HEADERS[0]], np.arange(1, last + 1))
+
+    # Calculating more carries on from the last saved triangle, with the
+    # same values as calculating them all at once.
+    create_data(1, 1000, config)
+    saved = read_triangle_range("triangles.csv", 1, 10 ** 12)
+    triangle_data, _, _ = calculate_triangles(1, last + 1000, 0, None)
+    for key in HEADERS:
+        assert np.allclose(saved[key], triangle_data[key], rtol=0,
+                           atol=1e-9)
@@ -0,0 +1,118 @@
+import math
+
+import numpy as np
+
+# The Spiral of Theodorus calculated so far, which is extended when more of
+# it is needed, instead of being calculated again. "spiral_angles" has the
+# angle of each point from the positive x axis (counting every turn), and
+# "spiral_points" has the points, starting with (1, 0).
+spiral_angles = np.zeros(1)
+spiral_points = np.array([[1.0, 0.0]])
+
+
+def theodorus_spiral(amount):
+    """Get the points of "amount" triangles of the Spiral of Theodorus, and
+    their angles.
+
+    Point "k" is the square root of k + 1 from the origin. The points are
+    returned as an array with the shape (amount + 1, 2), and the angles as an
+    array of amount + 1 angles, which always go up (they aren't wrapped
+    around to 0 after each turn).
+    """
+    global spiral_angles, spiral_points
+
+    known = len(spiral_angles) - 1
+    if amount > known:
+        # Extend by at least as much as is known, so extending many times
+        # doesn't copy the arrays many times.
+        extend_to = max(amount, 2 * known)
+
+        # Each point is the previous point moved 1 unit, in a direction
+        # rotated counterclockwise from the y axis by the previous point's
+        # angle. Each triangle adds arctan(1 / sqrt(k)) to the angle.
+        angles = spiral_angles[-1] + np.cumsum(
+            np.arctan(1 / np.sqrt(np.arange(known + 1, extend_to + 1))))
+        previous_angles = np.concatenate(([spiral_angles[-1]], angles[:-1]))
+        moves = np.stack((-np.sin(previous_angles), np.cos(previous_angles)),
+                         axis=1)
+
+        spiral_angles = np.concatenate((spiral_angles, angles))
+        spiral_points = np.concatenate(
+            (spiral_points, spiral_points[-1] + np.cumsum(moves, axis=0)))
+
+    return spiral_points[:amount + 1], spiral_angles[:amount + 1]
+
+
+def theodorus_points(amount):
+    """Calculate the points of "amount" triangles of the Spiral of Theodorus.
+
+    The points are returned as an array with the shape (amount + 1, 2).
+    """
+    return theodorus_spiral(amount)[0].copy()
+
+
+def translation_matrix(x, y):
+    """Get the affine matrix which moves points by x and y."""
+    return np.array([[1, 0, x], [0, 1, y], [0, 0, 1]], dtype=float)
+
+
+def rotation_matrix(origin, angle):
+    """Get the affine matrix which rotates points counterclockwise around an
+    origin."""
+    angle_cos = math.cos(angle)
+    angle_sin = math.sin(angle)
+    rotation = np.array([[angle_cos, -angle_sin, 0],
+                         [angle_sin, angle_cos, 0],
+                         [0, 0, 1]])
+
+    return (translation_matrix(*origin) @ rotation
+            @ translation_matrix(-origin[0], -origin[1]))
+
+
+def flip_matrix(x):
+    """Get the affine matrix which flips points about the vertical line at
+    x."""
+    return np.array([[-1, 0, 2 * x], [0, 1, 0], [0, 0, 1]], dtype=float)
+
+
+def transform_points(matrix, points):
+    """Apply an affine matrix to an array of points with the shape (n, 2)."""
+    return points @ matrix[:2, :2].T + matrix[:2, 2]
+
+
+def spiral_transforms(flip_frames, rotate_frames, move_frames, hold_frames):
+    """Get the affine matrix for every frame of the spiral animation.
+
+    The Spiral of Theodorus is flipped about the line x=1, rotated around
+    (1, 1) by arctan(1) radians clockwise, then moved 2 units to the left,
+    in order to overlap with the reverse Wurzelschnecke. Before each step,
+    the previous frame is held for "hold_frames" frames as a pause.
+    """
+    transforms = [np.identity(3)]
+
+    def hold():
+        transforms.extend([transforms[-1]] * hold_frames)
+
+    hold()
+    flipped = flip_matrix(1)
+    transforms.extend([flipped] * flip_frames)
+
+    hold()
+    for frame in range(1, rotate_frames + 1):
+        transforms.append(rotation_matrix(
+            (1, 1), -math.atan(1) * frame / rotate_frames) @ flipped)
+    rotated = transforms[-1]
+
+    hold()
+    for frame in range(1, move_frames + 1):
+        transforms.append(translation_matrix(-2 * frame / move_frames, 0)
+                          @ rotated)
+
+    return np.array(transforms)
+
+
+def alignment_matrix():
+    """Get the affine matrix which moves the Spiral of Theodorus onto the
+    reverse Wurzelschnecke, like the last frame of "spiral_transforms"."""
+    return (translation_matrix(-2, 0) @ rotation_matrix((1, 1), -math.atan(1))
+            @ flip_matrix(1))
@@ -1,16 +1,7 @@
 import math
 
-import sympy
-
-from utils import calculate_hypotenuse
-from settings import (EXACT_VALUES, HEADERS, CUSTOM_HYPOTENUSE_FUNCTION,
-                      OUTSIDE_LEG_LENGTH)
-
-
-class NotRightTriangleError(Exception):
-    def __init__(self, triangle_number):
-        super().__init__(
-            f"Can't create a right triangle for triangle #{triangle_number}.")
+from config import default_config
+from hypotenuse import NotRightTriangleError
 
 
 class Triangle:
@@ -26,28 +17,21 @@ class Triangle:
         # How much this triangle is rotated.
         self.rotation = rotation
         
-    def save_triangle_data(self, triangle_data):
-        """Save this triangle's data to a dictionary."""
-        triangle_data[HEADERS[0]].append(self.number)
-        triangle_data[HEADERS[1]].append(self.points['outside left'][0])
-        triangle_data[HEADERS[2]].append(self.points['outside left'][1])
-        triangle_data[HEADERS[3]].append(
-            self.points['outside right'][0])
-        triangle_data[HEADERS[4]].append(
-            self.points['outside right'][1])
-        triangle_data[HEADERS[5]].append(self.points['inside'][0])
-        triangle_data[HEADERS[6]].append(self.points['inside'][1])
-        triangle_data[HEADERS[7]].append(self.rotation)
-
     @staticmethod
-    def rotate_point(origin, point, angle):
-        """Rotate a point counterclockwise around an origin."""
+    def rotate_point(origin, point, angle, table=None, exact=False):
+        """Rotate a point counterclockwise around an origin.
+
+        With exact values, the rotated point is added to an expression table
+        (see "symbolic.py"), and references to its entries are returned.
+        """
         origin_x, origin_y = origin
         point_x, point_y = point
         
-        if EXACT_VALUES:
-            angle_cos = sympy.cos(angle)
-            angle_sin = sympy.sin(angle)
+        if exact:
+            import sympy
+
+            angle_cos = table.add(sympy.cos(angle))
+            angle_sin = table.add(sympy.sin(angle))
         else:
             angle_cos = math.cos(angle)
             angle_sin = math.sin(angle)
@@ -57,37 +41,72 @@ class Triangle:
         
         rotated_x = origin_x + angle_cos * delta_x - angle_sin * delta_y
         rotated_y = origin_y + angle_sin * delta_x + angle_cos * delta_y
+
+        if exact:
+            return table.add(rotated_x), table.add(rotated_y)
         
         return rotated_x, rotated_y
 
     @classmethod
     def calculate_triangle(cls, triangle_number, current_rotation,
-                           previous_outside_right_point):
-        """Calculate a triangle and create a triangle object for it."""
+                           previous_outside_right_point, table=None,
+                           config=default_config):
+        """Calculate a triangle and create a triangle object for it.
+
+        The triangle is calculated with the settings of a config (the ones in
+        "settings.py" if none is given). Exact values are kept in an
+        expression table (the shared one if none is given), and the
+        triangle's values are references to its entries. This keeps every
+        value a short expression, no matter how many triangles there are.
+        """
+        custom_hypotenuse = config.custom_hypotenuse
+        exact = config.exact_values
+
+        if exact:
+            # sympy takes a long time to import, so it is only imported when
+            # exact values are used.
+            import sympy
+            from symbolic import shared_table
+
+            if table is None:
+                table = shared_table
+
         # The outside leg of the triangle.
-        outside_leg = OUTSIDE_LEG_LENGTH
+        outside_leg = config.outside_leg_length
         
-        # If a custom function should be used for calculating a triangle's
-        # hypotenuse.
-        if CUSTOM_HYPOTENUSE_FUNCTION:
-            hypotenuse = calculate_hypotenuse(triangle_number)
+        # If a custom hypotenuse should be used for the triangle.
+        if custom_hypotenuse is not None:
+            if exact:
+                hypotenuse = custom_hypotenuse.exact(triangle_number)
+            else:
+                hypotenuse = float(
+                    custom_hypotenuse.decimals([triangle_number])[0])
         
             if hypotenuse <= outside_leg:
                 raise NotRightTriangleError(triangle_number)
 
-            if EXACT_VALUES:
+            if exact:
                 inside_leg = sympy.sqrt(hypotenuse ** 2 - outside_leg ** 2)
             else:
                 inside_leg = math.sqrt(hypotenuse ** 2 - outside_leg ** 2)
         else:
             # The triangle's side lengths.
-            if EXACT_VALUES:
+            if exact:
                 inside_leg = sympy.sqrt(triangle_number)
             else:
                 inside_leg = math.sqrt(triangle_number)
+
+        if exact:
+            inside_leg = table.add(inside_leg)
         
         # Points are in the order: outside left, outside right, inside.
         if triangle_number == 1:
+            if exact:
+                zero = table.add(0)
+                return cls((table.add(-outside_leg), inside_leg),
+                           (zero, inside_leg), (zero, zero), triangle_number,
+                           table.add(current_rotation))
+
             return cls((-outside_leg, inside_leg), (0, inside_leg), (0, 0),
                        triangle_number, current_rotation)
         else:
@@ -100,16 +119,20 @@ class Triangle:
                 previous_outside_right_point[1] - inside_leg)
             
             # How much to rotate.
-            if EXACT_VALUES:
-                current_rotation += sympy.atan(outside_leg / inside_leg)
+            if exact:
+                # The rotation is a sum of the previous rotation and this
+                # triangle's angle, both of which are in the table.
+                current_rotation = table.add(current_rotation + table.add(
+                    sympy.atan(outside_leg / inside_leg)))
             else:
                 current_rotation += math.atan(outside_leg / inside_leg)
             
             point_outside_right = cls.rotate_point(
                 previous_outside_right_point, outside_right_point,
-                -current_rotation)
+                -current_rotation, table, exact)
             point_inside = cls.rotate_point(
-                previous_outside_right_point, inside_point, -current_rotation)
+                previous_outside_right_point, inside_point, -current_rotation,
+                table, exact)
             
             return cls(previous_outside_right_point, point_outside_right,
                        point_inside, triangle_number, current_rotation)
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+from settings import HEADERS
+
+
+class TriangleView:
+    """One triangle of a batch, read from the batch's arrays when needed."""
+    __slots__ = ("batch", "index")
+
+    def __init__(self, batch, index):
+        self.batch = batch
+        self.index = index
+
+    def point(self, x_key, y_key):
+        return (self.batch.columns[x_key][self.index],
+                self.batch.columns[y_key][self.index])
+
+    @property
+    def number(self):
+        return int(self.batch.columns[HEADERS[0]][self.index])
+
+    @property
+    def rotation(self):
+        return self.batch.columns[HEADERS[7]][self.index]
+
+    @property
+    def points(self):
+        """The three points of the triangle, like "Triangle.points"."""
+        return {
+            "outside left": self.point(HEADERS[1], HEADERS[2]),
+            "outside right": self.point(HEADERS[3], HEADERS[4]),
+            "inside": self.point(HEADERS[5], HEADERS[6])
+        }
+
+
+class TriangleBatch:
+    """Many triangles, stored as one array for each header in HEADERS.
+
+    A column is read with "batch[header]", a range of triangles with
+    "batch[start:stop]" (which shares the arrays instead of copying them),
+    and one triangle with "batch.triangle(index)" or by looping over the
+    batch. Triangle numbers are 64 bit integers. The other values are 64 bit
+    floats, or Python objects for exact and mpmath values.
+    """
+    __slots__ = ("columns",)
+
+    def __init__(self, columns):
+        # A dictionary of arrays, keyed by the names in HEADERS.
+        self.columns = columns
+
+    @classmethod
+    def empty(cls, amount, dtype=np.float64):
+        """Create a batch of "amount" triangles to be filled in."""
+        columns = {key: np.empty(amount, dtype=dtype) for key in HEADERS[1:]}
+
+        return cls({HEADERS[0]: np.empty(amount, dtype=np.int64), **columns})
+
+    @classmethod
+    def from_dataframe(cls, triangle_dataframe):
+        """Create a batch from the columns of a dataframe."""
+        return cls({key: triangle_dataframe[key].to_numpy()
+                    for key in HEADERS})
+
+    @classmethod
+    def concatenate(cls, batches):
+        """Join batches into one batch."""
+        return cls({key: np.concatenate([batch[key] for batch in batches])
+                    for key in HEADERS})
+
+    def __len__(self):
+        return len(self.columns[HEADERS[0]])
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return TriangleBatch({header: values[key]
+                                  for header, values in self.columns.items()})
+
+        return self.columns[key]
+
+    def __iter__(self):
+        return (TriangleView(self, index) for index in range(len(self)))
+
+    def keys(self):
+        return self.columns.keys()
+
+    def items(self):
+        return self.columns.items()
+
+    def triangle(self, index):
+        """Get one triangle of the batch."""
+        return TriangleView(self, index)
+
+    def put(self, index, triangle):
+        """Save the data of a "Triangle" object as one of the triangles."""
+        values = (triangle.number, *triangle.points["outside left"],
+                  *triangle.points["outside right"],
+                  *triangle.points["inside"], triangle.rotation)
+        for key, value in zip(HEADERS, values):
+            self.columns[key][index] = value
+
+    def vertices(self):
+        """Get the points of every triangle as an array of decimals, with the
+        shape (amount, 3, 2)."""
+        return np.stack([np.asarray(self.columns[key], dtype=np.float64)
+                         for key in HEADERS[1:7]], axis=1).reshape(-1, 3, 2)
+
+    def decimals(self):
+        """Get the batch with every value (other than the triangle numbers)
+        as a 64 bit float."""
+        return TriangleBatch({key: values if key == HEADERS[0]
+                              else np.asarray(values, dtype=np.float64)
+                              for key, values in self.columns.items()})
+
+    def to_dataframe(self):
+        """Create a dataframe from the batch."""
+        return pd.DataFrame(self.columns, copy=False)
@@ -1,89 +1,321 @@
+from concurrent.futures import ProcessPoolExecutor
 import io
-import math
 import os
 
+import mpmath
+import numpy as np
 import pandas as pd
-import sympy
-from sympy.parsing.sympy_parser import parse_expr
-import tailer as tl
 
-from settings import HEADERS
+from config import default_config
+from files import replace_file
+from index import (check_index, current_index, find_range_offsets,
+                   update_index, table_path)
+from instrument import span, count
+from triangle_batch import TriangleBatch
+from store import (is_store, create_store, append_to_store, open_store,
+                   read_store_header, store_to_dataframe, choose_level,
+                   changed_settings, COLUMN_DTYPE)
+from settings import (HEADERS, READ_MODE, PRECISION_DIGITS,
+                      PRECISION_GUARD_DIGITS, PLOT_MIN_POINTS)
 
+# Files with fewer values than this are parsed without a pool of processes.
+PARALLEL_PARSE_MIN_VALUES = 100000
+# How many values each process parses at a time.
+PARALLEL_PARSE_CHUNK_SIZE = 20000
+# How many rows are turned into csv lines and written at a time, so the text
+# of a big batch is never held in memory all at once.
+WRITE_CHUNK_ROWS = 100000
 
-def calculate_hypotenuse(triangle_number):
-    # A custom function for calculating the hypotenuse of the triangles can be
-    # set. To get an exact value, use sympy instead of math. For example, do
-    # "sympy.sqrt()" instead of "math.sqrt()".
-    return math.sqrt(triangle_number + 1)
+if PRECISION_DIGITS is not None:
+    # The precision used by mpmath, for calculating and reading values.
+    mpmath.mp.dps = PRECISION_DIGITS + PRECISION_GUARD_DIGITS
 
 
-def write_triangle_data(triangle_dataframe, filename, create_new_file):
-    """Save a dataframe to a csv file."""
-    print("\nSaving data...")
-    if create_new_file:
-        print("Creating new file...")
-        triangle_dataframe.to_csv(os.path.join("data", filename), index=False)
-    else:
-        print("Adding to file...")
-        with open(os.path.join("data", filename), "a") as f:
-            triangle_dataframe.to_csv(f, header=False, index=False)
-    print("Done.")
+def write_triangle_data(triangle_data, filename, create_new_file,
+                        verbose=True, sync=False, table=None,
+                        config=default_config):
+    """Save a TriangleBatch (or a dataframe) to a csv file (or a store).
+
+    A batch is saved to a store straight from its arrays, without creating a
+    dataframe. Exact values that refer to an expression table ("table") are
+    saved to a csv file as references, after the table is saved. A new
+    store records the settings of the config the triangles were calculated
+    with.
+
+    If "sync" is True, the data is synced to the disk before returning.
+    """
+    # Status messages can be turned off, for when data is saved often.
+    status = print if verbose else lambda message: None
+
+    status("\nSaving data...")
+    with span("write"):
+        if is_store(filename):
+            if create_new_file:
+                status("Creating new store...")
+                create_store(filename, config)
+            else:
+                status("Adding to store...")
+            append_to_store(filename, triangle_data, sync)
+            count("bytes written",
+                  len(triangle_data) * len(HEADERS) * COLUMN_DTYPE.itemsize)
+        else:
+            if create_new_file:
+                status("Creating new file...")
+                mode = "w"
+            else:
+                status("Adding to file...")
+                mode = "a"
+                # Make sure the index is up to date before adding to it. This
+                # also removes a partly written line left at the end of the
+                # file by an interruption.
+                check_index(filename)
+            if table is not None:
+                # Save the entries first, so every reference in the data file
+                # can be read back, even after an interruption.
+                table.save(sync)
+            if isinstance(triangle_data, TriangleBatch):
+                with span("dataframe"):
+                    triangle_data = triangle_data.to_dataframe()
+            with open(os.path.join("data", filename), mode + "b") as f:
+                # Always write the first chunk, so a new file gets a header.
+                for chunk_start in range(
+                        0, max(len(triangle_data), 1), WRITE_CHUNK_ROWS):
+                    # Create all the lines of a chunk first, then write them
+                    # at once, so an interruption can't leave half of a line
+                    # at the end of the file.
+                    lines = triangle_data.iloc[
+                        chunk_start:chunk_start + WRITE_CHUNK_ROWS].to_csv(
+                        header=create_new_file, index=False).encode()
+                    f.write(lines)
+                    # The index is only updated once the lines are in the
+                    # file.
+                    f.flush()
+                    update_index(filename, lines, create_new_file)
+                    count("bytes written", len(lines))
+                    create_new_file = False
+                if sync:
+                    os.fsync(f.fileno())
+    count("rows written", len(triangle_data))
+    status("Done.")
+
+
+def mpf_to_str(value):
+    """Convert an mpmath number to a string, without losing any digits."""
+    return mpmath.nstr(value, mpmath.libmp.repr_dps(mpmath.mp.prec),
+                       strip_zeros=True, min_fixed=-mpmath.inf,
+                       max_fixed=mpmath.inf)
 
 
 def str_to_sympy(values):
     """Convert the strings in the csv file into numbers."""
+    from sympy.parsing.sympy_parser import parse_expr
+
     return [parse_expr(value) for value in values]
 
 
-def read_last_triangle(filename):
-    """Efficiently read only the last triangle's data from a csv file."""
-    try:
-        file = open(os.path.join("data", filename))
-    except FileNotFoundError:
+def parse_exact_values(triangle_dataframe, table=None):
+    """Convert a dataframe of strings into sympy numbers.
+
+    Parsing is slow, so big dataframes are split into chunks which are parsed
+    at the same time by a pool of processes. References to the entries of an
+    expression table (see "symbolic.py") are looked up in "table" instead of
+    being parsed.
+    """
+    # Values that are repeated (such as "0") only need to be parsed once.
+    values, inverse = np.unique(triangle_dataframe.to_numpy(dtype=str),
+                                return_inverse=True)
+
+    references = {}
+    if table is not None:
+        from symbolic import References
+        names = References(table)
+        for value in values:
+            try:
+                references[value] = names[value]
+            except KeyError:
+                pass
+        values_to_parse = [value for value in values
+                           if value not in references]
+    else:
+        values_to_parse = values
+
+    if len(values_to_parse) < PARALLEL_PARSE_MIN_VALUES:
+        parsed_values = str_to_sympy(values_to_parse)
+    else:
+        chunks = [values_to_parse[i:i + PARALLEL_PARSE_CHUNK_SIZE] for i in
+                  range(0, len(values_to_parse), PARALLEL_PARSE_CHUNK_SIZE)]
+        with ProcessPoolExecutor() as executor:
+            parsed_values = [value for chunk in executor.map(
+                str_to_sympy, chunks) for value in chunk]
+    parsed_values = dict(zip(values_to_parse, parsed_values), **references)
+
+    parsed_values = np.array(
+        [parsed_values[value] for value in values] + [None], dtype=object)[:-1]
+    return pd.DataFrame(
+        parsed_values[inverse].reshape(triangle_dataframe.shape),
+        index=triangle_dataframe.index, columns=triangle_dataframe.columns)
+
+
+def is_decimal_dataframe(triangle_dataframe):
+    """Check if pandas could read every column of a dataframe as numbers."""
+    return len(triangle_dataframe) == 0 or all(
+        pd.api.types.is_numeric_dtype(dtype)
+        for dtype in triangle_dataframe.dtypes)
+
+
+def read_csv_data(file, mode=READ_MODE, table=None, **kwargs):
+    """Read a csv file of triangle data into a dataframe of numbers (see
+    "parse_csv_data")."""
+    with span("parse"):
+        triangle_dataframe = parse_csv_data(file, mode, table, **kwargs)
+    count("rows parsed", len(triangle_dataframe))
+
+    return triangle_dataframe
+
+
+def parse_csv_data(file, mode=READ_MODE, table=None, **kwargs):
+    """Read a csv file of triangle data into a dataframe of numbers.
+
+    With the "decimal" mode, values are parsed by pandas' fast float parser.
+    With the "exact" mode, every value is parsed by sympy, or looked up in the
+    expression table of the data file ("table"). The "auto" mode
+    uses the fast float parser, unless the file has exact values that can't
+    be read as decimals. The "precise" mode reads every value (other than
+    the triangle number) as an mpmath number, keeping all of its digits.
+    """
+    if mode == "precise":
+        triangle_dataframe = pd.read_csv(file, dtype=str, **kwargs)
+        for key in triangle_dataframe.columns[1:]:
+            triangle_dataframe[key] = [
+                mpmath.mpf(value) for value in triangle_dataframe[key]]
+        triangle_dataframe[HEADERS[0]] = triangle_dataframe[
+            HEADERS[0]].astype(np.int64)
+
+        return triangle_dataframe
+    elif mode != "exact":
+        # If the file gets read twice, it must be read from the start again.
+        position = file.tell() if hasattr(file, "tell") else None
+        triangle_dataframe = pd.read_csv(file, **kwargs)
+
+        if is_decimal_dataframe(triangle_dataframe):
+            return triangle_dataframe
+        elif mode == "decimal":
+            raise ValueError("The data file has values that aren't decimals.")
+        elif position is not None:
+            file.seek(position)
+
+    return parse_exact_values(pd.read_csv(file, dtype=str, **kwargs), table)
+
+
+def find_table(filename):
+    """Get the expression table of a csv data file with exact values, or None
+    if it doesn't have one."""
+    if is_store(filename) or not os.path.exists(table_path(filename)):
         return
-    
-    # Get the last line in the
-    last_line = tl.tail(file, 1)
-    file.close()
-    
-    try:
-        triangle_dataframe = pd.read_csv(
-            io.StringIO("\n".join(last_line)), names=HEADERS,
-            dtype=str)
-        try:
-            return triangle_dataframe.apply(str_to_sympy)
-        except SyntaxError:
-            # There is only a header in the data file, so there is no actual
-            # data.
+
+    from symbolic import open_table
+
+    return open_table(filename)
+
+
+def read_last_triangle(filename, config=None):
+    """Efficiently read only the last triangle's data from a csv file.
+
+    If a config is given, a store is checked to have been calculated with
+    its settings, so triangles calculated with other settings are never
+    added to it.
+    """
+    if is_store(filename):
+        if read_store_header(filename) is None:
             return
-    except FileNotFoundError:
+        if config is not None:
+            changed = changed_settings(filename, config)
+            if changed:
+                raise ValueError(
+                    f"\"{filename}\" was calculated with different settings "
+                    f"({', '.join(changed)}).")
+
+        columns = open_store(filename)
+        length = len(columns[HEADERS[0]])
+        if length == 0:
+            return
+
+        return store_to_dataframe(columns, length - 1, length)
+
+    # The checkpoint next to the data file holds the last line, so the data
+    # file doesn't need to be read.
+    checkpoint, _ = current_index(filename)
+    if checkpoint is None or checkpoint["last_line"] is None:
+        # There is no data file, or there is only a header in the data file.
+        return
+
+    # Use round trip float parsing (or every digit, when calculating with
+    # mpmath), so the calculation continues from the exact same values that
+    # were saved.
+    if PRECISION_DIGITS is not None:
+        return read_csv_data(io.StringIO(checkpoint["last_line"]), "precise",
+                             names=HEADERS)
+
+    return read_csv_data(io.StringIO(checkpoint["last_line"]), names=HEADERS,
+                         table=find_table(filename),
+                         float_precision="round_trip")
+
+
+def read_triangle_range(filename, start, stop, mode=READ_MODE):
+    """Read the triangles from "start" up to (but not including) "stop".
+
+    Only the part of the data file holding those triangles is read, found
+    using the index next to a csv file (or the number column of a store). A
+    dataframe is returned, or None if there is no data file. A csv file is
+    read with "mode" (see "parse_csv_data").
+    """
+    if is_store(filename):
+        if read_store_header(filename) is None:
+            return
+
+        columns = open_store(filename)
+        first, last = np.searchsorted(columns[HEADERS[0]], (start, stop))
+
+        return store_to_dataframe(columns, first, last)
+
+    if not os.path.exists(os.path.join("data", filename)):
         return
 
+    start_offset, stop_offset = find_range_offsets(filename, start, stop)
+    with open(os.path.join("data", filename), "rb") as f:
+        f.seek(start_offset)
+        data = f.read(stop_offset - start_offset)
+
+    triangle_dataframe = read_csv_data(io.BytesIO(data), mode, names=HEADERS,
+                                       table=find_table(filename))
+    numbers = triangle_dataframe[HEADERS[0]]
+
+    return triangle_dataframe[(numbers >= start)
+                              & (numbers < stop)].reset_index(drop=True)
+
 
 def read_triangle_points(filename):
-    """Get all triangle points from a csv file."""
-    points = []
-    
+    """Get every triangle from a data file, as a TriangleBatch."""
+    if is_store(filename):
+        return read_store_points(filename)
+
     # Read the file with the data.
     try:
         print("\nReading the data file...")
         try:
-            triangle_dataframe = pd.read_csv(
-                os.path.join("data", filename), index_col=HEADERS[0],
-                dtype=str)
-        except ValueError:
+            triangle_dataframe = read_csv_data(os.path.join("data", filename),
+                                               table=find_table(filename))
+        except ValueError as error:
+            print(f"\n{error} Try setting READ_MODE to \"auto\" in the "
+                  "\"settings.py\" file.")
+            return
+        if list(triangle_dataframe.columns[:1]) != HEADERS[:1]:
             print("\nThe index column title in the data file does not match "
                   "with the one set in the \"settings.py\" file. Make sure "
                   "the first string in the constant \"HEADERS\" matches the "
                   "index column of the data file (the leftmost column with "
                   "the triangle numbers).")
             return
-        try:
-            triangle_dataframe = triangle_dataframe.apply(str_to_sympy)
-        except SyntaxError:
-            # There is only a header in the data file, so there is no actual
-            # data.
-            return
     except FileNotFoundError:
         print("\nNo data file was found.")
         
@@ -96,18 +328,37 @@ def read_triangle_points(filename):
         
         return
     
-    # Save each triangle's three points and number.
-    for number, row in triangle_dataframe.iterrows():
-        outside_left_point = [row['outside left x'],
-                              row['outside left y']]
-        outside_right_point = [row['outside right x'],
-                               row['outside right y']]
-        inside_point = [row['inside x'], row['inside y']]
-        
-        points.append((outside_left_point, outside_right_point, inside_point,
-                       number))
-    
-    return points
+    # The batch uses the dataframe's columns, without copying them.
+    return TriangleBatch.from_dataframe(triangle_dataframe)
+
+
+def read_store_points(filename, min_points=PLOT_MIN_POINTS):
+    """Get the triangles of a store, as a TriangleBatch.
+
+    Only the coarsest level of the store's pyramid with at least
+    "min_points" triangles is read (every triangle if it is None).
+    """
+    print("\nReading the data file...")
+    if read_store_header(filename) is None:
+        print("\nNo data file was found.")
+
+        return
+
+    level, step = choose_level(filename, min_points)
+    if level:
+        print(f"\nReading every {step}th triangle.")
+    columns = open_store(filename, level)
+    if len(columns[HEADERS[0]]) == 0:
+        print("\nThe data file found doesn't contain anything.")
+
+        return
+
+    # The batch reads from the memory mapped columns, so only the parts
+    # that are used get read from disk. Triangle numbers are stored as
+    # floats, so they are the only column copied.
+    columns[HEADERS[0]] = columns[HEADERS[0]].astype(np.int64)
+
+    return TriangleBatch(columns)
 
 
 def get_input(input_message, input_type, default=None, valid_inputs=()):
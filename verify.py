@@ -0,0 +1,283 @@
+from concurrent.futures import ProcessPoolExecutor
+import io
+import os
+
+import numpy as np
+
+from config import default_config
+from instrument import span, count
+from store import is_store, read_store_header, changed_settings, open_store
+from triangle_batch import TriangleBatch
+from settings import (HEADERS, VERIFY_CHUNK_ROWS, VERIFY_CHUNK_BYTES,
+                      VERIFY_PROCESSES, VERIFY_TOLERANCE)
+
+# The invariants checked for every row, in the order they are reported.
+INVARIANTS = {
+    "order": "the triangle number is bigger than the one before it",
+    "gaps": "the triangle number is the one before it plus the step between "
+            "the first two rows",
+    "chain": "the outside left point is the outside right point of the "
+             "triangle before it",
+    "outside leg": "the outside leg is OUTSIDE_LEG_LENGTH long",
+    "inside leg": "the inside leg is as long as the triangle number (or the "
+                  "hypotenuse) makes it",
+    "right angle": "the legs are at a right angle",
+    "rotation": "the outside leg points along the rotation"
+}
+# Read from the first rows of a csv file, to find the step between them.
+HEAD_BYTES = 4096
+
+# The expression table of each data file with exact values, loaded once in
+# each process.
+tables = {}
+
+
+def batch_scale(triangle_data):
+    """Get how big the values of each triangle are, since the rounding error
+    of a float grows with it."""
+    return 1 + np.maximum(np.abs(triangle_data[HEADERS[3]]),
+                          np.abs(triangle_data[HEADERS[4]]))
+
+
+def row_problems(triangle_data, config=default_config,
+                 tolerance=VERIFY_TOLERANCE):
+    """Check the shape of every triangle in a batch of decimals. An array
+    saying which rows are wrong is returned for each invariant."""
+    numbers = triangle_data[HEADERS[0]]
+    (outside_left_x, outside_left_y, outside_right_x, outside_right_y,
+     inside_x, inside_y, rotations) = (triangle_data[key]
+                                       for key in HEADERS[1:])
+    leg = config.outside_leg_length
+    allowed = tolerance * batch_scale(triangle_data)
+
+    outside_x = outside_right_x - outside_left_x
+    outside_y = outside_right_y - outside_left_y
+    inside_leg_x = inside_x - outside_right_x
+    inside_leg_y = inside_y - outside_right_y
+    outside_lengths = np.hypot(outside_x, outside_y)
+    inside_lengths = np.hypot(inside_leg_x, inside_leg_y)
+
+    # Rows with numbers that couldn't be triangles get an inside leg of NaN,
+    # which is never close enough.
+    with np.errstate(invalid="ignore"):
+        if config.custom_hypotenuse is not None:
+            hypotenuses = config.custom_hypotenuse.decimals(numbers)
+            inside_legs = np.sqrt(hypotenuses ** 2 - leg ** 2)
+        else:
+            inside_legs = np.sqrt(numbers.astype(np.float64))
+
+        # The cosine of the angle between the legs is 0 for a right angle.
+        cosines = ((outside_x * inside_leg_x + outside_y * inside_leg_y)
+                   / (outside_lengths * inside_lengths))
+
+    # Comparisons with NaN are False, so the checks are written to pass
+    # rather than to fail.
+    return {
+        "outside leg": ~(np.abs(outside_lengths - leg) <= allowed),
+        "inside leg": ~(np.abs(inside_lengths - inside_legs) <= allowed),
+        "right angle": ~(np.abs(cosines) <= allowed),
+        "rotation": ~((np.abs(outside_x - leg * np.cos(rotations)) <= allowed)
+                      & (np.abs(outside_y + leg * np.sin(rotations))
+                         <= allowed))
+    }
+
+
+def sequence_problems(triangle_data, step, tolerance=VERIFY_TOLERANCE):
+    """Check each triangle in a batch of decimals against the one before
+    it. An array saying which rows (after the first) are wrong is returned
+    for each invariant."""
+    steps = np.diff(triangle_data[HEADERS[0]])
+    allowed = tolerance * batch_scale(triangle_data)[1:]
+    # Only triangles right after each other share a point.
+    follows = steps == 1
+    chained = ((np.abs(triangle_data[HEADERS[1]][1:]
+                       - triangle_data[HEADERS[3]][:-1]) <= allowed)
+               & (np.abs(triangle_data[HEADERS[2]][1:]
+                         - triangle_data[HEADERS[4]][:-1]) <= allowed))
+
+    return {
+        "order": steps <= 0,
+        "gaps": (steps > 0) & (steps != step),
+        "chain": follows & ~chained
+    }
+
+
+def read_chunk(filename, start, stop):
+    """Read the rows of a store (or the bytes of a csv file) from "start" up
+    to "stop", as a TriangleBatch of decimals."""
+    if is_store(filename):
+        columns = open_store(filename)
+        triangle_data = TriangleBatch({key: np.array(columns[key][start:stop])
+                                       for key in HEADERS})
+        triangle_data.columns[HEADERS[0]] = triangle_data[
+            HEADERS[0]].astype(np.int64)
+
+        return triangle_data
+
+    from utils import find_table, read_csv_data
+
+    if filename not in tables:
+        tables[filename] = find_table(filename)
+    with open(os.path.join("data", filename), "rb") as f:
+        f.seek(start)
+        data = f.read(stop - start)
+    triangle_dataframe = read_csv_data(io.BytesIO(data), names=HEADERS,
+                                       table=tables[filename])
+
+    return TriangleBatch.from_dataframe(triangle_dataframe).decimals()
+
+
+def verify_chunk(filename, start, stop, step, config=default_config,
+                 tolerance=VERIFY_TOLERANCE):
+    """Check one chunk of a data file.
+
+    How many rows the chunk has is returned, along with the first and last
+    triangle (so the chunks can be checked against each other), and the
+    first wrong row (counted from the start of the chunk) and how many rows
+    are wrong for each invariant.
+    """
+    with span("verify chunk"):
+        triangle_data = read_chunk(filename, start, stop)
+        problems = row_problems(triangle_data, config, tolerance)
+        # The first row of the chunk is checked against the row before it
+        # once every chunk is done.
+        problems.update({name: np.concatenate(([False], wrong)) for name, wrong
+                         in sequence_problems(triangle_data, step,
+                                              tolerance).items()})
+    count("rows verified", len(triangle_data))
+
+    return {
+        "rows": len(triangle_data),
+        "first": triangle_data[:1],
+        "last": triangle_data[-1:],
+        "problems": {name: (int(np.argmax(wrong)), int(wrong.sum()))
+                     for name, wrong in problems.items() if wrong.any()},
+        "numbers": {name: int(triangle_data[HEADERS[0]][np.argmax(wrong)])
+                    for name, wrong in problems.items() if wrong.any()}
+    }
+
+
+def chunk_bounds(filename, chunk_rows=VERIFY_CHUNK_ROWS,
+                 chunk_bytes=VERIFY_CHUNK_BYTES):
+    """Split a data file into chunks: ranges of rows of a store, or ranges
+    of bytes of a csv file that start and end between lines."""
+    if is_store(filename):
+        length = len(open_store(filename)[HEADERS[0]])
+        return [(start, min(start + chunk_rows, length))
+                for start in range(0, length, chunk_rows)]
+
+    path = os.path.join("data", filename)
+    size = os.path.getsize(path)
+    bounds = []
+    with open(path, "rb") as f:
+        # Skip the header line.
+        start = len(f.readline())
+        while start < size:
+            # Move the end of the chunk to the start of the next line.
+            f.seek(max(start + chunk_bytes - 1, start))
+            f.readline()
+            stop = min(f.tell(), size)
+            bounds.append((start, stop))
+            start = stop
+
+    return bounds
+
+
+def first_step(filename):
+    """Get the step between the triangle numbers of the first two rows of a
+    data file (which is how often triangles were saved), or 1 if there
+    aren't two rows."""
+    if is_store(filename):
+        numbers = open_store(filename)[HEADERS[0]][:2]
+    else:
+        with open(os.path.join("data", filename), "rb") as f:
+            f.readline()
+            lines = f.read(HEAD_BYTES).split(b"\n")[:2]
+        numbers = [float(line.split(b",")[0]) for line in lines
+                   if line.strip()]
+
+    return int(numbers[1] - numbers[0]) if len(numbers) == 2 else 1
+
+
+def verify_data(filename, config=default_config, processes=VERIFY_PROCESSES,
+                tolerance=VERIFY_TOLERANCE):
+    """Check that every triangle in a data file is shaped and ordered the way
+    calculating it would have left it (see INVARIANTS).
+
+    The data file is split into chunks, which are checked at the same time by
+    a pool of processes with NumPy, so the whole file is never held in
+    memory. The first wrong row (counted from 1, not including the header)
+    and how many rows are wrong are printed for each invariant, and a
+    dictionary of them is returned (empty if nothing is wrong).
+    """
+    if is_store(filename):
+        if read_store_header(filename) is None:
+            raise FileNotFoundError(f"\"{filename}\" doesn't exist.")
+        changed = changed_settings(filename, config)
+        if changed:
+            print(f"\nNote: \"{filename}\" was calculated with different "
+                  f"settings ({', '.join(changed)}), so it will be checked "
+                  "against the settings in \"settings.py\".")
+    elif not os.path.exists(os.path.join("data", filename)):
+        raise FileNotFoundError(f"\"{filename}\" doesn't exist.")
+
+    bounds = chunk_bounds(filename)
+    step = first_step(filename)
+    print(f"\nChecking \"{filename}\" in {len(bounds)} chunks...")
+
+    with ProcessPoolExecutor(processes) as executor:
+        reports = list(executor.map(
+            verify_chunk, *zip(*[(filename, start, stop, step, config,
+                                  tolerance) for start, stop in bounds])))
+
+    # Add up the problems of every chunk, counting rows from the start of
+    # the file.
+    found = {}
+    row = 0
+    previous = None
+    for report in reports:
+        if report["rows"] == 0:
+            continue
+        if previous is not None:
+            # Check the first row of the chunk against the row before it.
+            pair = TriangleBatch.concatenate([previous["last"],
+                                              report["first"]])
+            for name, wrong in sequence_problems(pair, step,
+                                                 tolerance).items():
+                if wrong[0]:
+                    report["problems"][name] = (
+                        0, report["problems"].get(name, (0, 0))[1] + 1)
+                    report["numbers"][name] = int(report["first"][
+                        HEADERS[0]][0])
+
+        for name, (first_wrong, wrong_rows) in report["problems"].items():
+            if name not in found:
+                found[name] = {"row": row + first_wrong + 1,
+                               "triangle": report["numbers"][name],
+                               "wrong rows": 0}
+            found[name]["wrong rows"] += wrong_rows
+        row += report["rows"]
+        previous = report
+
+    print(f"Checked {row} rows.\n")
+    print(f"{'invariant':<14}{'wrong rows':>12}{'first row':>12}"
+          f"{'triangle':>12}")
+    for name in INVARIANTS:
+        if name in found:
+            problem = found[name]
+            print(f"{name:<14}{problem['wrong rows']:>12}"
+                  f"{problem['row']:>12}{problem['triangle']:>12}")
+        else:
+            print(f"{name:<14}{0:>12}{'':>12}{'':>12}")
+
+    if found:
+        print("\nThe data file has problems:")
+        for name in INVARIANTS:
+            if name in found:
+                print(f"\t{name}: {INVARIANTS[name]}. This is first "
+                      f"wrong at row {found[name]['row']} (triangle "
+                      f"{found[name]['triangle']}).")
+    else:
+        print("\nNo problems were found.")
+
+    return {name: found[name] for name in INVARIANTS if name in found}
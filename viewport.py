@@ -0,0 +1,327 @@
+import math
+import os
+
+import numpy as np
+
+from files import replace_file
+from instrument import span, count
+from raster import point_keys, data_file_key
+from settings import (HEADERS, SHOW_TRIANGLES, PLOT_TRIANGLE_POINT,
+                      VIEW_MAX_TRIANGLES, COLOR_GRADIENT, PLOT_TITLE,
+                      STORE_EXTENSION)
+
+# Version of the saved index format. Indexes with another version are built
+# again.
+VIEW_INDEX_VERSION = 1
+# The size of the cells of the finest grid of the index. Triangles are never
+# smaller than their outside leg, so smaller cells wouldn't help.
+FINEST_CELL_SIZE = 1.0
+# The most levels of grids in the index, so cell keys fit in 64 bits.
+MAX_LEVELS = 25
+# How many rows are added to the index at a time.
+INDEX_CHUNK_ROWS = 1000000
+
+
+def index_shape(show_triangles=SHOW_TRIANGLES,
+                plot_triangle_point=PLOT_TRIANGLE_POINT):
+    """Get the name of what is indexed: whole triangles, or one of their
+    points."""
+    if show_triangles:
+        return "triangles"
+
+    return plot_triangle_point.replace(" ", "_")
+
+
+def view_index_path(filename, shape):
+    """Get the path of the saved spatial index of a data file."""
+    return os.path.join("data", f"{filename}.{shape}.view.npz")
+
+
+def shape_bounds(columns, shape, start, stop):
+    """Get the bounding box (left, bottom, right, top arrays) of each
+    triangle (or point) in a range of rows."""
+    if shape == "triangles":
+        keys = [(HEADERS[1], HEADERS[2]), (HEADERS[3], HEADERS[4]),
+                (HEADERS[5], HEADERS[6])]
+    else:
+        keys = [point_keys(shape.replace("_", " "))]
+    x = np.stack([np.asarray(columns[x_key][start:stop], dtype=np.float64)
+                  for x_key, _ in keys])
+    y = np.stack([np.asarray(columns[y_key][start:stop], dtype=np.float64)
+                  for _, y_key in keys])
+
+    return x.min(axis=0), y.min(axis=0), x.max(axis=0), y.max(axis=0)
+
+
+def level_offsets(levels):
+    """Get where the cell keys of each level of grids start. Level "k" is a
+    grid of 2 ** k by 2 ** k cells."""
+    return np.concatenate(([0], np.cumsum(4 ** np.arange(levels + 1))))
+
+
+def build_view_index(columns, shape):
+    """Build a spatial index of the triangles (or points) in some columns.
+
+    The index is a stack of grids, each with half the cell size of the one
+    before it. Each triangle goes in the finest grid whose cells are at
+    least as big as its bounding box, in the cell holding the bottom left
+    corner of its bounding box. Then a triangle can only reach into the next
+    cell over, so only a few cells of each grid need to be looked at to find
+    everything in a part of the plot.
+    """
+    length = len(columns[HEADERS[0]])
+
+    # Find the square that holds everything.
+    left = bottom = np.inf
+    right = top = -np.inf
+    for start in range(0, length, INDEX_CHUNK_ROWS):
+        lefts, bottoms, rights, tops = shape_bounds(
+            columns, shape, start, start + INDEX_CHUNK_ROWS)
+        left, bottom = min(left, lefts.min()), min(bottom, bottoms.min())
+        right, top = max(right, rights.max()), max(top, tops.max())
+    extent = max(right - left, top - bottom, FINEST_CELL_SIZE)
+    levels = min(MAX_LEVELS, math.ceil(math.log2(extent / FINEST_CELL_SIZE)))
+    offsets = level_offsets(levels)
+
+    keys = np.empty(length, dtype=np.int64)
+    for start in range(0, length, INDEX_CHUNK_ROWS):
+        lefts, bottoms, rights, tops = shape_bounds(
+            columns, shape, start, start + INDEX_CHUNK_ROWS)
+        sizes = np.maximum(rights - lefts, tops - bottoms)
+
+        # The finest level with cells at least as big as the bounding box.
+        with np.errstate(divide="ignore"):
+            level = np.floor(np.log2(extent / sizes))
+        level = np.clip(level, 0, levels).astype(np.int64)
+        cells = 2 ** level
+        cell_size = extent / cells
+        column = np.clip(((lefts - left) / cell_size).astype(np.int64), 0,
+                         cells - 1)
+        row = np.clip(((bottoms - bottom) / cell_size).astype(np.int64), 0,
+                      cells - 1)
+        keys[start:start + INDEX_CHUNK_ROWS] = (offsets[level] + row * cells
+                                                + column)
+
+    order = np.argsort(keys, kind="stable")
+
+    return {"bounds": np.array([left, bottom, extent]),
+            "levels": np.array(levels), "keys": keys[order], "rows": order}
+
+
+def load_view_index(filename, columns, shape):
+    """Get the spatial index of a data file, building it (and saving it next
+    to the data file) if the data file changed since it was saved."""
+    key = np.array([VIEW_INDEX_VERSION,
+                    *data_file_key(filename, HEADERS[1])])
+    path = view_index_path(filename, shape)
+
+    try:
+        with np.load(path) as saved:
+            if np.array_equal(saved["key"], key):
+                return {name: saved[name] for name in
+                        ("bounds", "levels", "keys", "rows")}
+    except (OSError, KeyError, ValueError):
+        pass
+
+    print("\nBuilding the spatial index...")
+    with span("view index"):
+        index = build_view_index(columns, shape)
+    with replace_file(path, "wb") as f:
+        np.savez(f, key=key, **index)
+
+    return index
+
+
+def query_candidates(index, left, bottom, right, top):
+    """Find the rows of every triangle whose cell is close enough to a
+    rectangle that the triangle could reach into it. The rows are sorted."""
+    index_left, index_bottom, extent = index["bounds"]
+    offsets = level_offsets(int(index["levels"]))
+
+    starts = []
+    stops = []
+    for level in range(int(index["levels"]) + 1):
+        cells = 2 ** level
+        cell_size = extent / cells
+        # A triangle can reach one cell to the right of and above its cell.
+        first_column, last_column, first_row, last_row = np.clip(
+            np.floor([(left - index_left) / cell_size - 1,
+                      (right - index_left) / cell_size,
+                      (bottom - index_bottom) / cell_size - 1,
+                      (top - index_bottom) / cell_size]),
+            0, cells - 1).astype(np.int64)
+        # The cells of each row of the grid have keys next to each other.
+        row_keys = offsets[level] + np.arange(first_row, last_row + 1) * cells
+        starts.append(np.searchsorted(index["keys"],
+                                      row_keys + first_column, "left"))
+        stops.append(np.searchsorted(index["keys"],
+                                     row_keys + last_column, "right"))
+
+    rows = [index["rows"][start:stop] for start, stop
+            in zip(np.concatenate(starts), np.concatenate(stops))
+            if stop > start]
+    if not rows:
+        return np.empty(0, dtype=np.int64)
+
+    return np.sort(np.concatenate(rows))
+
+
+def crosses_rectangle(triangles, left, bottom, right, top):
+    """Check which triangles (an array with the shape (amount, 3, 2)) are at
+    least partly inside a rectangle."""
+    x = triangles[:, :, 0]
+    y = triangles[:, :, 1]
+    inside = ((x.max(axis=1) >= left) & (x.min(axis=1) <= right)
+              & (y.max(axis=1) >= bottom) & (y.min(axis=1) <= top))
+
+    # Otherwise, the rectangle is outside of the triangle if all of its
+    # corners are on the other side of one of the triangle's edges from the
+    # triangle's third point.
+    corners = np.array([[left, bottom], [right, bottom], [right, top],
+                        [left, top]])
+    for first, second, third in ((0, 1, 2), (1, 2, 0), (2, 0, 1)):
+        edge = triangles[:, second] - triangles[:, first]
+
+        def side(points):
+            offset = points - triangles[:, first, np.newaxis]
+            return (edge[:, np.newaxis, 0] * offset[..., 1]
+                    - edge[:, np.newaxis, 1] * offset[..., 0])
+
+        third_side = side(triangles[:, third, np.newaxis])[:, 0]
+        corner_sides = side(corners[np.newaxis])
+        inside &= ~np.all(corner_sides * third_side[:, np.newaxis] < 0,
+                          axis=1)
+
+    return inside
+
+
+def read_triangles(columns, rows):
+    """Read the points of some rows as an array with the shape
+    (amount, 3, 2)."""
+    return np.stack([np.asarray(columns[key][rows], dtype=np.float64)
+                     for key in HEADERS[1:7]], axis=1).reshape(-1, 3, 2)
+
+
+def query_view(index, columns, shape, left, bottom, right, top):
+    """Find the rows of the triangles (or points) inside a rectangle, and
+    read their points."""
+    rows = query_candidates(index, left, bottom, right, top)
+    triangles = read_triangles(columns, rows)
+
+    if shape == "triangles":
+        visible = crosses_rectangle(triangles, left, bottom, right, top)
+    else:
+        point = triangles[:, ("outside_left", "outside_right",
+                              "inside").index(shape)]
+        visible = ((point[:, 0] >= left) & (point[:, 0] <= right)
+                   & (point[:, 1] >= bottom) & (point[:, 1] <= top))
+    count("triangles viewed", int(visible.sum()))
+
+    return rows[visible], triangles[visible]
+
+
+def open_view_columns(filename):
+    """Get the columns of a store for the viewer, or None if there are no
+    triangles. The store is memory mapped, so only the rows that are viewed
+    get read from disk.
+
+    A csv file would have to be read all at once, which is what the viewer
+    is for avoiding, so it isn't viewed. It can be converted to a store
+    first.
+    """
+    from store import is_store, open_store, read_store_header
+
+    if not is_store(filename):
+        print(f"\nOnly stores can be viewed, and \"{filename}\" is a csv "
+              "file. Convert it to a store first, with:\n\tpython main.py "
+              f"convert {filename} "
+              f"{os.path.splitext(filename)[0]}{STORE_EXTENSION}")
+
+        return
+    if read_store_header(filename) is None:
+        print("\nNo data file was found.")
+
+        return
+    columns = open_store(filename)
+    if len(columns[HEADERS[0]]) == 0:
+        print("\nThe data file found doesn't contain anything.")
+
+        return
+
+    return columns
+
+
+def view_plot(filename, show_triangles=SHOW_TRIANGLES,
+              plot_triangle_point=PLOT_TRIANGLE_POINT,
+              max_triangles=VIEW_MAX_TRIANGLES,
+              color_percent_done=COLOR_GRADIENT, show=True):
+    """Plot a store in a window which only draws the triangles (or points)
+    that can be seen.
+
+    Whenever the plot is panned or zoomed, the spatial index of the data file
+    is used to find the triangles inside the new view, and only those are
+    read and drawn. If more than "max_triangles" can be seen, an evenly
+    spread part of them is drawn.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import PolyCollection
+
+    columns = open_view_columns(filename)
+    if columns is None:
+        return
+    shape = index_shape(show_triangles, plot_triangle_point)
+    index = load_view_index(filename, columns, shape)
+    last_number = float(columns[HEADERS[0]][-1])
+
+    fig = plt.figure()
+    ax = plt.axes(aspect="equal")
+    ax.set_title(PLOT_TITLE)
+    ax.grid()
+    if show_triangles:
+        collection = ax.add_collection(PolyCollection(
+            np.empty((0, 3, 2)), closed=True, facecolors="none",
+            linewidths=2))
+    else:
+        collection = ax.scatter([], [], s=5 ** 2, marker=".")
+
+    # The view that was last drawn, so it isn't drawn twice when both axes
+    # change together.
+    drawn_view = [None]
+
+    def update_view(ax):
+        view = (*ax.get_xlim(), *ax.get_ylim())
+        if view == drawn_view[0]:
+            return
+        drawn_view[0] = view
+        left, right, bottom, top = view
+
+        rows, triangles = query_view(index, columns, shape, left, bottom,
+                                     right, top)
+        step = max(1, math.ceil(len(rows) / max_triangles))
+        rows, triangles = rows[::step], triangles[::step]
+
+        colors = np.zeros((len(rows), 3))
+        if color_percent_done:
+            colors[:, 1] = np.asarray(columns[HEADERS[0]][rows]) / last_number
+        if show_triangles:
+            collection.set_verts(triangles)
+            collection.set_edgecolor(colors)
+        else:
+            point_index = ("outside_left", "outside_right",
+                           "inside").index(shape)
+            collection.set_offsets(triangles[:, point_index])
+            collection.set_color(colors)
+        fig.canvas.draw_idle()
+
+    ax.callbacks.connect("xlim_changed", update_view)
+    ax.callbacks.connect("ylim_changed", update_view)
+
+    # Start by showing everything.
+    index_left, index_bottom, extent = index["bounds"]
+    ax.set_xlim(index_left, index_left + extent)
+    ax.set_ylim(index_bottom, index_bottom + extent)
+
+    if show:
+        plt.show()
+
+    return fig
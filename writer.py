@@ -0,0 +1,118 @@
+import queue
+import threading
+import time
+
+from config import default_config
+from triangle_batch import TriangleBatch
+from utils import write_triangle_data
+from settings import (WRITER_QUEUE_SIZE, WRITER_FLUSH_ROWS,
+                      WRITER_FLUSH_SECONDS, WRITER_FSYNC_SECONDS)
+
+
+class TriangleWriter:
+    """Save triangle data to a data file from a background thread.
+
+    Triangle data is put in a bounded queue, so calculating triangles doesn't
+    wait for the data file, unless the writer falls too far behind. The
+    writer thread saves the data in large batches, once enough rows are
+    waiting or enough time has passed, and syncs the data file to the disk
+    on a schedule.
+    """
+    def __init__(self, filename, create_new_file,
+                 queue_size=WRITER_QUEUE_SIZE, flush_rows=WRITER_FLUSH_ROWS,
+                 flush_seconds=WRITER_FLUSH_SECONDS,
+                 fsync_seconds=WRITER_FSYNC_SECONDS, table=None,
+                 config=default_config):
+        self.filename = filename
+        self.create_new_file = create_new_file
+        # The expression table exact values refer to, if there is one.
+        self.table = table
+        # The config the triangles are calculated with, saved in the header
+        # of a new store.
+        self.config = config
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.fsync_seconds = fsync_seconds
+
+        # Dictionaries of triangle data waiting to be saved.
+        self.queue = queue.Queue(maxsize=queue_size)
+        # How many rows have been saved so far.
+        self.rows_written = 0
+        # An error raised by the writer thread, which is raised again in the
+        # thread using the writer.
+        self.error = None
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def put(self, triangle_data):
+        """Add triangle data (a TriangleBatch)."""
+        if self.error is not None:
+            raise self.error
+
+        self.queue.put(triangle_data)
+
+    def close(self):
+        """Save all remaining triangle data, then stop the writer thread."""
+        # None tells the writer thread to stop once everything before it has
+        # been saved.
+        self.queue.put(None)
+        self.thread.join()
+
+        if self.error is not None:
+            raise self.error
+
+    def run(self):
+        pending = []
+        pending_rows = 0
+        last_flush = last_fsync = time.monotonic()
+
+        while True:
+            try:
+                triangle_data = self.queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                triangle_data = False
+
+            if triangle_data:
+                pending.append(triangle_data)
+                pending_rows += len(triangle_data)
+
+            now = time.monotonic()
+            stop = triangle_data is None
+            if pending and (stop or pending_rows >= self.flush_rows
+                            or now - last_flush >= self.flush_seconds):
+                sync = stop or now - last_fsync >= self.fsync_seconds
+                try:
+                    self.flush(pending, sync)
+                except Exception as error:
+                    self.error = error
+                    # Keep taking data out of the queue, so the thread
+                    # putting data in doesn't block forever.
+                    stop = stop or self.drain()
+
+                pending = []
+                pending_rows = 0
+                last_flush = now
+                if sync:
+                    last_fsync = now
+
+            if stop:
+                return
+
+    def drain(self):
+        """Throw away everything left in the queue, up to the stop signal."""
+        while self.queue.get() is not None:
+            pass
+
+        return True
+
+    def flush(self, pending, sync):
+        """Save a batch of triangle data in one write."""
+        triangle_data = TriangleBatch.concatenate(pending)
+
+        write_triangle_data(triangle_data, self.filename,
+                            self.create_new_file, verbose=False, sync=sync,
+                            table=self.table, config=self.config)
+
+        self.create_new_file = False
+        self.rows_written += len(triangle_data)